@@ -24,6 +24,24 @@ CREATE TABLE django_session (
     session_data text NOT NULL,
     expire_date timestamp with time zone NOT NULL
 );
+-- purge des sessions expirées par paquets (manage.py purge_sessions)
+CREATE INDEX idx_django_session_expire_date ON django_session(expire_date);
+
+-- Calendriers SLA: heures ouvrées + jours fériés (les contrats comptent le SLA en heures ouvrées)
+    -- assigné à un immeuble (contrat) ou à une catégorie, sans calendrier le SLA court 24h/24
+    -- le calcul est fait dans core/sla_calendar.py (tables précalculées + bisect)
+CREATE TABLE sla_calendars (
+    calendar_id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+
+    work_days VARCHAR(20) NOT NULL DEFAULT '1,2,3,4,5', -- jours ISO: 1 = lundi ... 7 = dimanche
+    work_start TIME NOT NULL DEFAULT '08:00',
+    work_end TIME NOT NULL DEFAULT '17:00',
+    holiday_region VARCHAR(10), -- jours fériés, e.g. 'GE' = canton de Genève (NULL = aucun)
+
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CHECK (work_end > work_start)
+);
 
 -- Table Owener: Possèdent un ou many immeubles
 CREATE TABLE owners (
@@ -45,6 +63,7 @@ CREATE TABLE buildings (
     address TEXT NOT NULL,
     city VARCHAR(100),
     postal_code VARCHAR(20),
+    sla_calendar_id INT REFERENCES sla_calendars(calendar_id) ON DELETE SET NULL, -- calendrier SLA du contrat
 
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -117,6 +136,7 @@ CREATE TABLE issue_categories (
     category_id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL UNIQUE,
     sla_hours INT NOT NULL,  -- temps de réponse attendu en heure (e.g. 1h c'est urgent, 24h un peu moins)
+    sla_calendar_id INT REFERENCES sla_calendars(calendar_id) ON DELETE SET NULL, -- NULL = 24h/24
     description TEXT
 );
 
@@ -165,7 +185,19 @@ CREATE TABLE tickets (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,  -- classique, updater par trigger
 
     resolved_at TIMESTAMP, -- quand le contractor termine le job
-    closed_at TIMESTAMP -- manager ferme le ticket quand solved
+    closed_at TIMESTAMP, -- manager ferme le ticket quand solved
+
+    -- Échéance SLA stockée (optimisation), maintenue par trigger (set_tickets_sla_deadline)
+        -- sla_deadline = created_at + SLA, sla_warning_at = moment où il ne reste que 25% du SLA
+    sla_deadline TIMESTAMP,
+    sla_warning_at TIMESTAMP,
+
+    -- Recherche plein texte (config french: pluriels, conjugaisons), calculée par PostgreSQL
+        -- titre poids A, description poids B (classement); pas un champ du modèle Django
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(description, '')), 'B')
+    ) STORED
 );
 
 -- Historique immutable pour audit --> tack le champ "statut"
@@ -270,6 +302,12 @@ CREATE TABLE attachments (
     file_path TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 
+    -- dérivés JPEG sans EXIF à côté de l'original (worker photo_derivatives, core/photo_derivatives.py)
+    -- derivatives_at NULL = en attente; chemins NULL après traitement = illisible, l'original est servi
+    thumb_path TEXT,
+    web_path TEXT,
+    derivatives_at TIMESTAMP,
+
     -- Le check est simple: il faut 1 et seulement 1 uploader par enregistrement. + relaxation pour gérer la suppresion
     CONSTRAINT chk_attachments_one_uploader
         CHECK (
@@ -334,6 +372,88 @@ CREATE TABLE contractor_assignments (
 );
 
 
+-- Fil d'activité (dashboard): ajout seul, rempli par triggers depuis tickets (création, statut),
+-- messages et assignations. Pagination par (created_at, event_id), jamais d'OFFSET
+CREATE TABLE activity_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    event_type VARCHAR(30) NOT NULL, -- created, status, message, assigned, accepted, declined
+    detail VARCHAR(50), -- sévérité, nouveau statut, 'internal', motif du refus
+    contractor_id INT REFERENCES contractors(contractor_id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- Événements SLA (alerte 75% / dépassement) écrits par le worker sla_scheduler à l'instant où ils arrivent
+    -- les dashboards lisent cette table au lieu de recalculer le SLA à chaque affichage
+    -- UNIQUE: un redémarrage du worker ne duplique pas les événements
+CREATE TABLE sla_events (
+    event_id SERIAL PRIMARY KEY,
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    event_type VARCHAR(20) NOT NULL CHECK (event_type IN ('warning', 'breached')),
+    due_at TIMESTAMP NOT NULL, -- échéance (sla_warning_at ou sla_deadline du ticket)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- moment où le worker l'a enregistré
+    UNIQUE (ticket_id, event_type, due_at)
+);
+
+
+-- Activité des tickets pré-agrégée pour les graphiques du dashboard et les rapports
+    -- ticket_count: tickets par jour de création x catégorie x immeuble x statut actuel x contractor
+    -- resolved_count: même clé, par jour de résolution
+    -- maintenue par trigger (ticket_daily_stats_maintainer): -1 sur l'ancienne clé, +1 sur la nouvelle
+    -- pas de FK: une ligne de stats n'empêche pas de supprimer une catégorie ou un contractor
+CREATE TABLE ticket_daily_stats (
+    stat_id BIGSERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    category_id INT,
+    building_id INT NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    contractor_id INT,
+    ticket_count INT NOT NULL DEFAULT 0,
+    resolved_count INT NOT NULL DEFAULT 0
+);
+
+-- Conformité SLA par jour x catégorie x immeuble x contractor (rapports de la direction)
+    -- alimentée par un job incrémental (core/sla_rollup.py, commande update_sla_rollup):
+    -- seuls les tickets résolus ou dépassés depuis le dernier passage (job_watermarks) sont lus
+    -- NULL = sans catégorie / sans contractor --> clé unique sur COALESCE(..., 0)
+CREATE TABLE sla_daily_rollup (
+    rollup_id SERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    category_id INT REFERENCES issue_categories(category_id) ON DELETE SET NULL,
+    building_id INT REFERENCES buildings(building_id) ON DELETE SET NULL,
+    contractor_id INT REFERENCES contractors(contractor_id) ON DELETE SET NULL,
+
+    met_count INT NOT NULL DEFAULT 0, -- résolus dans les délais
+    breached_count INT NOT NULL DEFAULT 0, -- SLA dépassé (compté le jour de l'échéance)
+    late_resolved_count INT NOT NULL DEFAULT 0, -- résolus en retard
+    lateness_hours_sum DOUBLE PRECISION NOT NULL DEFAULT 0 -- retard cumulé, moyenne = sum / late_resolved_count
+);
+
+-- Faits déjà comptés dans sla_daily_rollup (un par ticket et type): le job relit une marge avant
+    -- son watermark (transactions validées en retard) sans compter deux fois
+CREATE TABLE sla_rollup_facts (
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    fact VARCHAR(20) NOT NULL CHECK (fact IN ('met', 'breached', 'late_resolved')),
+    PRIMARY KEY (ticket_id, fact)
+);
+
+-- Watermark des jobs incrémentaux: jusqu'où les données ont déjà été traitées
+CREATE TABLE job_watermarks (
+    job_name VARCHAR(100) PRIMARY KEY,
+    processed_until TIMESTAMP NOT NULL
+);
+
+-- Compteurs de modifications (incrémentés par trigger): version des snapshots en cache (dashboard admin)
+    -- version d'un compteur = SUM(version) de ses shards: les écrivains concurrents ne se bloquent pas sur une ligne
+CREATE TABLE change_counters (
+    name VARCHAR(100) NOT NULL,
+    shard SMALLINT NOT NULL DEFAULT 0, -- pg_backend_pid() % 16 de la connexion qui écrit
+    version BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (name, shard)
+);
+
+
 -- Table des problèmes récurrents dans un immeuble ou un appartement
 -- Un pattern peut être associé :
     -- à un immeuble entier (building_id sans unit_id → problème global)
@@ -392,22 +512,72 @@ CREATE TABLE on_call_roster (
 CREATE INDEX idx_tickets_unit ON tickets(unit_id);
 CREATE INDEX idx_tickets_status ON tickets(status); -- filtre
 CREATE INDEX idx_tickets_created ON tickets(created_at); -- filtre
+-- liste admin paginée par curseur (created_at DESC, ticket_id DESC), avec ou sans filtre de statut
+CREATE INDEX idx_tickets_created_keyset ON tickets(created_at DESC, ticket_id DESC);
+CREATE INDEX idx_tickets_status_created_keyset ON tickets(status, created_at DESC, ticket_id DESC);
+-- recherche plein texte de la liste admin
+CREATE INDEX idx_tickets_search ON tickets USING GIN(search_vector);
 CREATE INDEX idx_tickets_contractor ON tickets(assigned_contractor_id);
 CREATE INDEX idx_tickets_category ON tickets(category_id);
 
+-- SLA: index partiels sur les tickets actifs uniquement
+    -- "SLA dépassé" et "échéance dans X heures" = range scan, indépendant du nombre de tickets fermés
+CREATE INDEX idx_tickets_sla_deadline_active ON tickets(sla_deadline) WHERE status IN ('open', 'in_progress');
+CREATE INDEX idx_tickets_sla_warning_active ON tickets(sla_warning_at) WHERE status IN ('open', 'in_progress');
+
+-- stats journalières: clé d'upsert du trigger
+CREATE UNIQUE INDEX uq_ticket_daily_stats_key ON ticket_daily_stats
+    (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0));
+
+-- rollup SLA: clé d'upsert du job incrémental + fenêtres du job (tickets terminés / échéances passées)
+CREATE UNIQUE INDEX uq_sla_daily_rollup_key ON sla_daily_rollup
+    (day, COALESCE(category_id, 0), COALESCE(building_id, 0), COALESCE(contractor_id, 0));
+CREATE INDEX idx_tickets_done_at ON tickets((COALESCE(resolved_at, closed_at)));
+CREATE INDEX idx_tickets_sla_deadline ON tickets(sla_deadline);
+
+-- événements SLA: les derniers en premier
+CREATE INDEX idx_sla_events_created ON sla_events(created_at);
+
+-- fil d'activité: pagination par curseur (created_at, event_id)
+CREATE INDEX idx_activity_events_keyset ON activity_events(created_at DESC, event_id DESC);
+
 -- table sur les historiques
 CREATE INDEX idx_status_history_ticket ON ticket_status_history(ticket_id);
 CREATE INDEX idx_category_history_ticket ON ticket_category_history(ticket_id);
 
 -- tables messages / attachments
 CREATE INDEX idx_messages_ticket ON messages(ticket_id);
+-- fil de messages d'un ticket paginé par curseur (created_at, message_id), le plus récent d'abord
+CREATE INDEX idx_messages_ticket_keyset ON messages(ticket_id, created_at DESC, message_id DESC);
 CREATE INDEX idx_attachments_ticket ON attachments(ticket_id);
+-- photos en attente du worker photo_derivatives
+CREATE INDEX idx_attachments_derivatives_pending ON attachments(attachment_id) WHERE derivatives_at IS NULL;
 
 -- talbes les PK de immeubles / unités / locataires
 CREATE INDEX idx_units_building ON units(building_id);
 CREATE INDEX idx_buildings_owner ON buildings(owner_id);
 CREATE INDEX idx_tenants_unit ON tenants(unit_id);
 
+-- connexion des locataires / contractors: email sans tenir compte de la casse (core/login.py)
+CREATE INDEX idx_tenants_email_lower ON tenants(lower(email));
+CREATE INDEX idx_contractors_email_lower ON contractors(lower(email));
+
+-- recherche approximative (typeahead admin): locataire, n° d'appartement, nom / adresse d'immeuble
+    -- pg_trgm optionnel: sans l'extension, core/search.py se rabat sur ILIKE
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX idx_tenants_name_trgm ON tenants
+            USING GIN((first_name || ' ' || last_name) gin_trgm_ops);
+        CREATE INDEX idx_units_number_trgm ON units
+            USING GIN(unit_number gin_trgm_ops);
+        CREATE INDEX idx_buildings_address_trgm ON buildings
+            USING GIN((name || ' ' || address || ' ' || COALESCE(city, '')) gin_trgm_ops);
+    END IF;
+END
+$$;
+
 -- cout
 CREATE INDEX idx_ticket_parts_ticket ON ticket_parts(ticket_id);
 CREATE INDEX idx_labor_costs_ticket ON ticket_labor_costs(ticket_id);
@@ -425,9 +595,29 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- sauf si seules les échéances SLA changent (recalcul par catégorie / calendrier): pas une modification du ticket
+CREATE OR REPLACE FUNCTION update_ticket_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (OLD.sla_deadline, OLD.sla_warning_at) IS DISTINCT FROM (NEW.sla_deadline, NEW.sla_warning_at)
+       AND to_jsonb(OLD) - 'sla_deadline' - 'sla_warning_at' - 'search_vector'
+           = to_jsonb(NEW) - 'sla_deadline' - 'sla_warning_at' - 'search_vector' THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE TRIGGER update_tickets_updated_at
     BEFORE UPDATE ON tickets
     FOR EACH ROW
+    EXECUTE FUNCTION update_ticket_updated_at();
+
+-- même trigger pour les calendriers SLA (updated_at = version du calendrier)
+CREATE TRIGGER update_sla_calendars_updated_at
+    BEFORE UPDATE ON sla_calendars
+    FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
 
@@ -512,9 +702,284 @@ FOR EACH ROW
 EXECUTE FUNCTION messages_Is_uploader_on_insert();
 
 
+-- ***************** 4. Triggers SLA: échéance stockée sur le ticket *****************
+
+-- Même règle que core/sla.py (get_sla_hours): SLA de la catégorie, sinon selon la sévérité
+CREATE OR REPLACE FUNCTION ticket_sla_hours(p_category_id INT, p_severity VARCHAR)
+RETURNS INT AS $$
+    SELECT COALESCE(
+        (SELECT NULLIF(sla_hours, 0) FROM issue_categories WHERE category_id = p_category_id),
+        CASE p_severity
+            WHEN 'critical' THEN 2
+            WHEN 'high' THEN 8
+            WHEN 'medium' THEN 24
+            WHEN 'low' THEN 72
+            ELSE 24
+        END
+    );
+$$ LANGUAGE sql STABLE;
+
+-- calcule sla_deadline et sla_warning_at (warning = 75% du SLA écoulé, cf. SLA_WARNING_RATIO)
+    -- en heures pleines: pour les tickets avec un calendrier SLA, l'application pose l'échéance en heures
+    -- ouvrées avant l'écriture (pre_save) et le trigger la garde; store_sla_deadlines corrige le reste
+CREATE OR REPLACE FUNCTION ticket_flat_sla_deadlines(t tickets, OUT sla_deadline TIMESTAMP, OUT sla_warning_at TIMESTAMP)
+AS $$
+DECLARE
+    sla INTERVAL := make_interval(hours => ticket_sla_hours(t.category_id, t.severity));
+BEGIN
+    sla_deadline := t.created_at + sla;
+    sla_warning_at := t.created_at + sla * 0.75;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- calendrier SLA de l'immeuble ou de la catégorie (cf. CalendarCache.for_ticket)
+CREATE OR REPLACE FUNCTION ticket_has_sla_calendar(p_category_id INT, p_unit_id INT)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (SELECT 1 FROM issue_categories WHERE category_id = p_category_id AND sla_calendar_id IS NOT NULL)
+        OR EXISTS (SELECT 1 FROM units u JOIN buildings b ON b.building_id = u.building_id
+                   WHERE u.unit_id = p_unit_id AND b.sla_calendar_id IS NOT NULL);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- échéance en heures ouvrées déjà posée par l'application: pas d'échéance à plat par-dessus
+    IF NEW.sla_deadline IS NOT NULL AND ticket_has_sla_calendar(NEW.category_id, NEW.unit_id) THEN
+        RETURN NEW;
+    END IF;
+    SELECT d.sla_deadline, d.sla_warning_at INTO NEW.sla_deadline, NEW.sla_warning_at
+    FROM ticket_flat_sla_deadlines(NEW) d;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- BEFORE: on modifie la ligne avant écriture
+CREATE TRIGGER set_tickets_sla_deadline
+    BEFORE INSERT ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+-- UPDATE: seulement si une colonne utilisée par le SLA change vraiment (l'ORM réécrit toutes les colonnes)
+CREATE TRIGGER update_tickets_sla_deadline
+    BEFORE UPDATE OF created_at, category_id, severity, unit_id ON tickets
+    FOR EACH ROW
+    WHEN (OLD.created_at IS DISTINCT FROM NEW.created_at OR OLD.category_id IS DISTINCT FROM NEW.category_id
+          OR OLD.severity IS DISTINCT FROM NEW.severity OR OLD.unit_id IS DISTINCT FROM NEW.unit_id)
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+
+-- SLA d'une catégorie modifié --> recalcul des tickets actifs de la catégorie
+    -- seules les échéances sont écrites (ticket_flat_sla_deadlines): updated_at et l'historique ne bougent pas
+    -- les tickets fermés gardent leur échéance d'origine (historique de conformité SLA)
+    -- tickets sous calendrier: recalculés en heures ouvrées par l'application (refresh_saved_sla_scope)
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets t SET (sla_deadline, sla_warning_at) = (SELECT * FROM ticket_flat_sla_deadlines(t))
+        WHERE t.category_id = NEW.category_id AND t.status IN ('open', 'in_progress')
+          AND NOT ticket_has_sla_calendar(t.category_id, t.unit_id);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER issue_categories_sla_refresh
+    AFTER UPDATE ON issue_categories
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_category_sla_deadlines();
+
+
+-- ***************** 5. Trigger de stats journalières (graphiques et rapports) *****************
+
+-- ajoute (ou retire, delta négatif) un ticket dans ticket_daily_stats
+CREATE OR REPLACE FUNCTION ticket_daily_stats_add(
+    p_day DATE, p_category_id INT, p_building_id INT, p_status VARCHAR, p_contractor_id INT,
+    p_tickets INT, p_resolved INT
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats AS s
+        (day, category_id, building_id, status, contractor_id, ticket_count, resolved_count)
+    VALUES (p_day, p_category_id, p_building_id, COALESCE(p_status, ''), p_contractor_id, p_tickets, p_resolved)
+    ON CONFLICT (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0))
+    DO UPDATE SET ticket_count = s.ticket_count + EXCLUDED.ticket_count,
+                  resolved_count = s.resolved_count + EXCLUDED.resolved_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_ticket_daily_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_building INT;
+    new_building INT;
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.category_id IS NOT DISTINCT FROM NEW.category_id
+       AND OLD.assigned_contractor_id IS NOT DISTINCT FROM NEW.assigned_contractor_id
+       AND OLD.unit_id IS NOT DISTINCT FROM NEW.unit_id
+       AND OLD.created_at IS NOT DISTINCT FROM NEW.created_at
+       AND OLD.resolved_at IS NOT DISTINCT FROM NEW.resolved_at THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT building_id INTO old_building FROM units WHERE unit_id = OLD.unit_id;
+        IF old_building IS NOT NULL AND OLD.created_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(OLD.created_at::date, OLD.category_id, old_building,
+                                           OLD.status, OLD.assigned_contractor_id, -1, 0);
+        END IF;
+        IF old_building IS NOT NULL AND OLD.resolved_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(OLD.resolved_at::date, OLD.category_id, old_building,
+                                           OLD.status, OLD.assigned_contractor_id, 0, -1);
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT building_id INTO new_building FROM units WHERE unit_id = NEW.unit_id;
+        IF NEW.created_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(NEW.created_at::date, NEW.category_id, new_building,
+                                           NEW.status, NEW.assigned_contractor_id, 1, 0);
+        END IF;
+        IF NEW.resolved_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(NEW.resolved_at::date, NEW.category_id, new_building,
+                                           NEW.status, NEW.assigned_contractor_id, 0, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER ticket_daily_stats_maintainer
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_ticket_daily_stats();
+
+-- logement supprimé (ou son immeuble): ses tickets partent en cascade APRÈS lui, leur trigger ne
+-- retrouve plus l'immeuble --> on les décompte avant, ceux du trigger des tickets sont alors ignorés
+CREATE OR REPLACE FUNCTION ticket_daily_stats_unit_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats AS s
+        (day, category_id, building_id, status, contractor_id, ticket_count, resolved_count)
+    SELECT day, category_id, OLD.building_id, status, contractor_id, -SUM(tickets), -SUM(resolved)
+    FROM (
+        SELECT created_at::date AS day, category_id, COALESCE(status, '') AS status,
+               assigned_contractor_id AS contractor_id, 1 AS tickets, 0 AS resolved
+        FROM tickets WHERE unit_id = OLD.unit_id AND created_at IS NOT NULL
+        UNION ALL
+        SELECT resolved_at::date, category_id, COALESCE(status, ''), assigned_contractor_id, 0, 1
+        FROM tickets WHERE unit_id = OLD.unit_id AND resolved_at IS NOT NULL
+    ) unit_tickets
+    GROUP BY day, category_id, status, contractor_id
+    ON CONFLICT (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0))
+    DO UPDATE SET ticket_count = s.ticket_count + EXCLUDED.ticket_count,
+                  resolved_count = s.resolved_count + EXCLUDED.resolved_count;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER units_ticket_daily_stats
+    BEFORE DELETE ON units
+    FOR EACH ROW
+    EXECUTE FUNCTION ticket_daily_stats_unit_deleted();
+
+
+-- ***************** 6. Triggers de version du cache (dashboard admin) *****************
+-- FOR EACH STATEMENT: un UPDATE de 1000 tickets = +1, pas +1000
+-- le compteur est modifié dans la transaction: la nouvelle version n'est visible qu'avec les données
+-- un shard par connexion (16): la ligne verrouillée jusqu'au COMMIT n'est pas partagée par tous les écrivains
+CREATE OR REPLACE FUNCTION bump_change_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_counters (name, shard, version) VALUES (TG_ARGV[0], pg_backend_pid() % 16, 1)
+    ON CONFLICT (name, shard) DO UPDATE SET version = change_counters.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER messages_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON messages
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER contractor_assignments_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON contractor_assignments
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER sla_events_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON sla_events
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+
+-- ***************** 7. Triggers du fil d'activité *****************
+-- une fonction pour les 3 tables sources (TG_TABLE_NAME), les changements de statut sont lus sur tickets
+CREATE OR REPLACE FUNCTION log_activity_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'tickets' AND TG_OP = 'INSERT' THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+        VALUES (NEW.ticket_id, 'created', NEW.severity, COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF TG_TABLE_NAME = 'tickets' THEN
+        IF NEW.status IS DISTINCT FROM OLD.status THEN
+            INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+            VALUES (NEW.ticket_id, 'status', NEW.status, CURRENT_TIMESTAMP);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'messages' THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+        VALUES (NEW.ticket_id, 'message', CASE WHEN NEW.is_internal THEN 'internal' END,
+                COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO activity_events (ticket_id, event_type, contractor_id, created_at)
+        VALUES (NEW.ticket_id, 'assigned', NEW.contractor_id, COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF NEW.status IS DISTINCT FROM OLD.status AND NEW.status IN ('accepted', 'declined') THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, contractor_id, created_at)
+        VALUES (NEW.ticket_id, NEW.status, LEFT(NEW.decline_reason, 50), NEW.contractor_id,
+                COALESCE(NEW.declined_at, CURRENT_TIMESTAMP));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_activity
+    AFTER INSERT OR UPDATE OF status ON tickets
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+CREATE TRIGGER messages_activity
+    AFTER INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+CREATE TRIGGER contractor_assignments_activity
+    AFTER INSERT OR UPDATE OF status ON contractor_assignments
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+
+-- ***************** 8. Stats live: compteur 'tickets' + NOTIFY (SSE du dashboard, ETag de api_ticket_stats) *****************
+-- NOTIFY est envoyé au COMMIT: les clients ne voient jamais une modif annulée
+CREATE OR REPLACE FUNCTION notify_ticket_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('ticket_stats', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_bump_tickets
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('tickets');
+
+CREATE TRIGGER tickets_notify_stats
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_ticket_stats();
+
+
 -- ***********************************************
     -- Mockup data (hash Django, pw Admin)
 
+INSERT INTO sla_calendars (name, work_days, work_start, work_end, holiday_region) VALUES
+('Genève ouvrés', '1,2,3,4,5', '08:00', '17:00', 'GE');
+
 INSERT INTO owners (name, email, phone) VALUES
 ('Owner1', 'owner1@test.ch', '079 111 11 11'),
 ('Owner2', 'owner2@test.ch', '079 222 22 22');
@@ -0,0 +1,50 @@
+"""Activity feed of the admin dashboard, read from activity_events (filled by triggers)"""
+
+from .keyset import keyset_page
+from .models import ActivityEvents
+
+
+ACTIVITY_PAGE_SIZE = 10
+
+STATUS_LABELS = {
+    'open': 'ouvert',
+    'in_progress': 'en cours',
+    'resolved': 'résolu',
+    'closed': 'fermé',
+}
+
+
+def activity_title(event):
+    ticket = f"#{event.ticket_id}"
+    contractor = event.contractor.company_name if event.contractor else "contractor"
+    if event.event_type == 'created':
+        return f"{ticket} créé"
+    if event.event_type == 'status':
+        return f"{ticket} {STATUS_LABELS.get(event.detail, event.detail)}"
+    if event.event_type == 'message':
+        return f"Note interne sur {ticket}" if event.detail == 'internal' else f"Message sur {ticket}"
+    if event.event_type == 'assigned':
+        return f"{ticket} assigné à {contractor}"
+    if event.event_type == 'accepted':
+        return f"{ticket} accepté par {contractor}"
+    if event.event_type == 'declined':
+        return f"{ticket} refusé par {contractor}"
+    return ticket
+
+
+def get_activity_page(cursor=None, limit=ACTIVITY_PAGE_SIZE):
+    """(items, next_cursor): events newest first, starting after `cursor` (None = first page)"""
+    events, next_cursor = keyset_page(
+        ActivityEvents.objects.select_related('contractor'), 'created_at', 'event_id', cursor, limit
+    )
+    items = [
+        {
+            'type': event.event_type,
+            'detail': event.detail,
+            'title': activity_title(event),
+            'ticket_id': event.ticket_id,
+            'created_at': event.created_at,
+        }
+        for event in events
+    ]
+    return items, next_cursor
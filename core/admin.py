@@ -8,7 +8,7 @@ from .models import (
     Messages, Attachments,
     Parts, TicketParts, TicketLaborCosts,
     ContractorAssignments, RecurringPatterns, OnCallRoster,
-    TicketStatusHistory, TicketCategoryHistory
+    TicketStatusHistory, TicketCategoryHistory, SlaCalendars
 )
 
 admin.site.register(Owners)
@@ -28,4 +28,5 @@ admin.site.register(ContractorAssignments)
 admin.site.register(RecurringPatterns)
 admin.site.register(OnCallRoster)
 admin.site.register(TicketStatusHistory)
-admin.site.register(TicketCategoryHistory)
\ No newline at end of file
+admin.site.register(TicketCategoryHistory)
+admin.site.register(SlaCalendars)
\ No newline at end of file
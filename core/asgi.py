@@ -0,0 +1,45 @@
+"""ASGI wrapper exposing client disconnects to async views: Django 4.2 stops reading receive()
+once the body is read, so an endless StreamingHttpResponse never learns that the client left"""
+
+import asyncio
+
+
+DISCONNECT_SCOPE_KEY = 'fixly.disconnected'
+
+
+def watch_disconnect(app):
+    """Set scope[DISCONNECT_SCOPE_KEY] (asyncio.Event) when the server sends http.disconnect"""
+    async def wrapper(scope, receive, send):
+        if scope['type'] != 'http':
+            return await app(scope, receive, send)
+
+        disconnected = scope[DISCONNECT_SCOPE_KEY] = asyncio.Event()
+        watcher = None
+
+        async def watch():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+
+        async def tracked_receive():
+            nonlocal watcher
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+            elif not message.get('more_body', False) and watcher is None:
+                # corps entièrement lu par Django: plus personne n'appelle receive(), on attend la déconnexion
+                watcher = asyncio.create_task(watch())
+            return message
+
+        try:
+            await app(scope, tracked_receive, send)
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+
+    return wrapper
+
+
+def disconnected_event(request):
+    """Event set when the client of `request` disconnects (never set outside watch_disconnect)"""
+    return request.scope.get(DISCONNECT_SCOPE_KEY) or asyncio.Event()
@@ -0,0 +1,30 @@
+"""Template context processors"""
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Tickets
+
+
+SIDEBAR_STATS_KEY = 'admin_sidebar_stats'
+
+# Changes made by this app clear the key right away (signals), the TTL covers the others (SQL, other apps)
+SIDEBAR_STATS_TTL = 30
+
+
+def get_sidebar_stats():
+    stats = cache.get(SIDEBAR_STATS_KEY)
+    if stats is None:
+        stats = {'new': Tickets.objects.filter(status='open').count()}
+        cache.set(SIDEBAR_STATS_KEY, stats, SIDEBAR_STATS_TTL)
+    return stats
+
+
+def invalidate_sidebar_stats(**kwargs):
+    """Signal receiver: a ticket was saved or deleted"""
+    cache.delete(SIDEBAR_STATS_KEY)
+
+
+def admin_sidebar(request):
+    """Counters of the admin sidebar, read (lazily) only by templates that show them"""
+    return {'sidebar_stats': SimpleLazyObject(get_sidebar_stats)}
@@ -0,0 +1,135 @@
+"""Ticket export (CSV / JSONL) streamed from a server-side cursor, SLA evaluated per chunk"""
+
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import Tickets, TicketParts, TicketLaborCosts
+from .sla import annotate_sla_due, evaluate_sla_batch
+
+
+# lignes lues par FETCH du curseur serveur: la mémoire dépend de ce nombre, pas du nombre de tickets
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+# colonne exportée -> chemin ORM (dans l'ordre du fichier)
+EXPORT_COLUMNS = {
+    'ticket_id': 'ticket_id',
+    'title': 'title',
+    'status': 'status',
+    'severity': 'severity',
+    'category': 'category__name',
+    'building': 'unit__building__name',
+    'address': 'unit__building__address',
+    'unit': 'unit__unit_number',
+    'tenant': 'tenant__email',
+    'contractor': 'assigned_contractor__company_name',
+    'created_at': 'created_at',
+    'resolved_at': 'resolved_at',
+    'closed_at': 'closed_at',
+    'parts_cost': 'export_parts_cost',
+    'labor_cost': 'export_labor_cost',
+}
+# calculées par evaluate_sla_batch, ajoutées en fin de ligne
+SLA_COLUMNS = ['sla_status', 'sla_remaining_hours']
+
+# début de cellule interprété comme une formule par les tableurs (titres saisis par les locataires)
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def cost_subquery(model, cost):
+    """Sum of `cost` over the `model` rows of the outer ticket (0 if none), idx_*_ticket.
+    Same formula as the generated total_cost columns of SQL_Fixly.sql"""
+    money = DecimalField(max_digits=12, decimal_places=2)
+    costs = model.objects.filter(ticket=OuterRef('pk')).order_by().values('ticket')
+    return Coalesce(
+        # numeric(12,2): 1.50 h x 80.00 donnerait 120.0000
+        Subquery(costs.annotate(total=Cast(Sum(cost), money)).values('total')),
+        Value(Decimal('0.00')),
+        output_field=money,
+    )
+
+
+def export_chunks(queryset=None, chunk_size=EXPORT_CHUNK_SIZE, now=None):
+    """Yield lists of at most `chunk_size` rows (EXPORT_COLUMNS + SLA_COLUMNS values),
+    read from a server-side cursor: only one chunk is in memory at a time"""
+    if queryset is None:
+        queryset = Tickets.objects.all()
+    if now is None:
+        now = timezone.now()
+
+    # échéances stockées (calendriers compris), heures continues à défaut: comme annotate_sla
+    queryset = annotate_sla_due(queryset).annotate(
+        export_parts_cost=cost_subquery(TicketParts, F('quantity') * F('unit_cost')),
+        export_labor_cost=cost_subquery(TicketLaborCosts, F('hours_worked') * F('hourly_rate')),
+    ).order_by('ticket_id')
+    paths = list(EXPORT_COLUMNS.values())
+    rows = queryset.values_list(*paths, 'sla_due_at', 'sla_warn_at').iterator(chunk_size=chunk_size)
+
+    status_index = paths.index('status')
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        # un appel NumPy par paquet (created_at NULL, donc échéance NULL: comptée comme maintenant)
+        states, remaining = evaluate_sla_batch(
+            [row[-2] or now for row in chunk],
+            [row[-1] or now for row in chunk],
+            [row[status_index] or '' for row in chunk],
+            now,
+        )
+        yield [
+            [*row[:-2], state, None if np.isnan(hours) else round(hours, 1)]
+            for row, state, hours in zip(chunk, states.tolist(), remaining.tolist())
+        ]
+
+
+class Echo:
+    """File-like object for csv.writer: write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def export_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def csv_value(value):
+    """export_value for a CSV cell: text starting like a formula is prefixed with ' so that
+    Excel / LibreOffice show it instead of evaluating it (CSV injection)"""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return export_value(value)
+
+
+def stream_export(fmt, queryset=None, chunk_size=EXPORT_CHUNK_SIZE, now=None):
+    """Export in `fmt` ('csv' or 'jsonl') as one str per chunk (header first for CSV):
+    a few large writes instead of one per ticket"""
+    header = list(EXPORT_COLUMNS) + SLA_COLUMNS
+    chunks = export_chunks(queryset, chunk_size, now)
+    if fmt == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(header)
+        for chunk in chunks:
+            yield ''.join(writer.writerow([csv_value(value) for value in row]) for row in chunk)
+    else:
+        for chunk in chunks:
+            yield ''.join(
+                json.dumps(dict(zip(header, map(export_value, row))), ensure_ascii=False) + '\n'
+                for row in chunk
+            )
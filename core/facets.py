@@ -0,0 +1,134 @@
+"""Facet counts of the admin ticket list (status, SLA state, category, building): one GROUPING SETS query"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+
+from .snapshot_cache import get_version
+
+
+FACETS_TTL = 30
+
+# facette -> (colonne de la valeur, colonne du libellé, lookup du filtre sur un queryset annotate_sla)
+FACET_DIMENSIONS = {
+    'status': ('facet_status', None, 'status'),
+    'sla': ('facet_sla', None, 'sla_state'),
+    'category': ('facet_category_id', 'facet_category_name', 'category_id'),
+    'building': ('facet_building_id', 'facet_building_name', 'unit__building_id'),
+}
+
+# catégories / immeubles affichés (les plus fréquents)
+FACET_LIMIT = 15
+
+# Chaque facette est comptée avec les filtres des autres facettes seulement (facettes disjonctives):
+# sur ?status=open, les autres statuts gardent leur nombre au lieu de tomber à 0
+FACETS_SQL = """
+SELECT {groupings}, {columns}, {counts}
+FROM ({rows}) AS facet_rows
+GROUP BY GROUPING SETS ({sets})
+"""
+
+
+def apply_facet_filters(queryset, filters):
+    """Filter a queryset from annotate_sla with the set values of `filters` (facet -> value)"""
+    for name, value in filters.items():
+        if value not in (None, ''):
+            queryset = queryset.filter(**{FACET_DIMENSIONS[name][2]: value})
+    return queryset
+
+
+def facet_match(name, value):
+    if value in (None, ''):
+        return Value(True)
+    return ExpressionWrapper(Q(**{FACET_DIMENSIONS[name][2]: value}), output_field=BooleanField())
+
+
+def facets_sql(queryset, filters):
+    rows = queryset.order_by().annotate(
+        facet_status=F('status'),
+        facet_sla=F('sla_state'),
+        facet_category_id=F('category_id'),
+        facet_category_name=F('category__name'),
+        facet_building_id=F('unit__building_id'),
+        facet_building_name=F('unit__building__name'),
+        **{f'match_{name}': facet_match(name, filters.get(name)) for name in FACET_DIMENSIONS},
+    ).values(
+        *[column for value, label, _ in FACET_DIMENSIONS.values() for column in (value, label) if column],
+        *[f'match_{name}' for name in FACET_DIMENSIONS],
+    )
+    rows_sql, params = rows.query.sql_with_params()
+
+    columns, sets, counts = [], [], []
+    for name, (value, label, _) in FACET_DIMENSIONS.items():
+        group = [value, label] if label else [value]
+        columns.extend(group)
+        sets.append(f"({', '.join(group)})")
+        others = ' AND '.join(f'match_{other}' for other in FACET_DIMENSIONS if other != name)
+        counts.append(f"COUNT(*) FILTER (WHERE {others})")
+    sql = FACETS_SQL.format(
+        groupings=', '.join(f'GROUPING({value})' for value, _, _ in FACET_DIMENSIONS.values()),
+        columns=', '.join(columns),
+        counts=', '.join(counts),
+        rows=rows_sql,
+        sets=', '.join(sets),
+    )
+    return sql, params
+
+
+def compute_ticket_facets(queryset, filters):
+    """{'status': {value: count}, 'sla': {value: count},
+        'category': [{'id', 'name', 'count'}], 'building': [...]} in one query"""
+    facets = {'status': {}, 'sla': {}, 'category': [], 'building': []}
+    try:
+        sql, params = facets_sql(queryset, filters)
+    except EmptyResultSet:
+        # queryset vide à la compilation (IN vide, none()): aucune ligne, toutes les facettes à 0
+        return facets
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+
+    names = list(FACET_DIMENSIONS)
+    dimensions = len(names)
+    # position de (valeur, libellé) de chaque facette dans les colonnes du SELECT
+    positions, position = [], 0
+    for value, label, _ in FACET_DIMENSIONS.values():
+        positions.append((position, position + 1 if label else None))
+        position += 2 if label else 1
+
+    for row in results:
+        groupings, values, counts = row[:dimensions], row[dimensions:-dimensions], row[-dimensions:]
+        # GROUPING(x) = 0: la ligne est le groupe de la facette x
+        index = groupings.index(0)
+        name, count = names[index], counts[index]
+        value_position, label_position = positions[index]
+        value = values[value_position]
+        if value is None or not count:
+            continue
+        if label_position is None:
+            facets[name][value] = count
+        else:
+            facets[name].append({'id': value, 'name': values[label_position], 'count': count})
+    for name in ('category', 'building'):
+        facets[name] = sorted(facets[name], key=lambda item: (-item['count'], item['name'] or ''))[:FACET_LIMIT]
+    return facets
+
+
+def facet_cache_key(signature):
+    digest = hashlib.md5(json.dumps(signature, sort_keys=True, default=str).encode()).hexdigest()
+    return f"facets:tickets:{get_version('tickets')}:{digest}"
+
+
+def get_ticket_facets(queryset, filters, signature):
+    """compute_ticket_facets cached FACETS_TTL seconds per `signature` (every parameter that shaped
+    `queryset` and `filters`) and per version of the tickets (trigger notify_ticket_stats)"""
+    key = facet_cache_key(signature)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_ticket_facets(queryset, filters)
+        cache.set(key, facets, FACETS_TTL)
+    return facets
@@ -0,0 +1,50 @@
+"""Photo derivatives with Pillow only (no Django: run in the worker processes of core.photo_derivatives)"""
+
+import os
+
+from PIL import Image, ImageOps
+
+
+# dérivé -> (plus grand côté en px, qualité JPEG), du plus grand au plus petit
+DERIVATIVE_SIZES = {
+    'web': (1280, 80),
+    'thumb': (320, 75),
+}
+
+
+def derivative_path(file_path, name):
+    """'tickets/12/abc.png' -> 'tickets/12/abc_thumb.jpg', next to the original"""
+    stem, _ = os.path.splitext(file_path)
+    return f"{stem}_{name}.jpg"
+
+
+def flatten(image):
+    """RGB copy of `image`, transparency (PNG, GIF) on a white background"""
+    if image.mode == 'RGB':
+        return image
+    rgba = image.convert('RGBA')
+    flat = Image.new('RGB', rgba.size, 'white')
+    flat.paste(rgba, mask=rgba.getchannel('A'))
+    return flat
+
+
+def make_derivatives(media_root, file_path, sizes=DERIVATIVE_SIZES):
+    """Write the JPEG derivatives of `media_root`/`file_path`, turned upright from the EXIF orientation
+    and saved without any metadata (GPS position of phone photos). Returns {name: relative path}"""
+    largest = max(size for size, _ in sizes.values())
+    with Image.open(os.path.join(media_root, file_path)) as original:
+        # JPEG: décodé directement à 1/2, 1/4 ou 1/8 si le plus grand dérivé le permet
+        original.draft('RGB', (largest, largest))
+        source = flatten(ImageOps.exif_transpose(original))
+
+    paths = {}
+    for name, (size, quality) in sizes.items():
+        # chaque dérivé réduit le précédent (jamais agrandi)
+        source = source.copy()
+        source.thumbnail((size, size), Image.Resampling.LANCZOS)
+        path = derivative_path(file_path, name)
+        target = os.path.join(media_root, path)
+        source.save(f"{target}.tmp", 'JPEG', quality=quality, optimize=True, progressive=True)
+        os.replace(f"{target}.tmp", target)  # jamais de fichier à moitié écrit servi
+        paths[name] = path
+    return paths
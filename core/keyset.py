@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination: the page after a row is found with an index range scan, never with OFFSET"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    """Opaque cursor for the sort key of the last row of a page"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, types):
+    """Values of an encode_cursor cursor converted with `types`, None if the cursor is invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if len(values) != len(types):
+            return None
+        return [datetime.fromisoformat(value) if kind is datetime else kind(value)
+                for value, kind in zip(values, types)]
+    except (ValueError, TypeError):
+        return None
+
+
+def after(queryset, field, value, pk_name, pk, descending=True):
+    """Rows after (value, pk) in ORDER BY field, pk (both DESC or both ASC).
+    The redundant `field <= value` (>=) lets PostgreSQL start the index scan at the cursor"""
+    op = 'lt' if descending else 'gt'
+    return queryset.filter(**{f'{field}__{op}e': value}).filter(
+        Q(**{f'{field}__{op}': value}) | Q(**{f'{pk_name}__{op}': pk})
+    )
+
+
+def keyset_page(queryset, field, pk_name, cursor, limit, descending=True, types=(datetime, int), fetch=list):
+    """(rows, next_cursor) of the page after `cursor` (None or '' = first page),
+    the same cost whatever the depth of the page. `types` converts the cursor values back,
+    `fetch` turns the sliced queryset into rows (e.g. ticket_rows.fetch_rows)"""
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}{pk_name}')
+    if cursor:
+        position = decode_cursor(cursor, types)
+        if position is None:
+            return [], None
+        queryset = after(queryset, field, position[0], pk_name, position[1], descending)
+
+    rows = fetch(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor((getattr(last, field), getattr(last, pk_name)))
+
+
+def estimate_count(queryset):
+    """Row count estimated by the planner (EXPLAIN, nothing is read): for "≈ N results" labels"""
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        # IN vide, none(): la requête ne serait même pas envoyée
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
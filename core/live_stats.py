@@ -0,0 +1,145 @@
+"""Live ticket stats: one LISTEN connection per process, deltas pushed to the SSE clients"""
+
+import asyncio
+import logging
+import select
+import threading
+
+from django.core.cache import cache
+from django.db import close_old_connections, connections
+from django.db.models import Count, Q
+
+from .models import Tickets
+from .snapshot_cache import get_version
+
+
+logger = logging.getLogger(__name__)
+
+TICKET_STATS_CHANNEL = 'ticket_stats'
+
+# seconds between two checks of the LISTEN connection (and of the subscribers list)
+LISTEN_TIMEOUT = 5
+
+# deltas en attente par client: au-delà le client ne lit plus, il est retiré (fin de son flux)
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# compteur 'tickets' de l'ETag de api_ticket_stats partagé par les clients qui interrogent: une
+# lecture de change_counters par TICKET_STATS_VERSION_TTL secondes au plus, pas une par requête
+TICKET_STATS_VERSION_KEY = 'ticket_stats:version'
+TICKET_STATS_VERSION_TTL = 2
+
+
+def ticket_stats():
+    """Counters of api_ticket_stats, one aggregate"""
+    return Tickets.objects.aggregate(
+        new=Count('pk', filter=Q(status='open')),
+        in_progress=Count('pk', filter=Q(status='in_progress')),
+        waiting=Count('pk', filter=Q(status='open', assigned_contractor__isnull=True)),
+        resolved=Count('pk', filter=Q(status__in=['resolved', 'closed'])),
+    )
+
+
+def stats_delta(old, new):
+    """Counters that changed between two ticket_stats() results"""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+class StatsBroadcaster:
+    """Listens to NOTIFY ticket_stats in a thread while at least one client is subscribed.
+    The stats are recomputed once per notification, whatever the number of clients."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()  # (event loop, asyncio.Queue)
+        self.thread = None
+        self.stats = None
+        self.version = None  # compteur 'tickets' relu à chaque NOTIFY, None sans listener
+
+    def subscribe(self):
+        """Queue of deltas for the running event loop, None once the subscriber was dropped"""
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.add((asyncio.get_running_loop(), queue))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='ticket-stats-listener', daemon=True)
+                self.thread.start()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            self.subscribers = {(loop, q) for loop, q in self.subscribers if q is not queue}
+
+    def publish(self, stats):
+        """Send what changed since the last stats to every subscriber"""
+        delta = stats_delta(self.stats or {}, stats)
+        self.stats = stats
+        if not delta:
+            return
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(self.deliver, queue, delta)
+
+    def deliver(self, queue, delta):
+        """Runs in the subscriber's event loop: a client that stopped reading is dropped"""
+        try:
+            queue.put_nowait(delta)
+        except asyncio.QueueFull:
+            self.unsubscribe(queue)
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def set_version(self, version):
+        """Also shared through the cache: the other processes skip their change_counters read"""
+        self.version = version
+        cache.set(TICKET_STATS_VERSION_KEY, version, TICKET_STATS_VERSION_TTL)
+
+    def run(self):
+        wrapper = connections['default']
+        listener = wrapper.get_new_connection(wrapper.get_connection_params())
+        listener.autocommit = True
+        try:
+            with listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {TICKET_STATS_CHANNEL}")
+            self.set_version(get_version('tickets'))
+            self.publish(ticket_stats())
+            while True:
+                with self.lock:
+                    if not self.subscribers:
+                        self.thread = None
+                        self.version = None
+                        return
+                if select.select([listener], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                    continue
+                listener.poll()
+                if not listener.notifies:
+                    continue
+                # plusieurs NOTIFY reçus ensemble: un seul recalcul (compteur relu, transactions validées)
+                listener.notifies.clear()
+                self.set_version(get_version('tickets'))
+                self.publish(ticket_stats())
+                close_old_connections()
+        except Exception:
+            logger.exception("Listener %s arrêté", TICKET_STATS_CHANNEL)
+            with self.lock:
+                self.thread = None
+                self.version = None
+        finally:
+            listener.close()
+            close_old_connections()
+
+
+broadcaster = StatsBroadcaster()
+
+
+def ticket_stats_version():
+    """'tickets' counter without a query per poll: the listener's last NOTIFY in this process,
+    else the cache, change_counters only when the cached value expired"""
+    version = broadcaster.version
+    if version is None:
+        version = cache.get(TICKET_STATS_VERSION_KEY)
+    if version is None:
+        version = get_version('tickets')
+        cache.set(TICKET_STATS_VERSION_KEY, version, TICKET_STATS_VERSION_TTL)
+    return version
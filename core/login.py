@@ -0,0 +1,57 @@
+"""Portal logins: account found on an indexed lookup (lower(email), username for admins), password
+checked off the request thread in a bounded pool, hash upgraded when the hasher parameters change"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models.functions import Lower
+
+from .models import Users, Tenants, Contractors
+
+
+# PBKDF2 (hashlib) relâche le GIL: au plus LOGIN_HASH_WORKERS hachages en parallèle, les connexions
+# suivantes attendent dans la file sans bloquer de worker ni la boucle d'événements
+login_executor = ThreadPoolExecutor(max_workers=settings.LOGIN_HASH_WORKERS, thread_name_prefix='login')
+
+# rôle -> (modèle, champ de l'identifiant, filtre en plus de is_active)
+LOGIN_ACCOUNTS = {
+    'admin': (Users, 'username', {'role': 'admin'}),
+    'tenant': (Tenants, 'email', {}),
+    'contractor': (Contractors, 'email', {}),
+}
+
+
+def find_account(role, identifier):
+    """Active account of `role` for `identifier`, None if none. Emails are compared case-insensitively
+    on lower(email) (idx_tenants_email_lower / idx_contractors_email_lower)"""
+    model, field, scope = LOGIN_ACCOUNTS[role]
+    accounts = model.objects.filter(is_active=True, **scope)
+    if field == 'email':
+        accounts = accounts.alias(login_email=Lower('email')).filter(login_email=(identifier or '').strip().lower())
+    else:
+        accounts = accounts.filter(**{field: identifier})
+    return accounts.order_by('pk').first()
+
+
+def verify_password(password, encoded):
+    """(password matches `encoded`, `encoded` was made with outdated hasher parameters)"""
+    outdated = []
+    valid = check_password(password, encoded, setter=lambda raw_password: outdated.append(True))
+    return valid, bool(outdated)
+
+
+async def authenticate(role, identifier, password):
+    """(account or None if not found, password valid). Hashing runs in login_executor; a valid
+    password stored with outdated parameters (PASSWORD_HASHERS, iterations) is hashed again and saved"""
+    account = await sync_to_async(find_account)(role, identifier)
+    if account is None or not account.password_hash:
+        return account, False
+    loop = asyncio.get_running_loop()
+    valid, outdated = await loop.run_in_executor(login_executor, verify_password, password, account.password_hash)
+    if valid and outdated:
+        account.password_hash = await loop.run_in_executor(login_executor, make_password, password)
+        await sync_to_async(account.save)(update_fields=['password_hash'])
+    return account, valid
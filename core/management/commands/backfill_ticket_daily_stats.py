@@ -0,0 +1,19 @@
+# Management Command to rebuild ticket_daily_stats from the tickets table (after import, or if the trigger was disabled)
+
+from django.core.management.base import BaseCommand
+
+from core.ticket_stats import backfill_ticket_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Reconstruit ticket_daily_stats depuis tickets, par tranches de ticket_id (écritures arrêtées)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=50000)
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f"  {done}/{total}")
+
+        last_id = backfill_ticket_daily_stats(options['chunk_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f"ticket_daily_stats reconstruite (ticket_id <= {last_id})"))
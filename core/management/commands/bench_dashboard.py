@@ -0,0 +1,56 @@
+# Management Command to benchmark the admin dashboard: sequential build vs concurrent query groups
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from core.views_admin import build_dashboard_snapshot, build_dashboard_snapshot_concurrent
+
+
+class Command(BaseCommand):
+    help = ('Benchmark dashboard admin: requêtes séquentielles vs groupes en parallèle (RTT base simulé). '
+            'DB_CONN_MAX_AGE > 0 pour garder les connexions du pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rtt-ms', type=float, default=5.0, help='Latence ajoutée à chaque requête SQL')
+        parser.add_argument('--runs', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rtt = options['rtt_ms'] / 1000
+        runs = options['runs']
+        queries = []
+
+        def simulated_rtt(execute, sql, params, many, context):
+            queries.append(sql)
+            time.sleep(rtt)
+            return execute(sql, params, many, context)
+
+        def install(connection, **kwargs):
+            if simulated_rtt not in connection.execute_wrappers:
+                connection.execute_wrappers.append(simulated_rtt)
+
+        # connexion courante + celles ouvertes par les threads du pool
+        install(connection)
+        connection_created.connect(install, dispatch_uid='bench_dashboard_rtt')
+
+        self.stdout.write(f"RTT simulé: {options['rtt_ms']} ms par requête, {runs} mesures par variante\n")
+        medians = {}
+        for label, build in [('Séquentiel', build_dashboard_snapshot),
+                             ('Parallèle', build_dashboard_snapshot_concurrent)]:
+            build()  # échauffement: calendriers SLA, connexions du pool
+            timings = []
+            queries.clear()
+            for _ in range(runs):
+                start = time.perf_counter()
+                build()
+                timings.append(time.perf_counter() - start)
+            medians[label] = statistics.median(timings)
+            self.stdout.write(
+                f"{label:<10}: médiane {medians[label] * 1000:.1f} ms, "
+                f"min {min(timings) * 1000:.1f} ms ({len(queries) // runs} requêtes)"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Gain: x{medians['Séquentiel'] / medians['Parallèle']:.1f}"))
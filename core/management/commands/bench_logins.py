@@ -0,0 +1,86 @@
+# Management Command to load test the contractor login (async view, hashing in core.login.login_executor)
+
+import asyncio
+import os
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Contractors
+
+
+BENCH_PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = ("Test de charge des connexions contractor: --logins connexions dont --concurrency simultanées "
+            "(vue complète: session, recherche lower(email), PBKDF2 dans le pool), en connexions/s par cœur")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--accounts', type=int, default=20)
+
+    def handle(self, *args, **options):
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+        encoded = make_password(BENCH_PASSWORD)
+        start = time.perf_counter()
+        check_password(BENCH_PASSWORD, encoded)
+        hash_time = time.perf_counter() - start
+
+        contractors = Contractors.objects.bulk_create([
+            Contractors(company_name=f"Bench {i}", email=f"Bench-Login-{i}@fixly.invalid", phone="-",
+                        password_hash=encoded, is_active=True, created_at=timezone.now())
+            for i in range(options['accounts'])
+        ])
+        session_keys = []
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                timings, failures, elapsed = asyncio.run(self.run_logins(
+                    [contractor.email.lower() for contractor in contractors],
+                    options['logins'], options['concurrency'], session_keys,
+                ))
+        finally:
+            Contractors.objects.filter(pk__in=[contractor.pk for contractor in contractors]).delete()
+            store = import_module(settings.SESSION_ENGINE).SessionStore
+            for session_key in session_keys:
+                store(session_key).delete()
+
+        rate = options['logins'] / elapsed
+        self.stdout.write(
+            f"{options['logins']} connexions, {options['concurrency']} simultanées, "
+            f"{settings.LOGIN_HASH_WORKERS} hachages en parallèle, {cores} cœur(s)\n"
+            f"Un hachage PBKDF2: {hash_time * 1000:.0f} ms (max théorique {1 / hash_time:.1f} connexions/s par cœur)\n"
+            f"Latence: médiane {statistics.median(timings) * 1000:.0f} ms, "
+            f"p95 {statistics.quantiles(timings, n=20)[-1] * 1000:.0f} ms, {failures} échec(s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"{rate:.1f} connexions/s, {rate / cores:.1f} par cœur"))
+
+    async def run_logins(self, emails, count, concurrency, session_keys):
+        url = reverse('contractor_login')
+        slots = asyncio.Semaphore(concurrency)
+        timings = []
+        failures = 0
+
+        async def login(index):
+            nonlocal failures
+            async with slots:
+                client = AsyncClient()
+                start = time.perf_counter()
+                response = await client.post(url, {'email': emails[index % len(emails)], 'password': BENCH_PASSWORD})
+                timings.append(time.perf_counter() - start)
+                if response.status_code != 302:
+                    failures += 1
+                elif settings.SESSION_COOKIE_NAME in response.cookies:
+                    session_keys.append(response.cookies[settings.SESSION_COOKIE_NAME].value)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(login(index) for index in range(count)))
+        return timings, failures, time.perf_counter() - start
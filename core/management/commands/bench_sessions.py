@@ -0,0 +1,75 @@
+# Management Command to benchmark the per-request session overhead of each SESSION_MODE (db, cached_db, signed_cookies)
+
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+
+class Command(BaseCommand):
+    help = ("Benchmark sessions: temps et requêtes SQL du SessionMiddleware par requête, pour chaque "
+            "SESSION_MODE, en lecture seule (page courante) et avec écriture (messages, connexion)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--modes', nargs='+', default=list(settings.SESSION_ENGINES),
+                            choices=list(settings.SESSION_ENGINES))
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        factory = RequestFactory()
+        cookie_name = settings.SESSION_COOKIE_NAME
+        sessions = []
+
+        def login(request):
+            request.session['tenant_id'] = 1
+            return HttpResponse()
+
+        def page(request, write):
+            request.session.get('tenant_id')
+            if write:
+                request.session['last_seen'] = time.time()
+            return HttpResponse()
+
+        self.stdout.write(f"{count} requêtes par mesure, cache: {settings.CACHES['default']['BACKEND']}\n")
+        try:
+            for mode in options['modes']:
+                with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+                    response = SessionMiddleware(login)(factory.get('/'))
+                    cookie = response.cookies[cookie_name].value
+                    sessions.append((settings.SESSION_ENGINE, cookie))
+
+                    for scenario, write in (('lecture', False), ('écriture', True)):
+                        middleware = SessionMiddleware(lambda request: page(request, write))
+
+                        def run():
+                            request = factory.get('/')
+                            request.COOKIES[cookie_name] = cookie
+                            middleware(request)
+
+                        run()  # échauffement (cache rempli pour cached_db)
+                        with CaptureQueriesContext(connection) as queries:
+                            for _ in range(100):
+                                run()
+                        timings = []
+                        for _ in range(count):
+                            start = time.perf_counter()
+                            run()
+                            timings.append(time.perf_counter() - start)
+
+                        self.stdout.write(
+                            f"{mode:<15} {scenario:<9}: médiane {statistics.median(timings) * 1e6:.0f} µs, "
+                            f"p95 {statistics.quantiles(timings, n=20)[-1] * 1e6:.0f} µs, "
+                            f"{len(queries) / 100:.1f} requêtes SQL/requête"
+                        )
+        finally:
+            # sessions de la mesure: pas laissées dans django_session ni dans le cache
+            for engine, session_key in sessions:
+                import_module(engine).SessionStore(session_key).delete()
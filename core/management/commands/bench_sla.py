@@ -0,0 +1,61 @@
+# Management Command to benchmark the batch SLA evaluator against the per-object path
+
+import random
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.sla import SLA_HOURS, calculate_sla_status, evaluate_sla_batch, flat_sla_deadlines
+
+
+class Command(BaseCommand):
+    help = 'Benchmark SLA: calculate_sla_status (par ticket) vs evaluate_sla_batch (NumPy)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Tickets pour le calcul en lot')
+        parser.add_argument('--object-rows', type=int, default=100_000, help='Tickets pour le calcul par objet')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        object_rows = min(options['object_rows'], rows)
+        now = timezone.now()
+        rng = random.Random(42)
+
+        self.stdout.write(f"Génération de {rows} tickets synthétiques...")
+        statuses = ['open', 'in_progress', 'resolved', 'closed']
+        severities = list(SLA_HOURS)
+        created_at = [now - timedelta(minutes=rng.randint(0, 60 * 24 * 10)) for _ in range(rows)]
+        severity = [rng.choice(severities) for _ in range(rows)]
+        status = [rng.choice(statuses) for _ in range(rows)]
+        sla_hours = [SLA_HOURS[s] for s in severity]
+
+        # 1. Per-object path (reference implementation)
+        tickets = [
+            SimpleNamespace(category=None, severity=severity[i], status=status[i], created_at=created_at[i])
+            for i in range(object_rows)
+        ]
+        start = time.perf_counter()
+        for ticket in tickets:
+            calculate_sla_status(ticket)
+        object_time = time.perf_counter() - start
+        per_row = object_time / object_rows
+
+        # 2. Batch path: columns already in arrays (e.g. loaded with np.fromiter)
+        created_array = np.array(created_at, dtype='datetime64[us]')
+        hours_array = np.array(sla_hours, dtype=np.float64)
+        status_array = np.array(status)
+
+        start = time.perf_counter()
+        due_at, warn_at = flat_sla_deadlines(created_array, hours_array)
+        evaluate_sla_batch(due_at, warn_at, status_array, now)
+        batch_time = time.perf_counter() - start
+
+        self.stdout.write(f"\nPar objet : {object_rows} tickets en {object_time:.3f}s "
+                          f"({per_row * 1e6:.2f} µs/ticket, ~{per_row * rows:.2f}s pour {rows})")
+        self.stdout.write(f"En lot    : {rows} tickets en {batch_time:.3f}s "
+                          f"({batch_time / rows * 1e6:.3f} µs/ticket)")
+        self.stdout.write(self.style.SUCCESS(f"Gain: x{per_row * rows / batch_time:.0f}"))
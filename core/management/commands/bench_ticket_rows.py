@@ -0,0 +1,73 @@
+# Management Command to benchmark ticket lists: model instances (select_related) vs __slots__ rows
+
+import gc
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tickets
+from core.sla import annotate_sla
+from core.ticket_rows import AdminTicketRow, fetch_rows
+
+
+class Command(BaseCommand):
+    help = ('Benchmark liste admin: instances Tickets + select_related vs lignes __slots__ (ticket_rows), '
+            'temps et mémoire pour --rows tickets de la base')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000)
+        parser.add_argument('--runs', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        runs = options['runs']
+        now = timezone.now()
+        tickets = annotate_sla(Tickets.objects.order_by('-created_at', '-ticket_id'), now)
+
+        available = Tickets.objects.count()
+        if available < rows:
+            self.stdout.write(self.style.WARNING(
+                f"{available} tickets en base seulement (generate_demo pour en créer plus)"
+            ))
+            rows = available
+
+        variants = [
+            ('Modèles', lambda: list(tickets.select_related(
+                'unit', 'unit__building', 'tenant', 'category', 'assigned_contractor'
+            )[:rows])),
+            ('Lignes', lambda: fetch_rows(AdminTicketRow, tickets[:rows])),
+        ]
+
+        self.stdout.write(f"{rows} tickets, {runs} mesures par variante\n")
+        results = {}
+        for label, load in variants:
+            load()  # échauffement
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                load()
+                timings.append(time.perf_counter() - start)
+
+            # mémoire gardée par la liste (pas le pic du driver)
+            gc.collect()
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            loaded = load()
+            gc.collect()
+            memory = tracemalloc.get_traced_memory()[0] - before
+            tracemalloc.stop()
+            del loaded
+
+            results[label] = (statistics.median(timings), memory)
+            self.stdout.write(
+                f"{label:<8}: médiane {results[label][0] * 1000:.1f} ms, "
+                f"{memory / 1024 / 1024:.1f} Mo ({memory / max(rows, 1):.0f} octets/ligne)"
+            )
+
+        (model_time, model_memory), (row_time, row_memory) = results['Modèles'], results['Lignes']
+        self.stdout.write(self.style.SUCCESS(
+            f"Gain: x{model_time / row_time:.1f} en temps, x{model_memory / max(row_memory, 1):.1f} en mémoire"
+        ))
@@ -0,0 +1,34 @@
+# Management Command to export every ticket (SLA, building, unit, contractor, costs) as CSV or JSONL
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, stream_export
+from core.models import Tickets
+
+
+class Command(BaseCommand):
+    help = 'Export des tickets en CSV / JSONL, lus par paquets depuis un curseur serveur (mémoire constante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help='Fichier de sortie (défaut: sortie standard)')
+        parser.add_argument('--status', help='Seulement les tickets de ce statut')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        tickets = Tickets.objects.all()
+        if options['status']:
+            tickets = tickets.filter(status=options['status'])
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for part in stream_export(options['format'], tickets, options['chunk_size']):
+                output.write(part)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options['output']:
+            self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['output']}"))
@@ -0,0 +1,57 @@
+# Management Command: long-running worker that makes the thumbnail / web-size derivatives of uploaded photos
+
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.photo_derivatives import (
+    PHOTO_BATCH_SIZE, PhotoPoolBroken, isolate_photos, photo_pool, process_pending_photos,
+)
+
+
+class Command(BaseCommand):
+    help = ("Worker photos: miniatures et versions web (sans EXIF) des pièces jointes en attente, "
+            "dans un pool de processus (un seul worker à la fois)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=5,
+                            help='Secondes entre deux recherches de photos en attente')
+        parser.add_argument('--batch-size', type=int, default=PHOTO_BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=None, help='Processus du pool (défaut: PHOTO_WORKERS)')
+        parser.add_argument('--once', action='store_true',
+                            help='Traite toutes les photos en attente puis quitte (cron, rattrapage)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pool = photo_pool(options['workers'])
+        try:
+            while True:
+                close_old_connections()
+                try:
+                    done, failed = process_pending_photos(pool, batch_size)
+                except BrokenProcessPool as error:
+                    # processus du pool tué: les photos en cours sont reprises une par une (la coupable est
+                    # marquée sans dérivés), puis nouveau pool
+                    self.stderr.write(f"Pool de processus cassé, recréé: {error}")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    if isinstance(error, PhotoPoolBroken):
+                        done, failed = isolate_photos(photo_pool, error.photos)
+                        self.stdout.write(f"Reprise une par une: {done} photos traitées, {failed} en échec")
+                    pool = photo_pool(options['workers'])
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+                    continue
+                if done or failed:
+                    self.stdout.write(f"{done} photos traitées, {failed} en échec")
+                # paquet plein: il en reste sans doute, on enchaîne
+                if done + failed < batch_size:
+                    if options['once']:
+                        return
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du worker photos")
+        finally:
+            pool.shutdown()
@@ -0,0 +1,22 @@
+# Management Command to delete expired sessions in batches (cron, e.g. every hour)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.session_sweeper import SESSION_PURGE_BATCH, purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Supprime les sessions expirées de django_session par paquets (pas de verrou long sur la table)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SESSION_PURGE_BATCH)
+        parser.add_argument('--max-batches', type=int, default=None, help="Arrête après ce nombre de paquets")
+        parser.add_argument('--pause', type=float, default=0, help="Secondes entre deux paquets")
+
+    def handle(self, *args, **options):
+        if settings.SESSION_MODE == 'signed_cookies':
+            self.stdout.write(self.style.WARNING("SESSION_MODE=signed_cookies: sessions dans les cookies, "
+                                                 "seules les anciennes lignes de django_session sont purgées"))
+        deleted = purge_expired_sessions(options['batch_size'], options['max_batches'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} sessions expirées supprimées"))
@@ -0,0 +1,20 @@
+# Management Command to recompute the stored SLA deadline of active tickets (SLA calendars or flat hours)
+
+from django.core.management.base import BaseCommand
+
+from core.sla import refresh_sla_deadlines
+from core.sla_calendar import calendar_cache
+
+
+class Command(BaseCommand):
+    help = ("Recalcule sla_deadline / sla_warning_at des tickets actifs: heures ouvrées avec un calendrier SLA, "
+            "heures continues sinon (rattrapage après des changements faits en SQL)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        # pas de sortie anticipée sans calendrier: des tickets peuvent garder l'échéance d'un calendrier supprimé
+        calendar_cache.load()
+        updated = refresh_sla_deadlines(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{updated} tickets mis à jour"))
@@ -0,0 +1,53 @@
+# Management Command: long-running worker that records SLA warnings / breaches when they happen
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.sla_scheduler import SlaScheduler
+
+
+class Command(BaseCommand):
+    help = "Worker SLA: enregistre les alertes et dépassements SLA dans sla_events à l'instant où ils arrivent"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=5,
+                            help='Secondes entre deux rechargements des tickets modifiés')
+        parser.add_argument('--once', action='store_true',
+                            help='Enregistre les événements déjà échus puis quitte (cron)')
+
+    def handle(self, *args, **options):
+        poll_interval = options['poll_interval']
+        scheduler = SlaScheduler()
+        scheduler.load()
+        fired = scheduler.fire_due()
+        self.stdout.write(f"{len(scheduler.deadlines)} tickets actifs, {fired} événements échus enregistrés")
+        if options['once']:
+            return
+
+        next_poll = timezone.now() + timedelta(seconds=poll_interval)
+        try:
+            while True:
+                # dort jusqu'au prochain événement ou au prochain rechargement, le plus proche des deux
+                next_due = scheduler.next_due()
+                wake_at = next_poll if next_due is None else min(next_due, next_poll)
+                delay = (wake_at - timezone.now()).total_seconds()
+                if delay > 0:
+                    time.sleep(delay)
+
+                now = timezone.now()
+                if now >= next_poll:
+                    close_old_connections()
+                    changed = scheduler.reload_changes()
+                    if changed:
+                        self.stdout.write(f"{changed} tickets rechargés")
+                    next_poll = now + timedelta(seconds=poll_interval)
+
+                fired = scheduler.fire_due(now)
+                if fired:
+                    self.stdout.write(f"{now:%H:%M:%S} {fired} événements SLA enregistrés")
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt du worker SLA")
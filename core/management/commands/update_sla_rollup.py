@@ -0,0 +1,19 @@
+# Management Command to update the daily SLA compliance rollup (cron, e.g. every 15 minutes)
+
+from django.core.management.base import BaseCommand
+
+from core.sla_rollup import update_sla_rollup, rebuild_sla_rollup
+
+
+class Command(BaseCommand):
+    help = "Met à jour sla_daily_rollup avec les tickets résolus ou dépassés depuis le dernier passage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help="Recalcule tout l'historique")
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            since, until = rebuild_sla_rollup()
+        else:
+            since, until = update_sla_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rollup SLA à jour: {since:%Y-%m-%d %H:%M} --> {until:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,67 @@
+"""Message threads of the ticket detail pages: keyset pages (created_at, message_id), newest first.
+Older pages never change (messages are only appended), their HTML is cached"""
+
+from datetime import datetime
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .keyset import decode_cursor, keyset_page
+from .models import Messages
+
+
+THREAD_PAGE_SIZE = 20
+
+# une page après un message donné ne change plus: longue durée, l'éviction LRU fait le reste
+THREAD_FRAGMENT_TTL = 24 * 3600
+
+# gabarit d'une page de messages, par portail (même rôle que load_ticket_detail)
+THREAD_TEMPLATES = {
+    'admin': 'admin_ui/_messages.html',
+    'tenant': 'tenant_ui/_messages.html',
+    'contractor': 'contractor_ui/_messages.html',
+}
+
+
+def thread_messages(ticket_id, role):
+    """Messages of a ticket visible to `role`, senders joined (no lazy FK access in the templates)"""
+    messages = Messages.objects.filter(ticket_id=ticket_id).select_related(
+        'tenant_sender', 'contractor_sender', 'user_sender'
+    )
+    if role == 'tenant':
+        # notes internes: invisibles pour le locataire, filtrées par PostgreSQL
+        messages = messages.exclude(is_internal=True)
+    return messages
+
+
+def thread_page(ticket_id, role, cursor=None, limit=THREAD_PAGE_SIZE):
+    """(messages oldest first, cursor of the older page or None): the page before `cursor`
+    (None = the newest messages), idx_messages_ticket_keyset"""
+    messages, next_cursor = keyset_page(
+        thread_messages(ticket_id, role), 'created_at', 'message_id', cursor, limit
+    )
+    return messages[::-1], next_cursor
+
+
+def thread_fragment_key(ticket_id, role, cursor, limit):
+    """Key of the page after `cursor`, i.e. after the message (created_at, message_id) just before the page.
+    The whole cursor is in the key: a forged date with a real id can't fill someone else's entry"""
+    if decode_cursor(cursor, (datetime, int)) is None:
+        return None
+    return f"thread:{role}:{ticket_id}:before:{cursor}:{limit}"
+
+
+def thread_page_html(ticket_id, role, cursor, limit=THREAD_PAGE_SIZE):
+    """{'html', 'next_cursor'} of an older page (cursor required), rendered once then cached"""
+    key = thread_fragment_key(ticket_id, role, cursor, limit)
+    if key is None:
+        return {'html': '', 'next_cursor': None}
+    page = cache.get(key)
+    if page is None:
+        messages, next_cursor = thread_page(ticket_id, role, cursor, limit)
+        page = {
+            'html': render_to_string(THREAD_TEMPLATES[role], {'messages': messages}),
+            'next_cursor': next_cursor,
+        }
+        cache.set(key, page, THREAD_FRAGMENT_TTL)
+    return page
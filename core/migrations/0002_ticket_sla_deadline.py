@@ -0,0 +1,102 @@
+# Stored SLA deadline on tickets, maintained by triggers (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+SLA_DEADLINE_SQL = """
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS sla_deadline TIMESTAMP;
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS sla_warning_at TIMESTAMP;
+
+CREATE OR REPLACE FUNCTION ticket_sla_hours(p_category_id INT, p_severity VARCHAR)
+RETURNS INT AS $$
+    SELECT COALESCE(
+        (SELECT NULLIF(sla_hours, 0) FROM issue_categories WHERE category_id = p_category_id),
+        CASE p_severity
+            WHEN 'critical' THEN 2
+            WHEN 'high' THEN 8
+            WHEN 'medium' THEN 24
+            WHEN 'low' THEN 72
+            ELSE 24
+        END
+    );
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+DECLARE
+    sla INTERVAL;
+BEGIN
+    sla := make_interval(hours => ticket_sla_hours(NEW.category_id, NEW.severity));
+    NEW.sla_deadline = NEW.created_at + sla;
+    NEW.sla_warning_at = NEW.created_at + sla * 0.75;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_tickets_sla_deadline ON tickets;
+CREATE TRIGGER set_tickets_sla_deadline
+    BEFORE INSERT OR UPDATE OF created_at, category_id, severity ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets SET category_id = category_id
+        WHERE category_id = NEW.category_id AND status IN ('open', 'in_progress');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS issue_categories_sla_refresh ON issue_categories;
+CREATE TRIGGER issue_categories_sla_refresh
+    AFTER UPDATE ON issue_categories
+    FOR EACH ROW
+    EXECUTE FUNCTION refresh_category_sla_deadlines();
+
+CREATE INDEX IF NOT EXISTS idx_tickets_sla_deadline_active
+    ON tickets(sla_deadline) WHERE status IN ('open', 'in_progress');
+CREATE INDEX IF NOT EXISTS idx_tickets_sla_warning_active
+    ON tickets(sla_warning_at) WHERE status IN ('open', 'in_progress');
+
+-- backfill sans toucher updated_at des tickets existants
+DO $$
+DECLARE
+    has_updated_at_trigger BOOLEAN;
+BEGIN
+    SELECT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'update_tickets_updated_at')
+        INTO has_updated_at_trigger;
+    IF has_updated_at_trigger THEN
+        ALTER TABLE tickets DISABLE TRIGGER update_tickets_updated_at;
+    END IF;
+    UPDATE tickets SET severity = severity WHERE sla_deadline IS NULL;
+    IF has_updated_at_trigger THEN
+        ALTER TABLE tickets ENABLE TRIGGER update_tickets_updated_at;
+    END IF;
+END $$;
+"""
+
+SLA_DEADLINE_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS issue_categories_sla_refresh ON issue_categories;
+DROP TRIGGER IF EXISTS set_tickets_sla_deadline ON tickets;
+DROP FUNCTION IF EXISTS refresh_category_sla_deadlines();
+DROP FUNCTION IF EXISTS set_ticket_sla_deadline();
+DROP FUNCTION IF EXISTS ticket_sla_hours(INT, VARCHAR);
+DROP INDEX IF EXISTS idx_tickets_sla_deadline_active;
+DROP INDEX IF EXISTS idx_tickets_sla_warning_active;
+ALTER TABLE tickets DROP COLUMN IF EXISTS sla_deadline;
+ALTER TABLE tickets DROP COLUMN IF EXISTS sla_warning_at;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SLA_DEADLINE_SQL, SLA_DEADLINE_REVERSE_SQL),
+    ]
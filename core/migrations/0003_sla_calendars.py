@@ -0,0 +1,52 @@
+# SLA calendars (working hours + public holidays) per category or building (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+SLA_CALENDARS_SQL = """
+CREATE TABLE IF NOT EXISTS sla_calendars (
+    calendar_id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    work_days VARCHAR(20) NOT NULL DEFAULT '1,2,3,4,5',
+    work_start TIME NOT NULL DEFAULT '08:00',
+    work_end TIME NOT NULL DEFAULT '17:00',
+    holiday_region VARCHAR(10),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CHECK (work_end > work_start)
+);
+
+ALTER TABLE issue_categories ADD COLUMN IF NOT EXISTS sla_calendar_id INT
+    REFERENCES sla_calendars(calendar_id) ON DELETE SET NULL;
+ALTER TABLE buildings ADD COLUMN IF NOT EXISTS sla_calendar_id INT
+    REFERENCES sla_calendars(calendar_id) ON DELETE SET NULL;
+
+DROP TRIGGER IF EXISTS update_sla_calendars_updated_at ON sla_calendars;
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER update_sla_calendars_updated_at
+    BEFORE UPDATE ON sla_calendars
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+"""
+
+SLA_CALENDARS_REVERSE_SQL = """
+ALTER TABLE buildings DROP COLUMN IF EXISTS sla_calendar_id;
+ALTER TABLE issue_categories DROP COLUMN IF EXISTS sla_calendar_id;
+DROP TABLE IF EXISTS sla_calendars;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_ticket_sla_deadline"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SLA_CALENDARS_SQL, SLA_CALENDARS_REVERSE_SQL),
+    ]
@@ -0,0 +1,32 @@
+# SLA events recorded by the sla_scheduler worker (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+SLA_EVENTS_SQL = """
+CREATE TABLE IF NOT EXISTS sla_events (
+    event_id SERIAL PRIMARY KEY,
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    event_type VARCHAR(20) NOT NULL CHECK (event_type IN ('warning', 'breached')),
+    due_at TIMESTAMP NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (ticket_id, event_type, due_at)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sla_events_created ON sla_events(created_at);
+"""
+
+SLA_EVENTS_REVERSE_SQL = """
+DROP TABLE IF EXISTS sla_events;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_sla_calendars"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SLA_EVENTS_SQL, SLA_EVENTS_REVERSE_SQL),
+    ]
@@ -0,0 +1,47 @@
+# Daily SLA compliance rollup maintained by an incremental job (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+SLA_ROLLUP_SQL = """
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job_name VARCHAR(100) PRIMARY KEY,
+    processed_until TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sla_daily_rollup (
+    rollup_id SERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    category_id INT REFERENCES issue_categories(category_id) ON DELETE SET NULL,
+    building_id INT REFERENCES buildings(building_id) ON DELETE SET NULL,
+    contractor_id INT REFERENCES contractors(contractor_id) ON DELETE SET NULL,
+    met_count INT NOT NULL DEFAULT 0,
+    breached_count INT NOT NULL DEFAULT 0,
+    late_resolved_count INT NOT NULL DEFAULT 0,
+    lateness_hours_sum DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_sla_daily_rollup_key ON sla_daily_rollup
+    (day, COALESCE(category_id, 0), COALESCE(building_id, 0), COALESCE(contractor_id, 0));
+
+CREATE INDEX IF NOT EXISTS idx_tickets_done_at ON tickets((COALESCE(resolved_at, closed_at)));
+CREATE INDEX IF NOT EXISTS idx_tickets_sla_deadline ON tickets(sla_deadline);
+"""
+
+SLA_ROLLUP_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_tickets_sla_deadline;
+DROP INDEX IF EXISTS idx_tickets_done_at;
+DROP TABLE IF EXISTS sla_daily_rollup;
+DROP TABLE IF EXISTS job_watermarks;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_sla_events"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SLA_ROLLUP_SQL, SLA_ROLLUP_REVERSE_SQL),
+    ]
@@ -0,0 +1,102 @@
+# Pre-aggregated ticket activity per day, maintained by trigger (same SQL as SQL_Fixly.sql)
+# Existing tickets: python manage.py backfill_ticket_daily_stats
+
+from django.db import migrations
+
+
+TICKET_DAILY_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS ticket_daily_stats (
+    stat_id BIGSERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    category_id INT,
+    building_id INT NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    contractor_id INT,
+    ticket_count INT NOT NULL DEFAULT 0,
+    resolved_count INT NOT NULL DEFAULT 0
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ticket_daily_stats_key ON ticket_daily_stats
+    (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0));
+
+CREATE OR REPLACE FUNCTION ticket_daily_stats_add(
+    p_day DATE, p_category_id INT, p_building_id INT, p_status VARCHAR, p_contractor_id INT,
+    p_tickets INT, p_resolved INT
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats AS s
+        (day, category_id, building_id, status, contractor_id, ticket_count, resolved_count)
+    VALUES (p_day, p_category_id, p_building_id, COALESCE(p_status, ''), p_contractor_id, p_tickets, p_resolved)
+    ON CONFLICT (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0))
+    DO UPDATE SET ticket_count = s.ticket_count + EXCLUDED.ticket_count,
+                  resolved_count = s.resolved_count + EXCLUDED.resolved_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_ticket_daily_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    old_building INT;
+    new_building INT;
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.status IS NOT DISTINCT FROM NEW.status
+       AND OLD.category_id IS NOT DISTINCT FROM NEW.category_id
+       AND OLD.assigned_contractor_id IS NOT DISTINCT FROM NEW.assigned_contractor_id
+       AND OLD.unit_id IS NOT DISTINCT FROM NEW.unit_id
+       AND OLD.created_at IS NOT DISTINCT FROM NEW.created_at
+       AND OLD.resolved_at IS NOT DISTINCT FROM NEW.resolved_at THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        SELECT building_id INTO old_building FROM units WHERE unit_id = OLD.unit_id;
+        IF old_building IS NOT NULL AND OLD.created_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(OLD.created_at::date, OLD.category_id, old_building,
+                                           OLD.status, OLD.assigned_contractor_id, -1, 0);
+        END IF;
+        IF old_building IS NOT NULL AND OLD.resolved_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(OLD.resolved_at::date, OLD.category_id, old_building,
+                                           OLD.status, OLD.assigned_contractor_id, 0, -1);
+        END IF;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        SELECT building_id INTO new_building FROM units WHERE unit_id = NEW.unit_id;
+        IF NEW.created_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(NEW.created_at::date, NEW.category_id, new_building,
+                                           NEW.status, NEW.assigned_contractor_id, 1, 0);
+        END IF;
+        IF NEW.resolved_at IS NOT NULL THEN
+            PERFORM ticket_daily_stats_add(NEW.resolved_at::date, NEW.category_id, new_building,
+                                           NEW.status, NEW.assigned_contractor_id, 0, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ticket_daily_stats_maintainer ON tickets;
+CREATE TRIGGER ticket_daily_stats_maintainer
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_ticket_daily_stats();
+"""
+
+TICKET_DAILY_STATS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS ticket_daily_stats_maintainer ON tickets;
+DROP FUNCTION IF EXISTS maintain_ticket_daily_stats();
+DROP FUNCTION IF EXISTS ticket_daily_stats_add(DATE, INT, INT, VARCHAR, INT, INT, INT);
+DROP TABLE IF EXISTS ticket_daily_stats;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_sla_daily_rollup"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TICKET_DAILY_STATS_SQL, TICKET_DAILY_STATS_REVERSE_SQL),
+    ]
@@ -0,0 +1,56 @@
+# Change counters bumped by trigger, used as version of cached snapshots (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+CHANGE_COUNTERS_SQL = """
+CREATE TABLE IF NOT EXISTS change_counters (
+    name VARCHAR(100) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_change_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_counters (name, version) VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (name) DO UPDATE SET version = change_counters.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER messages_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON messages
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER contractor_assignments_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON contractor_assignments
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+
+CREATE TRIGGER sla_events_bump_dashboard
+    AFTER INSERT OR UPDATE OR DELETE ON sla_events
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('dashboard');
+"""
+
+CHANGE_COUNTERS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS sla_events_bump_dashboard ON sla_events;
+DROP TRIGGER IF EXISTS contractor_assignments_bump_dashboard ON contractor_assignments;
+DROP TRIGGER IF EXISTS messages_bump_dashboard ON messages;
+DROP TRIGGER IF EXISTS tickets_bump_dashboard ON tickets;
+DROP FUNCTION IF EXISTS bump_change_counter();
+DROP TABLE IF EXISTS change_counters;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_ticket_daily_stats"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CHANGE_COUNTERS_SQL, CHANGE_COUNTERS_REVERSE_SQL),
+    ]
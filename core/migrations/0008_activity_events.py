@@ -0,0 +1,93 @@
+# Unified activity feed: append-only activity_events filled by triggers (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+ACTIVITY_EVENTS_SQL = """
+CREATE TABLE IF NOT EXISTS activity_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    event_type VARCHAR(30) NOT NULL,
+    detail VARCHAR(50),
+    contractor_id INT REFERENCES contractors(contractor_id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_events_keyset ON activity_events(created_at DESC, event_id DESC);
+
+CREATE OR REPLACE FUNCTION log_activity_event()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'tickets' AND TG_OP = 'INSERT' THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+        VALUES (NEW.ticket_id, 'created', NEW.severity, COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF TG_TABLE_NAME = 'tickets' THEN
+        IF NEW.status IS DISTINCT FROM OLD.status THEN
+            INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+            VALUES (NEW.ticket_id, 'status', NEW.status, CURRENT_TIMESTAMP);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'messages' THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+        VALUES (NEW.ticket_id, 'message', CASE WHEN NEW.is_internal THEN 'internal' END,
+                COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF TG_OP = 'INSERT' THEN
+        INSERT INTO activity_events (ticket_id, event_type, contractor_id, created_at)
+        VALUES (NEW.ticket_id, 'assigned', NEW.contractor_id, COALESCE(NEW.created_at, CURRENT_TIMESTAMP));
+    ELSIF NEW.status IS DISTINCT FROM OLD.status AND NEW.status IN ('accepted', 'declined') THEN
+        INSERT INTO activity_events (ticket_id, event_type, detail, contractor_id, created_at)
+        VALUES (NEW.ticket_id, NEW.status, LEFT(NEW.decline_reason, 50), NEW.contractor_id,
+                COALESCE(NEW.declined_at, CURRENT_TIMESTAMP));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_activity
+    AFTER INSERT OR UPDATE OF status ON tickets
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+CREATE TRIGGER messages_activity
+    AFTER INSERT ON messages
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+CREATE TRIGGER contractor_assignments_activity
+    AFTER INSERT OR UPDATE OF status ON contractor_assignments
+    FOR EACH ROW EXECUTE FUNCTION log_activity_event();
+
+-- historique existant (les acceptations n'ont pas de date: pas reprises)
+INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+SELECT ticket_id, 'created', severity, created_at FROM tickets WHERE created_at IS NOT NULL;
+
+INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+SELECT ticket_id, 'status', new_status, created_at FROM ticket_status_history WHERE created_at IS NOT NULL;
+
+INSERT INTO activity_events (ticket_id, event_type, detail, created_at)
+SELECT ticket_id, 'message', CASE WHEN is_internal THEN 'internal' END, created_at
+FROM messages WHERE created_at IS NOT NULL;
+
+INSERT INTO activity_events (ticket_id, event_type, contractor_id, created_at)
+SELECT ticket_id, 'assigned', contractor_id, created_at FROM contractor_assignments WHERE created_at IS NOT NULL;
+
+INSERT INTO activity_events (ticket_id, event_type, detail, contractor_id, created_at)
+SELECT ticket_id, 'declined', LEFT(decline_reason, 50), contractor_id, declined_at
+FROM contractor_assignments WHERE status = 'declined' AND declined_at IS NOT NULL;
+"""
+
+ACTIVITY_EVENTS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS contractor_assignments_activity ON contractor_assignments;
+DROP TRIGGER IF EXISTS messages_activity ON messages;
+DROP TRIGGER IF EXISTS tickets_activity ON tickets;
+DROP FUNCTION IF EXISTS log_activity_event();
+DROP TABLE IF EXISTS activity_events;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_change_counters"),
+    ]
+
+    operations = [
+        migrations.RunSQL(ACTIVITY_EVENTS_SQL, ACTIVITY_EVENTS_REVERSE_SQL),
+    ]
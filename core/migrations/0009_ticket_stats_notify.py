@@ -0,0 +1,40 @@
+# Live ticket stats: counter 'tickets' + NOTIFY ticket_stats on every change of tickets (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+TICKET_STATS_NOTIFY_SQL = """
+CREATE OR REPLACE FUNCTION notify_ticket_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO change_counters (name, version) VALUES ('tickets', 1)
+    ON CONFLICT (name) DO UPDATE SET version = change_counters.version + 1
+    RETURNING version INTO new_version;
+    PERFORM pg_notify('ticket_stats', new_version::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_notify_stats
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_ticket_stats();
+"""
+
+TICKET_STATS_NOTIFY_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS tickets_notify_stats ON tickets;
+DROP FUNCTION IF EXISTS notify_ticket_stats();
+DELETE FROM change_counters WHERE name = 'tickets';
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_activity_events"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TICKET_STATS_NOTIFY_SQL, TICKET_STATS_NOTIFY_REVERSE_SQL),
+    ]
@@ -0,0 +1,25 @@
+# Indexes for the keyset pagination of the admin ticket list (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+TICKETS_KEYSET_SQL = """
+CREATE INDEX IF NOT EXISTS idx_tickets_created_keyset ON tickets(created_at DESC, ticket_id DESC);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created_keyset ON tickets(status, created_at DESC, ticket_id DESC);
+"""
+
+TICKETS_KEYSET_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_tickets_status_created_keyset;
+DROP INDEX IF EXISTS idx_tickets_created_keyset;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_ticket_stats_notify"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TICKETS_KEYSET_SQL, TICKETS_KEYSET_REVERSE_SQL),
+    ]
@@ -0,0 +1,29 @@
+# Full-text search on tickets: generated tsvector (French) + GIN index (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+TICKETS_SEARCH_SQL = """
+ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('french', coalesce(description, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_search ON tickets USING GIN(search_vector);
+"""
+
+TICKETS_SEARCH_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_tickets_search;
+ALTER TABLE tickets DROP COLUMN IF EXISTS search_vector;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_tickets_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TICKETS_SEARCH_SQL, TICKETS_SEARCH_REVERSE_SQL),
+    ]
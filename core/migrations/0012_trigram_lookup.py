@@ -0,0 +1,38 @@
+# Fuzzy lookup on tenants / units / buildings: pg_trgm + GIN trigram indexes (same SQL as SQL_Fixly.sql)
+# The extension is optional: without it core.search falls back to ILIKE
+
+from django.db import migrations
+
+
+TRIGRAM_LOOKUP_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS idx_tenants_name_trgm ON tenants
+            USING GIN((first_name || ' ' || last_name) gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_units_number_trgm ON units
+            USING GIN(unit_number gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS idx_buildings_address_trgm ON buildings
+            USING GIN((name || ' ' || address || ' ' || COALESCE(city, '')) gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+TRIGRAM_LOOKUP_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_tenants_name_trgm;
+DROP INDEX IF EXISTS idx_units_number_trgm;
+DROP INDEX IF EXISTS idx_buildings_address_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_tickets_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TRIGRAM_LOOKUP_SQL, TRIGRAM_LOOKUP_REVERSE_SQL),
+    ]
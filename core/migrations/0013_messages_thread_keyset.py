@@ -0,0 +1,23 @@
+# Index for the keyset pagination of message threads (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+MESSAGES_KEYSET_SQL = """
+CREATE INDEX IF NOT EXISTS idx_messages_ticket_keyset ON messages(ticket_id, created_at DESC, message_id DESC);
+"""
+
+MESSAGES_KEYSET_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_messages_ticket_keyset;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_trigram_lookup"),
+    ]
+
+    operations = [
+        migrations.RunSQL(MESSAGES_KEYSET_SQL, MESSAGES_KEYSET_REVERSE_SQL),
+    ]
@@ -0,0 +1,35 @@
+# Index on django_session.expire_date for the expired-session sweeper (same SQL as SQL_Fixly.sql)
+# Databases built by the sessions migrations already have one (django_session_expire_date_...): not duplicated
+
+from django.db import migrations
+
+
+SESSION_EXPIRE_INDEX_SQL = """
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+        WHERE i.indrelid = 'django_session'::regclass AND i.indnatts = 1 AND a.attname = 'expire_date'
+    ) THEN
+        CREATE INDEX idx_django_session_expire_date ON django_session(expire_date);
+    END IF;
+END
+$$;
+"""
+
+SESSION_EXPIRE_INDEX_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_django_session_expire_date;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0013_messages_thread_keyset"),
+        ("sessions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SESSION_EXPIRE_INDEX_SQL, SESSION_EXPIRE_INDEX_REVERSE_SQL),
+    ]
@@ -0,0 +1,25 @@
+# Case-insensitive email lookups of the tenant / contractor logins (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+LOGIN_EMAIL_SQL = """
+CREATE INDEX IF NOT EXISTS idx_tenants_email_lower ON tenants(lower(email));
+CREATE INDEX IF NOT EXISTS idx_contractors_email_lower ON contractors(lower(email));
+"""
+
+LOGIN_EMAIL_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_tenants_email_lower;
+DROP INDEX IF EXISTS idx_contractors_email_lower;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_django_session_expire_index"),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOGIN_EMAIL_SQL, LOGIN_EMAIL_REVERSE_SQL),
+    ]
@@ -0,0 +1,31 @@
+# Thumbnail / web-size derivatives of the photos, made by the photo_derivatives worker (same SQL as SQL_Fixly.sql)
+# Existing attachments are pending: the worker makes their derivatives on its first runs
+
+from django.db import migrations
+
+
+ATTACHMENT_DERIVATIVES_SQL = """
+ALTER TABLE attachments ADD COLUMN IF NOT EXISTS thumb_path TEXT;
+ALTER TABLE attachments ADD COLUMN IF NOT EXISTS web_path TEXT;
+ALTER TABLE attachments ADD COLUMN IF NOT EXISTS derivatives_at TIMESTAMP;
+CREATE INDEX IF NOT EXISTS idx_attachments_derivatives_pending ON attachments(attachment_id)
+    WHERE derivatives_at IS NULL;
+"""
+
+ATTACHMENT_DERIVATIVES_REVERSE_SQL = """
+DROP INDEX IF EXISTS idx_attachments_derivatives_pending;
+ALTER TABLE attachments DROP COLUMN IF EXISTS derivatives_at;
+ALTER TABLE attachments DROP COLUMN IF EXISTS web_path;
+ALTER TABLE attachments DROP COLUMN IF EXISTS thumb_path;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_login_email_lower"),
+    ]
+
+    operations = [
+        migrations.RunSQL(ATTACHMENT_DERIVATIVES_SQL, ATTACHMENT_DERIVATIVES_REVERSE_SQL),
+    ]
@@ -0,0 +1,78 @@
+# Change counters spread over shards: concurrent writers no longer queue on one row (same SQL as SQL_Fixly.sql)
+# version of a counter = SUM(version) of its shards, the shard is chosen by backend (pg_backend_pid)
+
+from django.db import migrations
+
+
+CHANGE_COUNTER_SHARDS_SQL = """
+ALTER TABLE change_counters ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE change_counters DROP CONSTRAINT change_counters_pkey;
+ALTER TABLE change_counters ADD PRIMARY KEY (name, shard);
+
+CREATE OR REPLACE FUNCTION bump_change_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_counters (name, shard, version) VALUES (TG_ARGV[0], pg_backend_pid() % 16, 1)
+    ON CONFLICT (name, shard) DO UPDATE SET version = change_counters.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_ticket_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('ticket_stats', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER tickets_bump_tickets
+    AFTER INSERT OR UPDATE OR DELETE ON tickets
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_change_counter('tickets');
+"""
+
+CHANGE_COUNTER_SHARDS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS tickets_bump_tickets ON tickets;
+
+CREATE OR REPLACE FUNCTION notify_ticket_stats()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    INSERT INTO change_counters (name, version) VALUES ('tickets', 1)
+    ON CONFLICT (name) DO UPDATE SET version = change_counters.version + 1
+    RETURNING version INTO new_version;
+    PERFORM pg_notify('ticket_stats', new_version::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bump_change_counter()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO change_counters (name, version) VALUES (TG_ARGV[0], 1)
+    ON CONFLICT (name) DO UPDATE SET version = change_counters.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- shards regroupés sur le shard 0: les versions ne reculent pas
+INSERT INTO change_counters (name, shard, version)
+SELECT name, 0, SUM(version) FROM change_counters GROUP BY name
+ON CONFLICT (name, shard) DO UPDATE SET version = EXCLUDED.version;
+DELETE FROM change_counters WHERE shard <> 0;
+ALTER TABLE change_counters DROP CONSTRAINT change_counters_pkey;
+ALTER TABLE change_counters DROP COLUMN shard;
+ALTER TABLE change_counters ADD PRIMARY KEY (name);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_attachment_derivatives"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CHANGE_COUNTER_SHARDS_SQL, CHANGE_COUNTER_SHARDS_REVERSE_SQL),
+    ]
@@ -0,0 +1,45 @@
+# Facts already counted in sla_daily_rollup, one row per (ticket, fact): the job re-reads an overlap
+# window before its watermark without counting twice (same SQL as SQL_Fixly.sql)
+# Existing rollups: the facts before the current watermark are recorded as counted
+
+from django.db import migrations
+
+
+SLA_ROLLUP_FACTS_SQL = """
+CREATE TABLE IF NOT EXISTS sla_rollup_facts (
+    ticket_id INT NOT NULL REFERENCES tickets(ticket_id) ON DELETE CASCADE,
+    fact VARCHAR(20) NOT NULL CHECK (fact IN ('met', 'breached', 'late_resolved')),
+    PRIMARY KEY (ticket_id, fact)
+);
+
+INSERT INTO sla_rollup_facts (ticket_id, fact)
+SELECT t.ticket_id, f.fact
+FROM (
+    SELECT t.ticket_id, t.sla_deadline, COALESCE(t.resolved_at, t.closed_at) AS done_at, w.processed_until
+    FROM tickets t
+    JOIN job_watermarks w ON w.job_name = 'sla_daily_rollup'
+    WHERE t.sla_deadline IS NOT NULL
+) t
+CROSS JOIN LATERAL (VALUES
+    ('met', t.done_at <= t.processed_until AND t.done_at <= t.sla_deadline),
+    ('breached', t.sla_deadline <= t.processed_until AND (t.done_at IS NULL OR t.done_at > t.sla_deadline)),
+    ('late_resolved', t.done_at <= t.processed_until AND t.done_at > t.sla_deadline)
+) AS f(fact, counted)
+WHERE f.counted
+ON CONFLICT DO NOTHING;
+"""
+
+SLA_ROLLUP_FACTS_REVERSE_SQL = """
+DROP TABLE IF EXISTS sla_rollup_facts;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_change_counter_shards"),
+    ]
+
+    operations = [
+        migrations.RunSQL(SLA_ROLLUP_FACTS_SQL, SLA_ROLLUP_FACTS_REVERSE_SQL),
+    ]
@@ -0,0 +1,51 @@
+# ticket_daily_stats and units deleted with their tickets (ON DELETE CASCADE from units / buildings):
+# the trigger of tickets runs once the unit is gone and can't find the building of the counts to
+# decrement. The unit's tickets are subtracted before the unit is deleted (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+UNIT_DELETE_STATS_SQL = """
+CREATE OR REPLACE FUNCTION ticket_daily_stats_unit_deleted()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO ticket_daily_stats AS s
+        (day, category_id, building_id, status, contractor_id, ticket_count, resolved_count)
+    SELECT day, category_id, OLD.building_id, status, contractor_id, -SUM(tickets), -SUM(resolved)
+    FROM (
+        SELECT created_at::date AS day, category_id, COALESCE(status, '') AS status,
+               assigned_contractor_id AS contractor_id, 1 AS tickets, 0 AS resolved
+        FROM tickets WHERE unit_id = OLD.unit_id AND created_at IS NOT NULL
+        UNION ALL
+        SELECT resolved_at::date, category_id, COALESCE(status, ''), assigned_contractor_id, 0, 1
+        FROM tickets WHERE unit_id = OLD.unit_id AND resolved_at IS NOT NULL
+    ) unit_tickets
+    GROUP BY day, category_id, status, contractor_id
+    ON CONFLICT (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0))
+    DO UPDATE SET ticket_count = s.ticket_count + EXCLUDED.ticket_count,
+                  resolved_count = s.resolved_count + EXCLUDED.resolved_count;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER units_ticket_daily_stats
+    BEFORE DELETE ON units
+    FOR EACH ROW
+    EXECUTE FUNCTION ticket_daily_stats_unit_deleted();
+"""
+
+UNIT_DELETE_STATS_REVERSE_SQL = """
+DROP TRIGGER IF EXISTS units_ticket_daily_stats ON units;
+DROP FUNCTION IF EXISTS ticket_daily_stats_unit_deleted();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_sla_rollup_facts"),
+    ]
+
+    operations = [
+        migrations.RunSQL(UNIT_DELETE_STATS_SQL, UNIT_DELETE_STATS_REVERSE_SQL),
+    ]
@@ -0,0 +1,113 @@
+# Category SLA edited: the active tickets get their deadline written directly (shared function
+# ticket_flat_sla_deadlines) instead of "SET category_id = category_id", which rewrote updated_at.
+# update_tickets_updated_at leaves alone the updates that only touch the SLA deadlines (same SQL as SQL_Fixly.sql)
+
+from django.db import migrations
+
+
+CATEGORY_SLA_REFRESH_SQL = """
+CREATE OR REPLACE FUNCTION ticket_flat_sla_deadlines(t tickets, OUT sla_deadline TIMESTAMP, OUT sla_warning_at TIMESTAMP)
+AS $$
+DECLARE
+    sla INTERVAL := make_interval(hours => ticket_sla_hours(t.category_id, t.severity));
+BEGIN
+    sla_deadline := t.created_at + sla;
+    sla_warning_at := t.created_at + sla * 0.75;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT d.sla_deadline, d.sla_warning_at INTO NEW.sla_deadline, NEW.sla_warning_at
+    FROM ticket_flat_sla_deadlines(NEW) d;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets t SET (sla_deadline, sla_warning_at) = (SELECT * FROM ticket_flat_sla_deadlines(t))
+        WHERE t.category_id = NEW.category_id AND t.status IN ('open', 'in_progress');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_ticket_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (OLD.sla_deadline, OLD.sla_warning_at) IS DISTINCT FROM (NEW.sla_deadline, NEW.sla_warning_at)
+       AND to_jsonb(OLD) - 'sla_deadline' - 'sla_warning_at' - 'search_vector'
+           = to_jsonb(NEW) - 'sla_deadline' - 'sla_warning_at' - 'search_vector' THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- trigger créé par SQL_Fixly.sql (absent d'une base créée par les migrations seules)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'update_tickets_updated_at') THEN
+        DROP TRIGGER update_tickets_updated_at ON tickets;
+        CREATE TRIGGER update_tickets_updated_at
+            BEFORE UPDATE ON tickets
+            FOR EACH ROW
+            EXECUTE FUNCTION update_ticket_updated_at();
+    END IF;
+END $$;
+"""
+
+CATEGORY_SLA_REFRESH_REVERSE_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'update_tickets_updated_at') THEN
+        DROP TRIGGER update_tickets_updated_at ON tickets;
+        CREATE TRIGGER update_tickets_updated_at
+            BEFORE UPDATE ON tickets
+            FOR EACH ROW
+            EXECUTE FUNCTION update_updated_at_column();
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets SET category_id = category_id
+        WHERE category_id = NEW.category_id AND status IN ('open', 'in_progress');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+DECLARE
+    sla INTERVAL;
+BEGIN
+    sla := make_interval(hours => ticket_sla_hours(NEW.category_id, NEW.severity));
+    NEW.sla_deadline = NEW.created_at + sla;
+    NEW.sla_warning_at = NEW.created_at + sla * 0.75;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS update_ticket_updated_at();
+DROP FUNCTION IF EXISTS ticket_flat_sla_deadlines(tickets);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_ticket_daily_stats_unit_delete"),
+    ]
+
+    operations = [
+        migrations.RunSQL(CATEGORY_SLA_REFRESH_SQL, CATEGORY_SLA_REFRESH_REVERSE_SQL),
+    ]
@@ -0,0 +1,94 @@
+# Stored SLA deadline written once per save (same SQL as SQL_Fixly.sql):
+# - on UPDATE the trigger only runs when a column of the deadline really changes (the ORM writes every column)
+# - tickets under an SLA calendar get their working-hours deadline from the application before the write
+#   (pre_save): the trigger and the category refresh no longer put a flat deadline over it
+
+from django.db import migrations
+
+
+TICKET_SLA_CALENDAR_SQL = """
+CREATE OR REPLACE FUNCTION ticket_has_sla_calendar(p_category_id INT, p_unit_id INT)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (SELECT 1 FROM issue_categories WHERE category_id = p_category_id AND sla_calendar_id IS NOT NULL)
+        OR EXISTS (SELECT 1 FROM units u JOIN buildings b ON b.building_id = u.building_id
+                   WHERE u.unit_id = p_unit_id AND b.sla_calendar_id IS NOT NULL);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.sla_deadline IS NOT NULL AND ticket_has_sla_calendar(NEW.category_id, NEW.unit_id) THEN
+        RETURN NEW;
+    END IF;
+    SELECT d.sla_deadline, d.sla_warning_at INTO NEW.sla_deadline, NEW.sla_warning_at
+    FROM ticket_flat_sla_deadlines(NEW) d;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_tickets_sla_deadline ON tickets;
+CREATE TRIGGER set_tickets_sla_deadline
+    BEFORE INSERT ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+CREATE TRIGGER update_tickets_sla_deadline
+    BEFORE UPDATE OF created_at, category_id, severity, unit_id ON tickets
+    FOR EACH ROW
+    WHEN (OLD.created_at IS DISTINCT FROM NEW.created_at OR OLD.category_id IS DISTINCT FROM NEW.category_id
+          OR OLD.severity IS DISTINCT FROM NEW.severity OR OLD.unit_id IS DISTINCT FROM NEW.unit_id)
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets t SET (sla_deadline, sla_warning_at) = (SELECT * FROM ticket_flat_sla_deadlines(t))
+        WHERE t.category_id = NEW.category_id AND t.status IN ('open', 'in_progress')
+          AND NOT ticket_has_sla_calendar(t.category_id, t.unit_id);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TICKET_SLA_CALENDAR_REVERSE_SQL = """
+CREATE OR REPLACE FUNCTION refresh_category_sla_deadlines()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF (TG_OP = 'UPDATE' AND OLD.sla_hours IS DISTINCT FROM NEW.sla_hours) THEN
+        UPDATE tickets t SET (sla_deadline, sla_warning_at) = (SELECT * FROM ticket_flat_sla_deadlines(t))
+        WHERE t.category_id = NEW.category_id AND t.status IN ('open', 'in_progress');
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_tickets_sla_deadline ON tickets;
+DROP TRIGGER IF EXISTS set_tickets_sla_deadline ON tickets;
+CREATE TRIGGER set_tickets_sla_deadline
+    BEFORE INSERT OR UPDATE OF created_at, category_id, severity ON tickets
+    FOR EACH ROW
+    EXECUTE FUNCTION set_ticket_sla_deadline();
+
+CREATE OR REPLACE FUNCTION set_ticket_sla_deadline()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT d.sla_deadline, d.sla_warning_at INTO NEW.sla_deadline, NEW.sla_warning_at
+    FROM ticket_flat_sla_deadlines(NEW) d;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP FUNCTION IF EXISTS ticket_has_sla_calendar(INT, INT);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_category_sla_refresh_direct"),
+    ]
+
+    operations = [
+        migrations.RunSQL(TICKET_SLA_CALENDAR_SQL, TICKET_SLA_CALENDAR_REVERSE_SQL),
+    ]
@@ -3,6 +3,19 @@
 from django.db import models
 
 
+class ActivityEvents(models.Model):
+    event_id = models.BigAutoField(primary_key=True)
+    ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
+    event_type = models.CharField(max_length=30)
+    detail = models.CharField(max_length=50, blank=True, null=True)
+    contractor = models.ForeignKey('Contractors', models.DO_NOTHING, blank=True, null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'activity_events'
+
+
 class Attachments(models.Model):
     attachment_id = models.AutoField(primary_key=True)
     ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
@@ -12,6 +25,9 @@ class Attachments(models.Model):
     file_name = models.CharField(max_length=255)
     file_path = models.TextField()
     created_at = models.DateTimeField(blank=True, null=True)
+    thumb_path = models.TextField(blank=True, null=True)
+    web_path = models.TextField(blank=True, null=True)
+    derivatives_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = False
@@ -25,6 +41,7 @@ class Buildings(models.Model):
     address = models.TextField()
     city = models.CharField(max_length=100, blank=True, null=True)
     postal_code = models.CharField(max_length=20, blank=True, null=True)
+    sla_calendar = models.ForeignKey('SlaCalendars', models.DO_NOTHING, blank=True, null=True)
     created_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
@@ -32,6 +49,17 @@ class Buildings(models.Model):
         db_table = 'buildings'
 
 
+class ChangeCounters(models.Model):
+    # clé réelle (name, shard): lu par SUM(version) sur name, écrit par trigger
+    name = models.CharField(primary_key=True, max_length=100)
+    shard = models.SmallIntegerField(default=0)
+    version = models.BigIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'change_counters'
+
+
 class ContractorAssignments(models.Model):
     assignment_id = models.AutoField(primary_key=True)
     ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
@@ -77,6 +105,7 @@ class IssueCategories(models.Model):
     category_id = models.AutoField(primary_key=True)
     name = models.CharField(unique=True, max_length=100)
     sla_hours = models.IntegerField()
+    sla_calendar = models.ForeignKey('SlaCalendars', models.DO_NOTHING, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
 
     class Meta:
@@ -84,6 +113,15 @@ class IssueCategories(models.Model):
         db_table = 'issue_categories'
 
 
+class JobWatermarks(models.Model):
+    job_name = models.CharField(primary_key=True, max_length=100)
+    processed_until = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'job_watermarks'
+
+
 class Messages(models.Model):
     message_id = models.AutoField(primary_key=True)
     ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
@@ -155,6 +193,49 @@ class RecurringPatterns(models.Model):
         db_table = 'recurring_patterns'
 
 
+class SlaCalendars(models.Model):
+    calendar_id = models.AutoField(primary_key=True)
+    name = models.CharField(unique=True, max_length=100)
+    work_days = models.CharField(max_length=20)
+    work_start = models.TimeField()
+    work_end = models.TimeField()
+    holiday_region = models.CharField(max_length=10, blank=True, null=True)
+    updated_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'sla_calendars'
+
+
+class SlaDailyRollup(models.Model):
+    rollup_id = models.AutoField(primary_key=True)
+    day = models.DateField()
+    category = models.ForeignKey(IssueCategories, models.DO_NOTHING, blank=True, null=True)
+    building = models.ForeignKey(Buildings, models.DO_NOTHING, blank=True, null=True)
+    contractor = models.ForeignKey(Contractors, models.DO_NOTHING, blank=True, null=True)
+    met_count = models.IntegerField()
+    breached_count = models.IntegerField()
+    late_resolved_count = models.IntegerField()
+    lateness_hours_sum = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'sla_daily_rollup'
+
+
+class SlaEvents(models.Model):
+    event_id = models.AutoField(primary_key=True)
+    ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
+    event_type = models.CharField(max_length=20)
+    due_at = models.DateTimeField()
+    created_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'sla_events'
+        unique_together = (('ticket', 'event_type', 'due_at'),)
+
+
 class Tenants(models.Model):
     tenant_id = models.AutoField(primary_key=True)
     unit = models.ForeignKey('Units', models.DO_NOTHING)
@@ -187,6 +268,21 @@ class TicketCategoryHistory(models.Model):
         db_table = 'ticket_category_history'
 
 
+class TicketDailyStats(models.Model):
+    stat_id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+    category = models.ForeignKey(IssueCategories, models.DO_NOTHING, blank=True, null=True, db_constraint=False)
+    building = models.ForeignKey(Buildings, models.DO_NOTHING, db_constraint=False)
+    status = models.CharField(max_length=50)
+    contractor = models.ForeignKey(Contractors, models.DO_NOTHING, blank=True, null=True, db_constraint=False)
+    ticket_count = models.IntegerField()
+    resolved_count = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'ticket_daily_stats'
+
+
 class TicketLaborCosts(models.Model):
     labor_id = models.AutoField(primary_key=True)
     ticket = models.ForeignKey('Tickets', models.DO_NOTHING)
@@ -252,6 +348,8 @@ class Tickets(models.Model):
     updated_at = models.DateTimeField(blank=True, null=True)
     resolved_at = models.DateTimeField(blank=True, null=True)
     closed_at = models.DateTimeField(blank=True, null=True)
+    sla_deadline = models.DateTimeField(blank=True, null=True)
+    sla_warning_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = False
@@ -0,0 +1,118 @@
+"""Thumbnail and web-size derivatives of uploaded photos, made by a worker in a process pool:
+an upload only inserts the attachment, the ticket pages show the derivatives (the original until then)"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.utils import timezone
+
+from .images import make_derivatives
+from .models import Attachments
+
+
+logger = logging.getLogger(__name__)
+
+PHOTO_BATCH_SIZE = 50
+
+# pools d'un seul processus cassés par une photo seule avant de la marquer sans dérivés
+PHOTO_POOL_ATTEMPTS = 2
+
+
+class PhotoPoolBroken(BrokenProcessPool):
+    """BrokenProcessPool of process_pending_photos, with the (attachment_id, file_path) left pending"""
+
+    def __init__(self, message, photos):
+        super().__init__(message)
+        self.photos = photos
+
+
+def photo_pool(workers=None):
+    """Process pool of the derivatives. 'spawn': the children start without Django and without the
+    parent's database connections (core.images only needs Pillow)"""
+    return ProcessPoolExecutor(
+        max_workers=workers or settings.PHOTO_WORKERS,
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+def pending_photos(limit=PHOTO_BATCH_SIZE):
+    """(attachment_id, file_path) of the attachments without derivatives yet, idx_attachments_derivatives_pending"""
+    return list(
+        Attachments.objects.filter(derivatives_at__isnull=True)
+        .order_by('attachment_id')
+        .values_list('attachment_id', 'file_path')[:limit]
+    )
+
+
+def record_derivatives(attachment_id, paths):
+    Attachments.objects.filter(attachment_id=attachment_id).update(
+        thumb_path=paths.get('thumb'),
+        web_path=paths.get('web'),
+        derivatives_at=timezone.now(),
+    )
+
+
+def process_pending_photos(pool, batch_size=PHOTO_BATCH_SIZE):
+    """Make the derivatives of up to `batch_size` pending attachments in `pool` and record them.
+    A photo that can't be read (missing file, unknown format) is marked done without derivatives:
+    the pages keep showing the original. Returns (done, failed).
+
+    Raises PhotoPoolBroken once the finished photos are recorded if a pool process died (OOM
+    killer, signal): the photos it took down stay pending, see isolate_photos"""
+    media_root = str(settings.MEDIA_ROOT)
+    futures = {
+        pool.submit(make_derivatives, media_root, file_path): (attachment_id, file_path)
+        for attachment_id, file_path in pending_photos(batch_size)
+    }
+    done = failed = 0
+    broken = []
+    for future in as_completed(futures):
+        attachment_id, file_path = futures[future]
+        try:
+            paths = future.result()
+            done += 1
+        except BrokenProcessPool:
+            # une photo du paquet a tué le processus, on ne sait pas laquelle: pas de derivatives_at
+            broken.append((attachment_id, file_path))
+            continue
+        except Exception as error:
+            logger.warning("Photo %s: dérivés impossibles (%s)", attachment_id, error)
+            paths = {}
+            failed += 1
+        record_derivatives(attachment_id, paths)
+    if broken:
+        raise PhotoPoolBroken(f"{len(broken)} photos laissées en attente ({done} traitées, {failed} en échec)",
+                              sorted(broken))
+    return done, failed
+
+
+def isolate_photos(make_pool, photos, attempts=PHOTO_POOL_ATTEMPTS):
+    """Retry the photos left pending by a broken pool one at a time, each in a new pool of one process
+    (`make_pool(1)`). A photo that still kills its process `attempts` times (decompression bomb, OOM)
+    is marked done without derivatives instead of breaking every later pool. Returns (done, failed)"""
+    media_root = str(settings.MEDIA_ROOT)
+    done = failed = 0
+    for attachment_id, file_path in photos:
+        for _ in range(attempts):
+            pool = make_pool(1)
+            try:
+                paths = pool.submit(make_derivatives, media_root, file_path).result()
+                done += 1
+            except BrokenProcessPool:
+                continue
+            except Exception as error:
+                logger.warning("Photo %s: dérivés impossibles (%s)", attachment_id, error)
+                paths = {}
+                failed += 1
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+            record_derivatives(attachment_id, paths)
+            break
+        else:
+            logger.error("Photo %s: processus tué %s fois, marquée sans dérivés", attachment_id, attempts)
+            record_derivatives(attachment_id, {})
+            failed += 1
+    return done, failed
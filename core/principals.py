@@ -0,0 +1,49 @@
+"""Logged-in principals (admin user, tenant, contractor) cached between requests: the *_required
+decorators check the session's principal without a query on the common path"""
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Users, Tenants, Contractors
+
+
+# Les changements faits par l'app vident la clé tout de suite (signaux), le TTL couvre les autres
+# (désactivation en SQL, autre app): un compte désactivé est refusé au plus tard après PRINCIPAL_TTL
+PRINCIPAL_TTL = 60
+
+# rôle -> (modèle, champs gardés en cache dans l'ordre des colonnes du modèle (from_db), filtre en plus de is_active)
+PRINCIPALS = {
+    'admin': (Users, ('user_id', 'username', 'role', 'is_active'), {'role': 'admin'}),
+    'tenant': (Tenants, ('tenant_id', 'unit_id', 'first_name', 'last_name', 'is_active'), {}),
+    'contractor': (Contractors, ('contractor_id', 'company_name', 'is_active'), {}),
+}
+
+
+def principal_key(role, pk):
+    return f"principal:{role}:{pk}"
+
+
+def get_principal(role, pk):
+    """Active `role` principal `pk` (None if missing or inactive) as a model instance: the cached
+    fields are loaded, the others are deferred (read from the database on first access)"""
+    model, fields, scope = PRINCIPALS[role]
+    key = principal_key(role, pk)
+    values = cache.get(key)
+    if values is None:
+        values = model.objects.filter(pk=pk, is_active=True, **scope).values_list(*fields).first()
+        if values is None:
+            return None
+        cache.set(key, values, PRINCIPAL_TTL)
+    return model.from_db(DEFAULT_DB_ALIAS, fields, values)
+
+
+def invalidate_principal(role, pk):
+    cache.delete(principal_key(role, pk))
+
+
+PRINCIPAL_ROLES = {model: role for role, (model, _, _) in PRINCIPALS.items()}
+
+
+def invalidate_saved_principal(sender, instance, **kwargs):
+    """Signal receiver: a user / tenant / contractor was saved (deactivation, password change) or deleted"""
+    invalidate_principal(PRINCIPAL_ROLES[sender], instance.pk)
@@ -0,0 +1,128 @@
+"""Ticket search: PostgreSQL full-text search (French configuration) on tickets.search_vector,
+fuzzy lookup (pg_trgm) on tenants, units and buildings"""
+
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+
+SEARCH_CONFIG = 'french'
+
+# ticket_id is an INT: longer numbers can't be a ticket number
+TICKET_NUMBER_MAX_DIGITS = 9
+
+
+def ticket_search_vector():
+    # colonne générée (GENERATED ALWAYS ... STORED), pas un champ du modèle: Django 4.2 l'écrirait à l'INSERT
+    return RawSQL('"tickets"."search_vector"', [], output_field=SearchVectorField())
+
+
+def search_tickets(queryset, text):
+    """(queryset, ranked). A ticket number ("123", "#123") is an exact match on the primary key,
+    anything else a full-text match (GIN index) annotated with search_rank"""
+    text = text.strip()
+    number = text.lstrip('#')
+    if number.isdigit() and len(number) <= TICKET_NUMBER_MAX_DIGITS:
+        return queryset.filter(ticket_id=int(number)), False
+
+    query = SearchQuery(text, config=SEARCH_CONFIG, search_type='websearch')
+    queryset = queryset.annotate(search_vector=ticket_search_vector()).filter(search_vector=query)
+    # float8: the rank goes into keyset cursors and must compare equal after a round trip
+    return queryset.annotate(
+        search_rank=Cast(SearchRank(ticket_search_vector(), query), FloatField())
+    ), True
+
+
+# Fuzzy lookup (pg_trgm) over tenants, units and building addresses: "Champel 42", "Dupont", "3B".
+# Expressions identical to the trigram indexes of migration 0012, otherwise the index isn't used.
+TENANT_LOOKUP_EXPR = "(t.first_name || ' ' || t.last_name)"
+UNIT_LOOKUP_EXPR = "u.unit_number"
+BUILDING_LOOKUP_EXPR = "(b.name || ' ' || b.address || ' ' || COALESCE(b.city, ''))"
+
+LOOKUP_LIMIT = 8
+# tickets filter: ids kept per entity type (a too vague text must not become a huge IN)
+LOOKUP_MAX_IDS = 200
+
+LOOKUP_SQL = """
+(SELECT 'tenant' AS kind, t.tenant_id AS id, t.first_name || ' ' || t.last_name AS label,
+        b.name || ' - ' || u.unit_number AS detail, {tenant_score} AS score
+ FROM tenants t
+ JOIN units u ON u.unit_id = t.unit_id
+ JOIN buildings b ON b.building_id = u.building_id
+ WHERE {tenant_match}
+ ORDER BY score DESC, id LIMIT %(per_kind)s)
+UNION ALL
+(SELECT 'unit', u.unit_id, b.name || ' - ' || u.unit_number, b.address, {unit_score} AS score
+ FROM units u
+ JOIN buildings b ON b.building_id = u.building_id
+ WHERE {unit_match}
+ ORDER BY score DESC, u.unit_id LIMIT %(per_kind)s)
+UNION ALL
+(SELECT 'building', b.building_id, b.name, b.address || COALESCE(', ' || b.city, ''), {building_score} AS score
+ FROM buildings b
+ WHERE {building_match}
+ ORDER BY score DESC, b.building_id LIMIT %(per_kind)s)
+ORDER BY score DESC, label
+LIMIT %(limit)s
+"""
+
+
+@lru_cache(maxsize=None)
+def trigram_available():
+    """pg_trgm installed (migration 0012 only creates it when the server provides it)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def lookup_sql():
+    if trigram_available():
+        # <% : word_similarity au-dessus du seuil (0.6 par défaut), tolère les fautes de frappe, index GIN
+        match, score = "%(text)s <%% {expr}", "word_similarity(%(text)s, {expr})"
+    else:
+        # sans pg_trgm: sous-chaîne exacte, sans index
+        match, score = "{expr} ILIKE %(pattern)s", "1.0"
+    parts = {}
+    for name, expr in (('tenant', TENANT_LOOKUP_EXPR), ('unit', UNIT_LOOKUP_EXPR),
+                       ('building', BUILDING_LOOKUP_EXPR)):
+        parts[f'{name}_match'] = match.format(expr=expr)
+        parts[f'{name}_score'] = score.format(expr=expr)
+    return LOOKUP_SQL.format(**parts)
+
+
+def lookup_places(text, limit=LOOKUP_LIMIT, per_kind=None):
+    """Tenants, units and buildings matching `text`, best first:
+    [{'kind', 'id', 'label', 'detail', 'score'}], one query.
+    At most `per_kind` matches per entity type (default `limit`), `limit` in total (None: no total cap)"""
+    text = text.strip()
+    if not text:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(lookup_sql(), {'text': text, 'pattern': f'%{escape_like(text)}%', 'limit': limit,
+                                      'per_kind': limit if per_kind is None else per_kind})
+        return [
+            {'kind': kind, 'id': id, 'label': label, 'detail': detail, 'score': round(float(score), 3)}
+            for kind, id, label, detail, score in cursor.fetchall()
+        ]
+
+
+def escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def filter_tickets_by_place(queryset, text):
+    """Tickets of the matching tenants, units, and units of the matching buildings (FK chain)"""
+    matches = lookup_places(text, limit=None, per_kind=LOOKUP_MAX_IDS)
+    ids = {'tenant': [], 'unit': [], 'building': []}
+    for match in matches:
+        ids[match['kind']].append(match['id'])
+    if not matches:
+        # pas de IN vide: les consommateurs en SQL brut (facettes, EXPLAIN) ne savent pas le compiler
+        return queryset.none()
+    return queryset.filter(
+        Q(tenant_id__in=ids['tenant']) | Q(unit_id__in=ids['unit']) | Q(unit__building_id__in=ids['building'])
+    )
@@ -0,0 +1,30 @@
+"""Expired rows of django_session deleted in bounded batches (sessions modes db and cached_db)"""
+
+import time
+
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .models import DjangoSession
+
+
+SESSION_PURGE_BATCH = 5000
+
+
+def purge_expired_sessions(batch_size=SESSION_PURGE_BATCH, max_batches=None, pause=0, now=None):
+    """Delete the sessions expired at `now`, at most `batch_size` rows per DELETE (each one its own short
+    transaction, idx_django_session_expire_date), `pause` seconds between batches.
+    Stops after `max_batches` batches if set. Returns the number of sessions deleted"""
+    if now is None:
+        now = timezone.now()
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        expired = DjangoSession.objects.filter(expire_date__lt=now).values('session_key')[:batch_size]
+        count, _ = DjangoSession.objects.filter(session_key__in=Subquery(expired)).delete()
+        deleted += count
+        batches += 1
+        if count < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
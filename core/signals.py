@@ -0,0 +1,33 @@
+# Signal receivers of the core app (connected in CoreConfig.ready)
+
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+
+from .context_processors import invalidate_sidebar_stats
+from .models import SlaCalendars, IssueCategories, Buildings, Units, Tickets, Users, Tenants, Contractors
+from .principals import invalidate_saved_principal
+from .sla import (
+    collect_deleted_sla_scope, refresh_deleted_sla_scope, refresh_saved_sla_scope, set_saved_ticket_deadline
+)
+from .sla_calendar import invalidate_sla_calendars
+
+
+# Calendars and their assignment to categories / buildings: drop the compiled calendars
+for model in (SlaCalendars, IssueCategories, Buildings, Units):
+    post_save.connect(invalidate_sla_calendars, sender=model, dispatch_uid=f'sla_calendars_{model.__name__}_save')
+    post_delete.connect(invalidate_sla_calendars, sender=model, dispatch_uid=f'sla_calendars_{model.__name__}_delete')
+    # échéances stockées des tickets actifs concernés recalculées (calendrier ajouté, modifié ou retiré)
+    post_save.connect(refresh_saved_sla_scope, sender=model, dispatch_uid=f'sla_deadlines_{model.__name__}_save')
+    pre_delete.connect(collect_deleted_sla_scope, sender=model, dispatch_uid=f'sla_deadlines_{model.__name__}_pre_delete')
+    post_delete.connect(refresh_deleted_sla_scope, sender=model, dispatch_uid=f'sla_deadlines_{model.__name__}_delete')
+
+# Ticket enregistré: échéance en heures ouvrées posée avant l'écriture, le trigger pose les échéances à plat
+pre_save.connect(set_saved_ticket_deadline, sender=Tickets, dispatch_uid='sla_deadline_tickets_save')
+
+# Tickets saved by the app (status changes, new tickets): sidebar counters of the admin UI
+post_save.connect(invalidate_sidebar_stats, sender=Tickets, dispatch_uid='sidebar_stats_tickets_save')
+post_delete.connect(invalidate_sidebar_stats, sender=Tickets, dispatch_uid='sidebar_stats_tickets_delete')
+
+# Comptes (désactivation, changement de mot de passe): principal en cache des décorateurs *_required
+for model in (Users, Tenants, Contractors):
+    post_save.connect(invalidate_saved_principal, sender=model, dispatch_uid=f'principal_{model.__name__}_save')
+    post_delete.connect(invalidate_saved_principal, sender=model, dispatch_uid=f'principal_{model.__name__}_delete')
@@ -1,8 +1,17 @@
 """SLA functions for views"""
 
+import numpy as np
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, ExpressionWrapper, F,
+    FloatField, Func, IntegerField, Q, Value, When
+)
+from django.db.models.functions import Coalesce, NullIf
 from django.utils import timezone
 from datetime import timedelta
 
+from .models import Tickets, SlaCalendars, IssueCategories, Buildings
+from .sla_calendar import get_ticket_calendar, invalidate_sla_calendars
+
 
 SLA_HOURS = {
     'critical': 2,
@@ -11,6 +20,14 @@ SLA_HOURS = {
     'low': 72,
 }
 
+# Part of the SLA left when a ticket switches to 'warning'
+SLA_WARNING_RATIO = 0.25
+
+SLA_CLOSED_STATUSES = ['resolved', 'closed']
+
+# tickets dont l'échéance stockée suit les calendriers / catégories (les fermés gardent la leur)
+SLA_ACTIVE_STATUSES = ['open', 'in_progress']
+
 
 def get_sla_hours(ticket):
     if ticket.category and ticket.category.sla_hours:
@@ -18,19 +35,29 @@ def get_sla_hours(ticket):
     return SLA_HOURS.get(ticket.severity, 24)
 
 
+def get_sla_deadline(ticket):
+    """(deadline, warning_at) of a ticket, in working hours if its building or category has a calendar"""
+    sla_hours = get_sla_hours(ticket)
+    calendar = get_ticket_calendar(ticket)
+    if calendar is None:
+        return (ticket.created_at + timedelta(hours=sla_hours),
+                ticket.created_at + timedelta(hours=sla_hours * (1 - SLA_WARNING_RATIO)))
+    return (calendar.add_working_hours(ticket.created_at, sla_hours),
+            calendar.add_working_hours(ticket.created_at, sla_hours * (1 - SLA_WARNING_RATIO)))
+
+
 def calculate_sla_status(ticket):
-    if ticket.status in ['resolved', 'closed']:
+    if ticket.status in SLA_CLOSED_STATUSES:
         return 'ok', None
 
-    sla_hours = get_sla_hours(ticket)
-    deadline = ticket.created_at + timedelta(hours=sla_hours)
+    deadline, warning_at = get_sla_deadline(ticket)
     now = timezone.now()
     remaining = deadline - now
     remaining_hours = remaining.total_seconds() / 3600
 
     if remaining_hours < 0:
         return 'breached', abs(remaining_hours)
-    elif remaining_hours < (sla_hours * 0.25):
+    elif now > warning_at:
         return 'warning', remaining_hours
     else:
         return 'ok', remaining_hours
@@ -42,3 +69,231 @@ def add_sla_to_tickets(tickets):
         ticket.sla_status = status
         ticket.sla_remaining = f"{int(hours)}h" if hours is not None else None
     return tickets
+
+
+def store_sla_deadlines(tickets):
+    """Write get_sla_deadline into tickets.sla_deadline / sla_warning_at where the stored values differ.
+    The trigger set_tickets_sla_deadline only knows flat hours: tickets covered by a calendar are
+    corrected here, and tickets whose calendar was removed get their flat deadline back"""
+    changed = []
+    for ticket in tickets:
+        if ticket.created_at is None:
+            continue
+        deadlines = get_sla_deadline(ticket)
+        if (ticket.sla_deadline, ticket.sla_warning_at) != deadlines:
+            ticket.sla_deadline, ticket.sla_warning_at = deadlines
+            changed.append(ticket)
+    if changed:
+        type(changed[0]).objects.bulk_update(changed, ['sla_deadline', 'sla_warning_at'], batch_size=500)
+    return len(changed)
+
+
+def refresh_sla_deadlines(queryset=None, chunk_size=2000):
+    """store_sla_deadlines over the active tickets of `queryset` (all tickets by default), by chunks.
+    Closed tickets keep their deadline (SLA compliance history)"""
+    if queryset is None:
+        queryset = Tickets.objects.all()
+    tickets = queryset.filter(status__in=SLA_ACTIVE_STATUSES).select_related('category')
+    chunk = []
+    updated = 0
+    for ticket in tickets.iterator(chunk_size=chunk_size):
+        chunk.append(ticket)
+        if len(chunk) >= chunk_size:
+            updated += store_sla_deadlines(chunk)
+            chunk = []
+    return updated + store_sla_deadlines(chunk)
+
+
+def sla_scope(sender, instance):
+    """Q of the tickets whose deadline depends on `instance` (calendar or calendar assignment)"""
+    if sender is SlaCalendars:
+        return Q(unit__building__sla_calendar_id=instance.pk) | Q(category__sla_calendar_id=instance.pk)
+    if sender is IssueCategories:
+        return Q(category_id=instance.pk)
+    if sender is Buildings:
+        return Q(unit__building_id=instance.pk)
+    return Q(unit_id=instance.pk)
+
+
+def refresh_saved_sla_scope(sender, instance, **kwargs):
+    """Signal receiver (post_save): a calendar, or the calendar / SLA hours of a category, building or unit
+    changed. The trigger refresh_category_sla_deadlines only recomputes the tickets without a calendar"""
+    invalidate_sla_calendars()
+    refresh_sla_deadlines(Tickets.objects.filter(sla_scope(sender, instance)))
+
+
+def collect_deleted_sla_scope(sender, instance, **kwargs):
+    """Signal receiver (pre_delete): the tickets of `instance`, before ON DELETE SET NULL detaches them"""
+    instance.sla_ticket_ids = list(
+        Tickets.objects.filter(sla_scope(sender, instance), status__in=SLA_ACTIVE_STATUSES)
+        .values_list('ticket_id', flat=True)
+    )
+
+
+def refresh_deleted_sla_scope(sender, instance, **kwargs):
+    """Signal receiver (post_delete): recompute the tickets collected by collect_deleted_sla_scope"""
+    invalidate_sla_calendars()
+    refresh_sla_deadlines(Tickets.objects.filter(ticket_id__in=getattr(instance, 'sla_ticket_ids', [])))
+
+
+def set_saved_ticket_deadline(sender, instance, **kwargs):
+    """Signal receiver (pre_save on Tickets): an active ticket under a calendar is written with its
+    working-hours deadline, which the trigger set_tickets_sla_deadline keeps (one statement per save)"""
+    if instance.status not in SLA_ACTIVE_STATUSES or instance.created_at is None:
+        return
+    if get_ticket_calendar(instance) is None:
+        return
+    instance.sla_deadline, instance.sla_warning_at = get_sla_deadline(instance)
+
+
+# SQL version of the SLA: same rules as get_sla_hours / calculate_sla_status,
+# but computed by PostgreSQL so we can filter, sort and count with LIMIT
+
+def sla_hours_expression():
+    """SQL expression of get_sla_hours: category SLA, else severity fallback"""
+    severity_hours = Case(
+        *[When(severity=severity, then=Value(hours)) for severity, hours in SLA_HOURS.items()],
+        default=Value(24),
+        output_field=IntegerField(),
+    )
+    return Coalesce(NullIf(F('category__sla_hours'), Value(0)), severity_hours)
+
+
+def annotate_sla_due(queryset):
+    """Add sla_hours_db, sla_due_at and sla_warn_at to a Tickets queryset: the stored deadline first
+    (it includes SLA calendars), flat hours from created_at for rows without one"""
+    one_hour = Value(timedelta(hours=1), output_field=DurationField())
+    warning_step = Value(timedelta(hours=1 - SLA_WARNING_RATIO), output_field=DurationField())
+
+    queryset = queryset.annotate(sla_hours_db=sla_hours_expression())
+    return queryset.annotate(
+        sla_due_at=Coalesce(
+            F('sla_deadline'),
+            ExpressionWrapper(F('created_at') + one_hour * F('sla_hours_db'), output_field=DateTimeField()),
+            output_field=DateTimeField()
+        ),
+        sla_warn_at=Coalesce(
+            F('sla_warning_at'),
+            ExpressionWrapper(F('created_at') + warning_step * F('sla_hours_db'), output_field=DateTimeField()),
+            output_field=DateTimeField()
+        ),
+    )
+
+
+def annotate_sla(queryset, now=None):
+    """Add sla_hours_db, sla_due_at, sla_warn_at and sla_state to a Tickets queryset"""
+    if now is None:
+        now = timezone.now()
+
+    queryset = annotate_sla_due(queryset)
+    return queryset.annotate(
+        sla_state=Case(
+            When(status__in=SLA_CLOSED_STATUSES, then=Value('ok')),
+            When(sla_due_at__lt=now, then=Value('breached')),
+            When(sla_warn_at__lt=now, then=Value('warning')),
+            default=Value('ok'),
+        )
+    )
+
+
+def add_annotated_sla_to_tickets(tickets, now):
+    """Same output as add_sla_to_tickets, for tickets coming from annotate_sla"""
+    for ticket in tickets:
+        ticket.sla_status = ticket.sla_state
+        if ticket.status in SLA_CLOSED_STATUSES or ticket.sla_due_at is None:
+            ticket.sla_remaining = None
+        else:
+            hours = abs((ticket.sla_due_at - now).total_seconds()) / 3600
+            ticket.sla_remaining = f"{int(hours)}h"
+    return tickets
+
+
+def sla_counts(queryset):
+    """Number of tickets per SLA state, in one query (queryset from annotate_sla)"""
+    return queryset.aggregate(
+        ok=Count('pk', filter=Q(sla_state='ok')),
+        warning=Count('pk', filter=Q(sla_state='warning')),
+        breached=Count('pk', filter=Q(sla_state='breached')),
+    )
+
+
+# Batch version of the SLA for exports, reports and nightly jobs:
+# columns instead of objects, one reference time for the whole batch
+
+class EpochSeconds(Func):
+    """Interval as seconds (float8, cheap to load into NumPy)"""
+    template = 'EXTRACT(EPOCH FROM %(expressions)s)::float8'
+    output_field = FloatField()
+
+
+class LocalTimestamp(Func):
+    """Timestamp without time zone: naive arithmetic like the Python side (no DST hour when the
+    column is a timestamptz, as in databases built by Django migrations)"""
+    template = '%(expressions)s::timestamp'
+    output_field = DateTimeField()
+
+
+def flat_sla_deadlines(created_at, sla_hours):
+    """(deadlines, warning instants) arrays in flat hours, for columns without a stored deadline"""
+    created_at = np.asarray(created_at, dtype='datetime64[us]')
+    sla_hours = np.asarray(sla_hours, dtype=np.float64)
+    return (created_at + (sla_hours * 3600e6).astype('timedelta64[us]'),
+            created_at + (sla_hours * (1 - SLA_WARNING_RATIO) * 3600e6).astype('timedelta64[us]'))
+
+
+def evaluate_sla_batch(due_at, warn_at, statuses, now=None):
+    """Vectorised calculate_sla_status over columns (deadline, warning instant, status), the
+    sla_due_at / sla_warn_at of annotate_sla_due (stored deadlines, calendars included).
+    Returns (states, remaining_hours) arrays, remaining is NaN for closed tickets"""
+    if now is None:
+        now = timezone.now()
+
+    now = np.datetime64(now, 'us')
+    due_at = np.asarray(due_at, dtype='datetime64[us]')
+    warn_at = np.asarray(warn_at, dtype='datetime64[us]')
+    statuses = np.asarray(statuses, dtype=str)
+
+    remaining = (due_at - now) / np.timedelta64(1, 'h')
+    closed = np.isin(statuses, SLA_CLOSED_STATUSES)
+    breached = ~closed & (due_at < now)
+    warning = ~closed & ~breached & (warn_at < now)
+
+    states = np.full(remaining.shape, 'ok', dtype='<U8')
+    states[warning] = 'warning'
+    states[breached] = 'breached'
+    remaining = np.where(closed, np.nan, np.abs(remaining))
+    return states, remaining
+
+
+def sla_batch_from_queryset(queryset, now=None):
+    """evaluate_sla_batch over a Tickets queryset, returns (ticket_ids, states, remaining_hours)"""
+    if now is None:
+        now = timezone.now()
+
+    # échéances relatives à now, calculées par PostgreSQL: des floats au lieu d'objets datetime
+    def offset(field):
+        return EpochSeconds(ExpressionWrapper(
+            LocalTimestamp(F(field)) - LocalTimestamp(Value(now, output_field=DateTimeField())),
+            output_field=DurationField()
+        ))
+
+    rows = list(
+        annotate_sla_due(queryset).annotate(
+            sla_due_offset=offset('sla_due_at'),
+            sla_warn_offset=offset('sla_warn_at'),
+        ).values_list('ticket_id', 'sla_due_offset', 'sla_warn_offset', 'status')
+    )
+    count = len(rows)
+    ticket_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=count)
+    # created_at NULL: échéance NULL, comptée comme maintenant
+    due_offsets = np.fromiter((row[1] or 0.0 for row in rows), dtype=np.float64, count=count)
+    warn_offsets = np.fromiter((row[2] or 0.0 for row in rows), dtype=np.float64, count=count)
+    statuses = np.array([row[3] or '' for row in rows], dtype=str)
+
+    origin = np.datetime64(now, 'us')
+    states, remaining = evaluate_sla_batch(
+        origin + (due_offsets * 1e6).astype('timedelta64[us]'),
+        origin + (warn_offsets * 1e6).astype('timedelta64[us]'),
+        statuses, now,
+    )
+    return ticket_ids, states, remaining
@@ -0,0 +1,197 @@
+"""SLA calendars: working hours and public holidays for SLA deadlines"""
+
+import time as clock
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+from .models import SlaCalendars, IssueCategories, Units
+
+
+# Compiled calendars are reloaded at most every CALENDAR_CACHE_TTL seconds per process
+# (signals clear the cache right away in the process where the change was saved)
+CALENDAR_CACHE_TTL = 300
+
+# Years compiled around the requested date, the range grows on demand
+CALENDAR_YEARS_MARGIN = 1
+
+
+def easter_sunday(year):
+    """Gregorian Easter (anonymous algorithm)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def geneva_holidays(year):
+    """Public holidays of the canton of Geneva"""
+    easter = easter_sunday(year)
+    first_sunday_september = date(year, 9, 1) + timedelta(days=(6 - date(year, 9, 1).weekday()))
+    return {
+        date(year, 1, 1),                              # Nouvel An
+        easter - timedelta(days=2),                    # Vendredi saint
+        easter + timedelta(days=1),                    # Lundi de Pâques
+        easter + timedelta(days=39),                   # Ascension
+        easter + timedelta(days=50),                   # Lundi de Pentecôte
+        date(year, 8, 1),                              # Fête nationale
+        first_sunday_september + timedelta(days=4),    # Jeûne genevois
+        date(year, 12, 25),                            # Noël
+        date(year, 12, 31),                            # Restauration de la République
+    }
+
+
+HOLIDAY_REGIONS = {
+    'GE': geneva_holidays,
+}
+
+
+class CompiledCalendar:
+    """Working intervals of a calendar over whole years, as minutes since `origin`.
+
+    cumulative[i] = working minutes before interval i, so converting an instant to
+    "working minutes" and back is a bisect in both directions (O(log n))."""
+
+    def __init__(self, work_days, work_start, work_end, holidays, first_year, last_year):
+        self.first_year = first_year
+        self.last_year = last_year
+        self.origin = datetime(first_year, 1, 1)
+
+        start_minutes = work_start.hour * 60 + work_start.minute
+        end_minutes = work_end.hour * 60 + work_end.minute
+
+        self.starts = []
+        self.ends = []
+        self.cumulative = [0]
+        day = self.origin.date()
+        offset = 0
+        while day.year <= last_year:
+            if day.isoweekday() in work_days and day not in holidays and end_minutes > start_minutes:
+                self.starts.append(offset + start_minutes)
+                self.ends.append(offset + end_minutes)
+                self.cumulative.append(self.cumulative[-1] + end_minutes - start_minutes)
+            day += timedelta(days=1)
+            offset += 24 * 60
+
+    def covers(self, moment):
+        return self.first_year <= moment.year <= self.last_year
+
+    def working_minutes_at(self, moment):
+        """Working minutes elapsed between origin and moment"""
+        minutes = (moment - self.origin).total_seconds() / 60
+        i = bisect_right(self.starts, minutes) - 1
+        if i < 0:
+            return 0
+        return self.cumulative[i] + min(minutes, self.ends[i]) - self.starts[i]
+
+    def moment_at(self, working_minutes):
+        """Instant when `working_minutes` working minutes have elapsed since origin
+        (None if it falls after the compiled range)"""
+        if not self.starts or working_minutes > self.cumulative[-1]:
+            return None
+        i = max(bisect_left(self.cumulative, working_minutes) - 1, 0)
+        minutes = self.starts[i] + working_minutes - self.cumulative[i]
+        return self.origin + timedelta(minutes=minutes)
+
+    def add_working_hours(self, start, hours):
+        return self.moment_at(self.working_minutes_at(start) + hours * 60)
+
+
+class SlaCalendar:
+    """A calendar row compiled on demand, the compiled range grows with the dates asked"""
+
+    def __init__(self, calendar):
+        self.calendar_id = calendar.calendar_id
+        self.name = calendar.name
+        self.work_days = {int(day) for day in calendar.work_days.split(',') if day.strip()}
+        self.work_start = calendar.work_start
+        self.work_end = calendar.work_end
+        self.holiday_region = calendar.holiday_region
+        self.compiled = None
+
+    def holidays(self, first_year, last_year):
+        holidays_for_year = HOLIDAY_REGIONS.get(self.holiday_region)
+        if holidays_for_year is None:
+            return set()
+        days = set()
+        for year in range(first_year, last_year + 1):
+            days |= holidays_for_year(year)
+        return days
+
+    def compile(self, first_year, last_year):
+        if self.compiled is not None:
+            first_year = min(first_year, self.compiled.first_year)
+            last_year = max(last_year, self.compiled.last_year)
+        self.compiled = CompiledCalendar(
+            self.work_days, self.work_start, self.work_end,
+            self.holidays(first_year, last_year), first_year, last_year
+        )
+        return self.compiled
+
+    def add_working_hours(self, start, hours):
+        """start + `hours` working hours"""
+        compiled = self.compiled
+        if compiled is None or not compiled.covers(start):
+            compiled = self.compile(start.year - CALENDAR_YEARS_MARGIN, start.year + CALENDAR_YEARS_MARGIN)
+
+        deadline = compiled.add_working_hours(start, hours)
+        while deadline is None:
+            if not compiled.starts:
+                raise ValueError(f"SLA calendar '{self.name}' has no working hours")
+            compiled = self.compile(compiled.first_year, compiled.last_year + 1)
+            deadline = compiled.add_working_hours(start, hours)
+        return deadline
+
+
+class CalendarCache:
+    """Per-process cache: compiled calendars + which category / unit uses which calendar"""
+
+    def __init__(self):
+        self.loaded_at = None
+
+    def clear(self):
+        self.loaded_at = None
+
+    def load(self):
+        self.calendars = {row.calendar_id: SlaCalendar(row) for row in SlaCalendars.objects.all()}
+        self.category_calendars = dict(
+            IssueCategories.objects.filter(sla_calendar__isnull=False)
+            .values_list('category_id', 'sla_calendar_id')
+        )
+        self.unit_calendars = dict(
+            Units.objects.filter(building__sla_calendar__isnull=False)
+            .values_list('unit_id', 'building__sla_calendar_id')
+        )
+        self.loaded_at = clock.monotonic()
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or clock.monotonic() - self.loaded_at > CALENDAR_CACHE_TTL:
+            self.load()
+
+    def for_ticket(self, ticket):
+        """Calendar of the building (contract) first, else of the category, else None (24/7)"""
+        self.ensure_loaded()
+        if not self.calendars:
+            return None
+        calendar_id = self.unit_calendars.get(getattr(ticket, 'unit_id', None))
+        if calendar_id is None:
+            calendar_id = self.category_calendars.get(getattr(ticket, 'category_id', None))
+        return self.calendars.get(calendar_id)
+
+
+calendar_cache = CalendarCache()
+
+
+def get_ticket_calendar(ticket):
+    return calendar_cache.for_ticket(ticket)
+
+
+def invalidate_sla_calendars(**kwargs):
+    """Signal receiver: calendars or their assignment changed"""
+    calendar_cache.clear()
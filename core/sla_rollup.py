@@ -0,0 +1,168 @@
+"""SLA compliance per day x category x building x contractor (table sla_daily_rollup)"""
+
+import json
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import SlaDailyRollup, JobWatermarks
+
+
+SLA_ROLLUP_JOB = 'sla_daily_rollup'
+
+# Each ticket event is counted once, on the day it happens, when the job sees it in its window:
+#   met           completed (resolved_at, else closed_at) before its deadline --> completion day
+#   breached      deadline passed without completion before it               --> deadline day
+#   late_resolved completed after its deadline (+ lateness in hours)         --> completion day
+# The window starts SLA_ROLLUP_OVERLAP before the watermark: sla_rollup_facts keeps the (ticket, fact)
+# already counted, only the new ones are added (re-running a window changes nothing)
+SLA_ROLLUP_SQL = """
+WITH window_tickets AS (
+    SELECT t.ticket_id, t.category_id, u.building_id, t.assigned_contractor_id AS contractor_id,
+           t.sla_deadline, COALESCE(t.resolved_at, t.closed_at) AS done_at
+    FROM tickets t
+    JOIN units u ON u.unit_id = t.unit_id
+    WHERE t.sla_deadline IS NOT NULL
+      AND ((COALESCE(t.resolved_at, t.closed_at) > %(since)s AND COALESCE(t.resolved_at, t.closed_at) <= %(until)s)
+           OR (t.sla_deadline > %(since)s AND t.sla_deadline <= %(until)s))
+),
+facts AS (
+    SELECT ticket_id, 'met' AS fact, done_at::date AS day, category_id, building_id, contractor_id,
+           1 AS met, 0 AS breached, 0 AS late_resolved, 0.0 AS lateness
+    FROM window_tickets
+    WHERE done_at > %(since)s AND done_at <= %(until)s AND done_at <= sla_deadline
+    UNION ALL
+    SELECT ticket_id, 'breached', sla_deadline::date, category_id, building_id, contractor_id, 0, 1, 0, 0.0
+    FROM window_tickets
+    WHERE sla_deadline > %(since)s AND sla_deadline <= %(until)s
+      AND (done_at IS NULL OR done_at > sla_deadline)
+    UNION ALL
+    SELECT ticket_id, 'late_resolved', done_at::date, category_id, building_id, contractor_id, 0, 0, 1,
+           EXTRACT(EPOCH FROM done_at - sla_deadline) / 3600
+    FROM window_tickets
+    WHERE done_at > %(since)s AND done_at <= %(until)s AND done_at > sla_deadline
+),
+new_facts AS (
+    INSERT INTO sla_rollup_facts (ticket_id, fact)
+    SELECT ticket_id, fact FROM facts
+    ON CONFLICT DO NOTHING
+    RETURNING ticket_id, fact
+)
+INSERT INTO sla_daily_rollup AS r
+    (day, category_id, building_id, contractor_id,
+     met_count, breached_count, late_resolved_count, lateness_hours_sum)
+SELECT day, category_id, building_id, contractor_id,
+       SUM(met), SUM(breached), SUM(late_resolved), SUM(lateness)
+FROM facts
+JOIN new_facts USING (ticket_id, fact)
+GROUP BY day, category_id, building_id, contractor_id
+ON CONFLICT (day, COALESCE(category_id, 0), COALESCE(building_id, 0), COALESCE(contractor_id, 0))
+DO UPDATE SET
+    met_count = r.met_count + EXCLUDED.met_count,
+    breached_count = r.breached_count + EXCLUDED.breached_count,
+    late_resolved_count = r.late_resolved_count + EXCLUDED.late_resolved_count,
+    lateness_hours_sum = r.lateness_hours_sum + EXCLUDED.lateness_hours_sum
+"""
+
+# resolved_at / closed_at sont posés avant le COMMIT: un ticket validé après un passage peut être
+# daté d'avant le watermark. La fenêtre est relue avec cette marge (sla_rollup_facts évite les doublons)
+SLA_ROLLUP_OVERLAP = timedelta(hours=1)
+
+
+def update_sla_rollup(now=None):
+    """Add the events between the watermark and now to sla_daily_rollup.
+    The first run (no watermark) processes the whole history. Returns the processed window."""
+    if now is None:
+        now = timezone.now()
+
+    with transaction.atomic():
+        # FOR UPDATE: two jobs at the same time would count the same window twice
+        watermark, _ = JobWatermarks.objects.get_or_create(
+            job_name=SLA_ROLLUP_JOB, defaults={'processed_until': datetime(1970, 1, 1)}
+        )
+        watermark = JobWatermarks.objects.select_for_update().get(job_name=SLA_ROLLUP_JOB)
+        since = watermark.processed_until
+        if now <= since:
+            return since, since
+
+        with connection.cursor() as cursor:
+            cursor.execute(SLA_ROLLUP_SQL, {'since': since - SLA_ROLLUP_OVERLAP, 'until': now})
+
+        watermark.processed_until = now
+        watermark.save()
+    return since, now
+
+
+def rebuild_sla_rollup(now=None):
+    """Empty the rollup and recompute it from the whole history"""
+    with transaction.atomic():
+        SlaDailyRollup.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM sla_rollup_facts")
+        JobWatermarks.objects.filter(job_name=SLA_ROLLUP_JOB).delete()
+        return update_sla_rollup(now)
+
+
+def compliance_rate(met, breached):
+    total = (met or 0) + (breached or 0)
+    return round(100 * (met or 0) / total, 1) if total else None
+
+
+def get_sla_rate(days=30, today=None):
+    """SLA compliance (%) over the last `days` days, one aggregate on sla_daily_rollup"""
+    if today is None:
+        today = timezone.now().date()
+    totals = SlaDailyRollup.objects.filter(day__gt=today - timedelta(days=days)).aggregate(
+        met=Sum('met_count'), breached=Sum('breached_count')
+    )
+    return compliance_rate(totals['met'], totals['breached'])
+
+
+def get_sla_trend(days=30, today=None):
+    """Data for the SLA charts of admin_reports, read from sla_daily_rollup only
+    (cost depends on `days`, not on the number of tickets)"""
+    if today is None:
+        today = timezone.now().date()
+    first_day = today - timedelta(days=days - 1)
+    rows = SlaDailyRollup.objects.filter(day__gte=first_day, day__lte=today)
+
+    per_day = {
+        row['day']: row for row in rows.values('day').annotate(
+            met=Sum('met_count'), breached=Sum('breached_count')
+        )
+    }
+    labels, met, breached, rate = [], [], [], []
+    for i in range(days):
+        day = first_day + timedelta(days=i)
+        row = per_day.get(day, {})
+        labels.append(day.strftime('%d/%m'))
+        met.append(row.get('met') or 0)
+        breached.append(row.get('breached') or 0)
+        rate.append(compliance_rate(row.get('met'), row.get('breached')))
+
+    totals = rows.aggregate(
+        met=Sum('met_count'), breached=Sum('breached_count'),
+        late=Sum('late_resolved_count'), lateness=Sum('lateness_hours_sum'),
+    )
+    avg_lateness = round(totals['lateness'] / totals['late'], 1) if totals['late'] else None
+
+    by_category = [
+        {'name': row['category__name'] or 'Sans catégorie',
+         'met': row['met'], 'breached': row['breached'],
+         'rate': compliance_rate(row['met'], row['breached'])}
+        for row in rows.values('category__name').annotate(
+            met=Sum('met_count'), breached=Sum('breached_count')
+        ).order_by('category__name')
+    ]
+
+    return {
+        'labels': json.dumps(labels),
+        'met': json.dumps(met),
+        'breached': json.dumps(breached),
+        'rate': json.dumps(rate),
+        'total_rate': compliance_rate(totals['met'], totals['breached']),
+        'avg_lateness': avg_lateness,
+        'by_category': by_category,
+    }
@@ -0,0 +1,125 @@
+"""SLA scheduler: min-heap of upcoming warning / breach instants of the active tickets"""
+
+import heapq
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Tickets, SlaEvents
+from .sla import SLA_ACTIVE_STATUSES
+
+
+logger = logging.getLogger(__name__)
+
+# updated_at est l'heure du début de la transaction: une ligne validée après le rechargement peut
+# porter un updated_at antérieur au watermark. Relu avec cette marge (track ignore ce qui n'a pas changé)
+RELOAD_OVERLAP = timedelta(minutes=5)
+
+
+class SlaScheduler:
+    """Keeps (instant, ticket_id, event_type) in a heap and records the due ones in sla_events.
+
+    Heap entries are never removed: when a ticket changes, its new instants are pushed
+    and stale entries are skipped when popped (they no longer match self.deadlines)."""
+
+    def __init__(self):
+        self.heap = []
+        self.deadlines = {}  # ticket_id -> (sla_warning_at, sla_deadline) of the active tickets
+        self.watermark = None
+        self.started_at = timezone.now()
+
+    def track(self, ticket_id, status, warning_at, deadline):
+        if status not in SLA_ACTIVE_STATUSES or deadline is None:
+            self.deadlines.pop(ticket_id, None)
+            return
+        if self.deadlines.get(ticket_id) == (warning_at, deadline):
+            return
+        self.deadlines[ticket_id] = (warning_at, deadline)
+        if warning_at is not None:
+            heapq.heappush(self.heap, (warning_at, ticket_id, 'warning'))
+        heapq.heappush(self.heap, (deadline, ticket_id, 'breached'))
+
+    def load(self):
+        """Full load of the active tickets (at start)"""
+        self.heap = []
+        self.deadlines = {}
+        self.started_at = self.watermark = timezone.now()
+        rows = Tickets.objects.filter(status__in=SLA_ACTIVE_STATUSES).values_list(
+            'ticket_id', 'status', 'sla_warning_at', 'sla_deadline'
+        )
+        for row in rows.iterator(chunk_size=5000):
+            self.track(*row)
+        logger.info("SLA scheduler: %s tickets actifs chargés", len(self.deadlines))
+
+    def reload_changes(self):
+        """Incremental reload: tickets created or updated since the last load (minus RELOAD_OVERLAP)"""
+        since = self.watermark - RELOAD_OVERLAP
+        self.watermark = timezone.now()
+        rows = Tickets.objects.filter(updated_at__gte=since).values_list(
+            'ticket_id', 'status', 'sla_warning_at', 'sla_deadline'
+        )
+        count = 0
+        for row in rows.iterator(chunk_size=5000):
+            self.track(*row)
+            count += 1
+        return count
+
+    def next_due(self):
+        """Instant of the next valid event, None if nothing is scheduled"""
+        while self.heap:
+            instant, ticket_id, event_type = self.heap[0]
+            if self.is_current(instant, ticket_id, event_type):
+                return instant
+            heapq.heappop(self.heap)
+        return None
+
+    def is_current(self, instant, ticket_id, event_type):
+        deadlines = self.deadlines.get(ticket_id)
+        if deadlines is None:
+            return False
+        return instant == (deadlines[0] if event_type == 'warning' else deadlines[1])
+
+    def fire_due(self, now=None):
+        """Record every event due at `now` in sla_events, returns the number of events"""
+        if now is None:
+            now = timezone.now()
+        events = []
+        while self.heap and self.heap[0][0] <= now:
+            instant, ticket_id, event_type = heapq.heappop(self.heap)
+            if not self.is_current(instant, ticket_id, event_type):
+                continue
+            events.append(SlaEvents(
+                ticket_id=ticket_id,
+                event_type=event_type,
+                due_at=instant,
+                # échu avant le démarrage du worker (premier chargement, arrêt): daté de l'échéance
+                created_at=now if instant >= self.started_at else instant,
+            ))
+        if not events:
+            return 0
+
+        # tickets supprimés depuis leur chargement: plus de ligne pour la clé étrangère
+        ticket_ids = {event.ticket_id for event in events}
+        existing = set(Tickets.objects.filter(pk__in=ticket_ids).values_list('pk', flat=True))
+        for ticket_id in ticket_ids - existing:
+            self.deadlines.pop(ticket_id, None)
+        events = [event for event in events if event.ticket_id in existing]
+
+        # (ticket, type, due_at) unique: restarting the worker doesn't duplicate events
+        try:
+            with transaction.atomic():
+                SlaEvents.objects.bulk_create(events, ignore_conflicts=True)
+        except IntegrityError:
+            # ticket supprimé entre la vérification et l'INSERT: un événement à la fois
+            recorded = []
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        SlaEvents.objects.bulk_create([event], ignore_conflicts=True)
+                    recorded.append(event)
+                except IntegrityError:
+                    self.deadlines.pop(event.ticket_id, None)
+            events = recorded
+        return len(events)
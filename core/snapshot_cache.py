@@ -0,0 +1,63 @@
+"""Versioned snapshots in the Django cache: the version is a change counter bumped by trigger"""
+
+import time
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from .models import ChangeCounters
+
+
+# A snapshot is also rebuilt after SNAPSHOT_TTL seconds (SLA states move with time, not only with writes)
+SNAPSHOT_TTL = 60
+
+# Max time one process may spend rebuilding before another one takes over
+REBUILD_LOCK_TIMEOUT = 30
+REBUILD_WAIT_STEP = 0.05
+
+
+def get_version(name):
+    # somme des shards: chaque COMMIT qui touche le compteur l'augmente
+    return ChangeCounters.objects.filter(name=name).aggregate(version=Sum('version'))['version'] or 0
+
+
+def get_snapshot(name, build, ttl=SNAPSHOT_TTL):
+    """Cached result of build() for the current version of the counter `name`.
+
+    Single-flight: only the process holding the lock rebuilds, the others get the
+    previous snapshot meanwhile (or wait for the new one if there is none yet)."""
+    key = f'snapshot:{name}:{get_version(name)}'
+    snapshot = cache.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    lock_key = f'{key}:lock'
+    latest_key = f'snapshot:{name}:latest'
+    if not cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        snapshot = cache.get(latest_key)
+        if snapshot is not None:
+            return snapshot
+        snapshot = wait_for(key, lock_key)
+        if snapshot is not None:
+            return snapshot
+
+    try:
+        snapshot = build()
+        cache.set(key, snapshot, ttl)
+        cache.set(latest_key, snapshot, ttl)
+    finally:
+        cache.delete(lock_key)
+    return snapshot
+
+
+def wait_for(key, lock_key):
+    """Snapshot built by the lock holder, None if the lock was released or expired without it"""
+    deadline = time.monotonic() + REBUILD_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_WAIT_STEP)
+        snapshot = cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        if cache.get(lock_key) is None:
+            return None
+    return None
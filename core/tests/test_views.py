@@ -1,14 +1,114 @@
 """Unit tests """
 
-from django.test import TestCase, Client
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from PIL import Image
 from core.models import (
     Users, Owners, Buildings, Units, Tenants, Tickets,
-    Contractors, IssueCategories
+    Contractors, IssueCategories, SlaCalendars, SlaEvents, SlaDailyRollup, TicketDailyStats,
+    ChangeCounters, Parts, Messages, Attachments, ContractorAssignments, DjangoSession
 )
-from core.sla import get_sla_hours, calculate_sla_status, add_sla_to_tickets
+from core.sla import (
+    get_sla_hours, calculate_sla_status, add_sla_to_tickets,
+    annotate_sla, sla_counts, evaluate_sla_batch, sla_batch_from_queryset,
+    get_sla_deadline, store_sla_deadlines
+)
+from core.sla_calendar import SlaCalendar, geneva_holidays
+from core.sla_scheduler import SlaScheduler
+from core.sla_rollup import update_sla_rollup, get_sla_trend
+from core.activity import get_activity_page
+from core.asgi import watch_disconnect
+from core.live_stats import SUBSCRIBER_QUEUE_SIZE, TICKET_STATS_VERSION_KEY, broadcaster
+from core.export import stream_export
+from core.keyset import estimate_count, keyset_page
+from core.message_thread import THREAD_PAGE_SIZE
+from core.principals import principal_key
+from core.photo_derivatives import (
+    PHOTO_POOL_ATTEMPTS, PhotoPoolBroken, isolate_photos, pending_photos, photo_pool, process_pending_photos,
+)
+from core.session_sweeper import purge_expired_sessions
+from core.search import search_tickets, filter_tickets_by_place, lookup_places, trigram_available
+from core.snapshot_cache import get_snapshot
+from core.ticket_rows import AdminTicketRow, TenantTicketRow
+from core.ticket_stats import backfill_ticket_daily_stats, status_counts, category_counts
+from core.views_admin import (
+    TICKETS_PAGE_SIZE,
+    get_chart_data, month_starts, admin_dashboard_async,
+    build_dashboard_snapshot, build_dashboard_snapshot_concurrent
+)
+
+# Requêtes SQL d'un affichage du dashboard admin sans cache (session + utilisateur + version compris),
+# indépendant du nombre de tickets, de mois et de catégories
+DASHBOARD_QUERY_BUDGET = 19
+
+# Requêtes SQL d'une page de détail de ticket (session comprise, utilisateur en cache), par portail,
+# indépendant du nombre de messages, de photos et d'expéditeurs
+DETAIL_QUERY_BUDGETS = {'admin': 5, 'tenant': 4, 'contractor': 6}
+
+
+def add_detail_rows(ticket, tenant, contractor, user, count=3):
+    """Messages of every sender (internal notes included) and photos on `ticket`"""
+    for i in range(count):
+        Messages.objects.create(ticket=ticket, tenant_sender=tenant, message_text=f"Locataire {i}",
+                                is_internal=False, created_at=timezone.now())
+        Messages.objects.create(ticket=ticket, contractor_sender=contractor, message_text=f"Contractor {i}",
+                                is_internal=False, created_at=timezone.now())
+        if user is not None:
+            Messages.objects.create(ticket=ticket, user_sender=user, message_text=f"Note interne {i}",
+                                    is_internal=True, created_at=timezone.now())
+        Attachments.objects.create(ticket=ticket, tenant_uploader=tenant, file_name=f"photo{i}.jpg",
+                                   file_path=f"tickets/{ticket.ticket_id}/photo{i}.jpg", created_at=timezone.now())
+
+
+class TicketFixturesMixin:
+    """Owner, building, unit, tenant and a 24h SLA category, with create_ticket for their tickets"""
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.owner = Owners.objects.create(name="Owner", email="owner@test.ch", created_at=self.now)
+        self.building = Buildings.objects.create(
+            owner=self.owner, name="Building", address="Address", created_at=self.now
+        )
+        self.unit = Units.objects.create(building=self.building, unit_number="1", created_at=self.now)
+        self.tenant = Tenants.objects.create(
+            unit=self.unit, first_name="Jean", last_name="Test", email="tenant@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        self.category = IssueCategories.objects.create(name="Test Category", sla_hours=24)
+
+    def create_ticket(self, hours_ago=0, status="open", resolved_hours_ago=None, **fields):
+        """Ticket created `hours_ago` hours before self.now, in self.category unless `fields` say otherwise"""
+        return Tickets.objects.create(**{
+            'tenant': self.tenant, 'unit': self.unit, 'category': self.category, 'title': "Test",
+            'description': "Test", 'severity': "medium", 'status': status,
+            'created_at': self.now - timedelta(hours=hours_ago),
+            'resolved_at': self.now - timedelta(hours=resolved_hours_ago) if resolved_hours_ago is not None else None,
+            'updated_at': self.now,
+            **fields,
+        })
+
 
 class SLAFunctionsTests(TestCase):
 
@@ -151,9 +251,449 @@ class SLAFunctionsTests(TestCase):
         self.assertTrue(hasattr(tickets[0], 'sla_status'))
 
 
+class SLAQuerysetTests(TicketFixturesMixin, TestCase):
+
+    def test_annotate_sla_matches_calculate_sla_status(self):
+        self.create_ticket(1)
+        self.create_ticket(20)
+        self.create_ticket(30)
+        self.create_ticket(30, status="resolved")
+        self.create_ticket(1, category=None, severity="critical")
+        self.create_ticket(7, category=None, severity="high")
+        self.create_ticket(100, category=None, severity="low")
+
+        tickets = annotate_sla(Tickets.objects.select_related('category'))
+        for ticket in tickets:
+            expected, _ = calculate_sla_status(ticket)
+            self.assertEqual(ticket.sla_state, expected)
+
+    def test_sla_counts(self):
+        self.create_ticket(1)
+        self.create_ticket(20)
+        self.create_ticket(30)
+        self.create_ticket(30, category=None, severity="low")
+
+        counts = sla_counts(annotate_sla(Tickets.objects.all()))
+        self.assertEqual(counts, {'ok': 2, 'warning': 1, 'breached': 1})
+
+    def test_category_sla_overrides_severity(self):
+        ticket = self.create_ticket(10, severity="critical")
+        annotated = annotate_sla(Tickets.objects.filter(pk=ticket.pk)).get()
+        self.assertEqual(annotated.sla_hours_db, 24)
+        self.assertEqual(annotated.sla_state, 'ok')
+
+    def test_evaluate_sla_batch_matches_calculate_sla_status(self):
+        self.create_ticket(1)
+        self.create_ticket(20)
+        self.create_ticket(30)
+        self.create_ticket(30, status="closed")
+        self.create_ticket(100, category=None, severity="low")
+
+        tickets = list(Tickets.objects.select_related('category').order_by('ticket_id'))
+        deadlines = [get_sla_deadline(t) for t in tickets]
+        states, remaining = evaluate_sla_batch(
+            [due for due, _ in deadlines],
+            [warn for _, warn in deadlines],
+            [t.status for t in tickets],
+        )
+        for ticket, state, hours in zip(tickets, states, remaining):
+            expected_state, expected_hours = calculate_sla_status(ticket)
+            self.assertEqual(state, expected_state)
+            if expected_hours is None:
+                self.assertTrue(hours != hours)
+            else:
+                self.assertAlmostEqual(hours, expected_hours, places=1)
+
+    def test_sla_batch_from_queryset(self):
+        ok = self.create_ticket(1)
+        late = self.create_ticket(30)
+
+        ticket_ids, states, remaining = sla_batch_from_queryset(
+            Tickets.objects.order_by('ticket_id'), self.now
+        )
+        self.assertEqual(list(ticket_ids), [ok.ticket_id, late.ticket_id])
+        self.assertEqual(list(states), ['ok', 'breached'])
+        self.assertAlmostEqual(remaining[1], 6, places=3)
+
+    def test_sla_deadline_set_by_trigger(self):
+        ticket = self.create_ticket(1)
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.sla_deadline, ticket.created_at + timedelta(hours=24))
+        self.assertEqual(ticket.sla_warning_at, ticket.created_at + timedelta(hours=18))
+
+    def test_sla_deadline_follows_category_sla_hours(self):
+        ticket = self.create_ticket(1)
+        closed = self.create_ticket(1, status="closed")
+        self.category.sla_hours = 4
+        self.category.save()
+        ticket.refresh_from_db()
+        closed.refresh_from_db()
+        self.assertEqual(ticket.sla_deadline, ticket.created_at + timedelta(hours=4))
+        self.assertEqual(closed.sla_deadline, closed.created_at + timedelta(hours=24))
+
+    def test_category_sla_refresh_keeps_updated_at(self):
+        with connection.cursor() as cursor:
+            # trigger de SQL_Fixly.sql, pas créé par les migrations
+            cursor.execute("CREATE TRIGGER update_tickets_updated_at BEFORE UPDATE ON tickets "
+                           "FOR EACH ROW EXECUTE FUNCTION update_ticket_updated_at()")
+        ticket = self.create_ticket(1, updated_at=self.now - timedelta(days=3))
+        self.category.sla_hours = 4
+        self.category.save()
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.sla_deadline, ticket.created_at + timedelta(hours=4))
+        self.assertEqual(ticket.updated_at, self.now - timedelta(days=3))
+
+        Tickets.objects.filter(pk=ticket.pk).update(title="Modifié")
+        ticket.refresh_from_db()
+        self.assertGreater(ticket.updated_at, self.now - timedelta(days=1))
+
+
+class SLACalendarTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.calendar = SlaCalendars.objects.create(
+            name="Genève ouvrés",
+            work_days="1,2,3,4,5",
+            work_start=time(8, 0),
+            work_end=time(17, 0),
+            holiday_region="GE"
+        )
+        self.owner = Owners.objects.create(name="Owner", email="owner@test.ch", created_at=self.now)
+        self.building = Buildings.objects.create(
+            owner=self.owner,
+            name="Building",
+            address="Rue de Champel 42",
+            sla_calendar=self.calendar,
+            created_at=self.now
+        )
+        self.unit = Units.objects.create(building=self.building, unit_number="1", created_at=self.now)
+        self.tenant = Tenants.objects.create(
+            unit=self.unit, first_name="Jean", last_name="Test", email="tenant@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        self.category = IssueCategories.objects.create(name="Fuite", sla_hours=4)
+
+    def test_geneva_holidays(self):
+        holidays = geneva_holidays(2026)
+        self.assertIn(date(2026, 4, 3), holidays)    # Vendredi saint
+        self.assertIn(date(2026, 5, 14), holidays)   # Ascension
+        self.assertIn(date(2026, 9, 10), holidays)   # Jeûne genevois
+        self.assertIn(date(2026, 12, 31), holidays)
+        self.assertEqual(len(holidays), 9)
+
+    def test_deadline_skips_nights_weekends_and_holidays(self):
+        calendar = SlaCalendar(self.calendar)
+        # vendredi 16h + 2h ouvrées --> lundi 9h
+        self.assertEqual(calendar.add_working_hours(datetime(2026, 10, 16, 16, 0), 2), datetime(2026, 10, 19, 9, 0))
+        # jeudi 24 décembre 16h, Noël + week-end --> lundi 28 9h
+        self.assertEqual(calendar.add_working_hours(datetime(2026, 12, 24, 16, 0), 2), datetime(2026, 12, 28, 9, 0))
+        # samedi --> le compteur démarre lundi 8h
+        self.assertEqual(calendar.add_working_hours(datetime(2026, 10, 17, 11, 0), 4), datetime(2026, 10, 19, 12, 0))
+        # fin pile à la fermeture: 17h le jour même, pas 8h le lendemain
+        self.assertEqual(calendar.add_working_hours(datetime(2026, 10, 19, 8, 0), 9), datetime(2026, 10, 19, 17, 0))
+
+    def test_compiled_range_grows_on_demand(self):
+        calendar = SlaCalendar(self.calendar)
+        deadline = calendar.add_working_hours(datetime(2026, 6, 1, 8, 0), 9 * 250 * 3)
+        self.assertGreaterEqual(deadline.year, 2029)
+        self.assertGreaterEqual(calendar.compiled.last_year, deadline.year)
+
+    def test_building_calendar_used_for_ticket(self):
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite", description="Test",
+            severity="medium", status="open", created_at=datetime(2026, 10, 16, 16, 0),
+            updated_at=self.now
+        )
+        deadline, warning_at = get_sla_deadline(ticket)
+        self.assertEqual(deadline, datetime(2026, 10, 19, 11, 0))
+        self.assertEqual(warning_at, datetime(2026, 10, 19, 10, 0))
+
+        # écrite à la création (signal), rien à corriger ensuite
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.sla_deadline, deadline)
+        self.assertEqual(ticket.sla_warning_at, warning_at)
+        self.assertEqual(store_sla_deadlines([ticket]), 0)
+
+    def test_ticket_save_writes_calendar_deadline_once(self):
+        ticket = Tickets(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite", description="Test",
+            severity="medium", status="open", created_at=datetime(2026, 10, 16, 16, 0), updated_at=self.now
+        )
+        with CaptureQueriesContext(connection) as queries:
+            ticket.save()
+        self.assertEqual(len([q for q in queries.captured_queries if 'tickets' in q['sql']]), 1)
+        deadline = Tickets.objects.values_list('sla_deadline', flat=True).get(pk=ticket.pk)
+        self.assertEqual(deadline, datetime(2026, 10, 19, 11, 0))
+
+        # save() réécrit toutes les colonnes: sans changement du SLA, le trigger ne recalcule rien
+        ticket.status = 'in_progress'
+        with CaptureQueriesContext(connection) as queries:
+            ticket.save()
+        self.assertEqual(len([q for q in queries.captured_queries if 'tickets' in q['sql']]), 1)
+        self.assertEqual(Tickets.objects.values_list('sla_deadline', flat=True).get(pk=ticket.pk), deadline)
+
+    def test_without_calendar_sla_stays_continuous(self):
+        self.building.sla_calendar = None
+        self.building.save()
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite", description="Test",
+            severity="medium", status="open", created_at=datetime(2026, 10, 16, 16, 0),
+            updated_at=self.now
+        )
+        deadline, _ = get_sla_deadline(ticket)
+        self.assertEqual(deadline, datetime(2026, 10, 16, 20, 0))
+        ticket.refresh_from_db()
+        self.assertEqual(store_sla_deadlines([ticket]), 0)
+
+    def test_stored_deadlines_follow_calendar_changes(self):
+        def stored_deadline():
+            return Tickets.objects.values_list('sla_deadline', flat=True).get(pk=ticket.pk)
+
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite", description="Test",
+            severity="medium", status="open", created_at=datetime(2026, 10, 16, 16, 0),
+            updated_at=self.now
+        )
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 19, 11, 0))
+
+        # SLA de la catégorie modifié: le trigger laisse ce ticket sous calendrier, le signal le recalcule
+        self.category.sla_hours = 6
+        self.category.save()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 19, 13, 0))
+
+        # calendrier retiré de l'immeuble: retour aux heures continues
+        self.building.sla_calendar = None
+        self.building.save()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 16, 22, 0))
+
+        # calendrier attribué à la catégorie, horaires modifiés, puis calendrier supprimé
+        self.category.sla_calendar = self.calendar
+        self.category.save()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 19, 13, 0))
+        self.calendar.work_start = time(9, 0)
+        self.calendar.save()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 19, 14, 0))
+        self.calendar.delete()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 16, 22, 0))
+
+        # severité modifiée sur un ticket d'un immeuble sous calendrier
+        self.building.sla_calendar = SlaCalendars.objects.create(name="Ouvrés", work_days="1,2,3,4,5",
+                                                                 work_start=time(8, 0), work_end=time(17, 0))
+        self.building.save()
+        ticket.refresh_from_db()
+        ticket.category = None
+        ticket.severity = 'high'
+        ticket.save()
+        self.assertEqual(stored_deadline(), datetime(2026, 10, 19, 15, 0))
+
+    def test_export_and_batch_use_calendar_deadline(self):
+        # créé un samedi à venir: 4h ouvrées --> lundi, alors que 4h continues --> samedi 4h
+        saturday = datetime.combine(self.now.date() + timedelta(days=(5 - self.now.weekday()) % 7 + 7), time(0, 0))
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite", description="Fuite",
+            severity="low", status="open", created_at=saturday, updated_at=self.now
+        )
+        deadline, _ = get_sla_deadline(ticket)
+        self.assertGreater(deadline, saturday + timedelta(hours=4))
+
+        line = json.loads(''.join(stream_export('jsonl')))
+        self.assertEqual(line['sla_status'], 'ok')
+        self.assertAlmostEqual(line['sla_remaining_hours'], (deadline - timezone.now()).total_seconds() / 3600, delta=0.1)
+
+        ticket_ids, states, remaining = sla_batch_from_queryset(Tickets.objects.all())
+        self.assertEqual(list(ticket_ids), [ticket.ticket_id])
+        self.assertEqual(list(states), [annotate_sla(Tickets.objects.all()).get().sla_state])
+        self.assertAlmostEqual(remaining[0], (deadline - timezone.now()).total_seconds() / 3600, delta=0.1)
+
+
+class SLASchedulerTests(TicketFixturesMixin, TestCase):
+
+    def test_due_events_recorded_once(self):
+        late = self.create_ticket(30)
+        self.create_ticket(30, status="resolved")
+        scheduler = SlaScheduler()
+        scheduler.load()
+
+        self.assertEqual(scheduler.fire_due(self.now), 2)
+        self.assertEqual(
+            set(SlaEvents.objects.values_list('ticket_id', 'event_type')),
+            {(late.ticket_id, 'warning'), (late.ticket_id, 'breached')}
+        )
+        # échus avant le démarrage du worker: datés de leur échéance, pas de maintenant
+        for event in SlaEvents.objects.all():
+            self.assertEqual(event.created_at, event.due_at)
+        # redémarrage du worker: pas de doublon
+        restarted = SlaScheduler()
+        restarted.load()
+        restarted.fire_due(self.now)
+        self.assertEqual(SlaEvents.objects.count(), 2)
+
+    def test_next_due_is_next_instant(self):
+        ticket = self.create_ticket(1)
+        ticket.refresh_from_db()
+        scheduler = SlaScheduler()
+        scheduler.load()
+        self.assertEqual(scheduler.next_due(), ticket.sla_warning_at)
+        self.assertEqual(scheduler.fire_due(self.now), 0)
+        self.assertEqual(scheduler.fire_due(ticket.sla_deadline), 2)
+
+    def test_reload_drops_resolved_ticket(self):
+        ticket = self.create_ticket(1)
+        scheduler = SlaScheduler()
+        scheduler.load()
+
+        Tickets.objects.filter(pk=ticket.pk).update(status='resolved', updated_at=timezone.now())
+        self.assertEqual(scheduler.reload_changes(), 1)
+        self.assertIsNone(scheduler.next_due())
+        self.assertEqual(scheduler.fire_due(self.now + timedelta(days=2)), 0)
+
+    def test_reload_overlaps_watermark(self):
+        ticket = self.create_ticket(1)
+        scheduler = SlaScheduler()
+        scheduler.load()
+        scheduler.reload_changes()
+
+        # validé après le rechargement, updated_at = début de sa transaction (avant le watermark)
+        Tickets.objects.filter(pk=ticket.pk).update(status='resolved', updated_at=scheduler.watermark - timedelta(minutes=1))
+        self.assertEqual(scheduler.reload_changes(), 1)
+        self.assertNotIn(ticket.ticket_id, scheduler.deadlines)
+
+    def test_deleted_ticket_skipped(self):
+        deleted = self.create_ticket(30)
+        late = self.create_ticket(30)
+        scheduler = SlaScheduler()
+        scheduler.load()
+        deleted.delete()
+
+        now = timezone.now()
+        self.assertEqual(scheduler.fire_due(now), 2)
+        self.assertEqual(set(SlaEvents.objects.values_list('ticket_id', flat=True)), {late.ticket_id})
+        self.assertNotIn(deleted.ticket_id, scheduler.deadlines)
+
+
+class SLARollupTests(TicketFixturesMixin, TestCase):
+
+    def totals(self):
+        rows = SlaDailyRollup.objects.all()
+        return (
+            sum(r.met_count for r in rows),
+            sum(r.breached_count for r in rows),
+            sum(r.late_resolved_count for r in rows),
+            sum(r.lateness_hours_sum for r in rows),
+        )
+
+    def test_rollup_counts_met_breached_and_lateness(self):
+        self.create_ticket(30, status="resolved", resolved_hours_ago=20)   # résolu en 10h: dans les délais
+        self.create_ticket(30)                                             # ouvert, échéance passée il y a 6h
+        self.create_ticket(40, status="resolved", resolved_hours_ago=12)   # résolu 4h après l'échéance
+        self.create_ticket(1)                                              # échéance dans le futur
+
+        update_sla_rollup(self.now)
+        met, breached, late, lateness = self.totals()
+        self.assertEqual((met, breached, late), (1, 2, 1))
+        self.assertAlmostEqual(lateness, 4, places=3)
+
+    def test_rollup_is_incremental(self):
+        ticket = self.create_ticket(30)
+        update_sla_rollup(self.now)
+        update_sla_rollup(self.now)
+        self.assertEqual(self.totals()[:3], (0, 1, 0))
+
+        # résolu plus tard: compté comme résolu en retard, pas une 2e fois comme dépassé
+        later = self.now + timedelta(hours=2)
+        Tickets.objects.filter(pk=ticket.pk).update(status='resolved', resolved_at=later - timedelta(hours=1))
+        update_sla_rollup(later)
+        met, breached, late, lateness = self.totals()
+        self.assertEqual((met, breached, late), (0, 1, 1))
+        self.assertAlmostEqual(lateness, 7, places=3)
+
+    def test_rollup_rereads_overlap_once(self):
+        ticket = self.create_ticket(10)
+        update_sla_rollup(self.now)
+        self.assertEqual(self.totals()[:3], (0, 0, 0))
+
+        # résolu avant le passage mais validé après: resolved_at derrière le watermark
+        Tickets.objects.filter(pk=ticket.pk).update(status='resolved', resolved_at=self.now - timedelta(minutes=10))
+        update_sla_rollup(self.now + timedelta(minutes=15))
+        self.assertEqual(self.totals()[:3], (1, 0, 0))
+
+        # fenêtre relue: rien compté deux fois
+        update_sla_rollup(self.now + timedelta(minutes=30))
+        self.assertEqual(self.totals()[:3], (1, 0, 0))
+
+    def test_sla_trend(self):
+        self.create_ticket(30, status="resolved", resolved_hours_ago=20)
+        self.create_ticket(30)
+        update_sla_rollup(self.now)
+        trend = get_sla_trend(30, today=self.now.date())
+        self.assertEqual(trend['total_rate'], 50.0)
+        self.assertEqual(trend['by_category'][0]['name'], "Test Category")
+
+
+class TicketDailyStatsTests(TicketFixturesMixin, TestCase):
+
+    def snapshot(self):
+        return sorted(
+            TicketDailyStats.objects.filter(Q(ticket_count__gt=0) | Q(resolved_count__gt=0)).values_list(
+                'day', 'category_id', 'building_id', 'status', 'contractor_id', 'ticket_count', 'resolved_count'
+            )
+        )
+
+    def test_trigger_counts_inserts(self):
+        self.create_ticket()
+        self.create_ticket(72)
+        self.assertEqual(status_counts()['open'], 2)
+        self.assertEqual(category_counts(5), [{'name': "Test Category", 'ticket_count': 2}])
+
+    def test_trigger_follows_status_changes(self):
+        ticket = self.create_ticket()
+        Tickets.objects.filter(pk=ticket.pk).update(status='in_progress')
+        Tickets.objects.filter(pk=ticket.pk).update(status='resolved', resolved_at=self.now)
+        counts = status_counts()
+        self.assertEqual((counts['open'], counts['in_progress'], counts['resolved']), (0, 0, 1))
+        self.assertEqual(TicketDailyStats.objects.filter(resolved_count=1).count(), 1)
+
+        Tickets.objects.filter(pk=ticket.pk).delete()
+        self.assertEqual(self.snapshot(), [])
+
+    def test_backfill_matches_trigger(self):
+        self.create_ticket(960)
+        resolved = self.create_ticket(240)
+        Tickets.objects.filter(pk=resolved.pk).update(status='resolved', resolved_at=self.now)
+        self.create_ticket(status='in_progress')
+        expected = self.snapshot()
+
+        backfill_ticket_daily_stats(chunk_size=1)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_unit_delete_cascade_decrements(self):
+        other_unit = Units.objects.create(building=self.building, unit_number="2", created_at=self.now)
+        self.create_ticket()
+        resolved = self.create_ticket(48)
+        Tickets.objects.filter(pk=resolved.pk).update(status='resolved', resolved_at=self.now)
+        Tickets.objects.create(tenant=self.tenant, unit=other_unit, category=self.category, title="Test",
+                               description="Test", severity="low", status="open", created_at=self.now,
+                               updated_at=self.now)
+
+        Tenants.objects.filter(pk=self.tenant.pk).update(unit=other_unit)  # déménagé, gardé
+
+        # ON DELETE CASCADE de SQL_Fixly.sql: le logement a disparu quand le trigger des tickets s'exécute
+        with connection.cursor() as cursor:
+            cursor.execute("WITH unit AS (DELETE FROM units WHERE unit_id = %s RETURNING unit_id) "
+                           "DELETE FROM tickets WHERE unit_id IN (SELECT unit_id FROM unit)", [self.unit.unit_id])
+
+        # même résultat qu'un GROUP BY sur les tickets restants
+        counted = self.snapshot()
+        backfill_ticket_daily_stats()
+        self.assertEqual(counted, self.snapshot())
+        self.assertEqual(status_counts()['open'], 1)
+
+
 class AdminAuthTests(TestCase):
 
     def setUp(self):
+        cache.clear()  # versions du cache rejouées d'un test à l'autre (rollback)
         self.client = Client()
         self.now = timezone.now()
         from django.contrib.auth.hashers import make_password
@@ -201,10 +741,26 @@ class AdminAuthTests(TestCase):
         response = self.client.get(reverse('admin_dashboard'))
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_principal_cached_until_deactivated(self):
+        session = self.client.session
+        session['user_id'] = self.admin.user_id
+        session.save()
+        self.client.get(reverse('change_password'))
+        # session seulement: utilisateur en cache
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('change_password'))
+        self.assertContains(response, "admin")
+
+        self.admin.is_active = False
+        self.admin.save()
+        response = self.client.get(reverse('change_password'))
+        self.assertRedirects(response, reverse('admin_login'), fetch_redirect_response=False)
+
 
 class AdminViewsTests(TestCase):
 
     def setUp(self):
+        cache.clear()  # versions du cache rejouées d'un test à l'autre (rollback)
         self.client = Client()
         self.now = timezone.now()
         from django.contrib.auth.hashers import make_password
@@ -268,16 +824,410 @@ class AdminViewsTests(TestCase):
         response = self.client.get(reverse('admin_dashboard'))
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_dashboard_sla_panels(self):
+        Tickets.objects.create(
+            tenant=self.tenant,
+            unit=self.unit,
+            title="Late Ticket",
+            description="Description",
+            severity="medium",
+            status="open",
+            created_at=self.now - timedelta(hours=48),
+            updated_at=self.now
+        )
+        Tickets.objects.create(
+            tenant=self.tenant,
+            unit=self.unit,
+            title="Urgent Ticket",
+            description="Description",
+            severity="medium",
+            status="in_progress",
+            created_at=self.now - timedelta(hours=20),
+            updated_at=self.now
+        )
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['stats']['sla_breached'], 1)
+        self.assertEqual(response.context['sla_breached_tickets'][0]['hours_late'], 24)
+        self.assertEqual(response.context['urgent_count'], 1)
+
+    def add_chart_history(self, months, categories):
+        """Tickets spread over `months` months in `categories` new categories"""
+        for i in range(categories):
+            category = IssueCategories.objects.create(name=f"Catégorie {i}", sla_hours=24)
+            for month in range(months):
+                Tickets.objects.create(
+                    tenant=self.tenant, unit=self.unit, category=category, title="Old", description="Old",
+                    severity="low", status="resolved", assigned_contractor=self.contractor,
+                    created_at=self.now - timedelta(days=30 * month + 1),
+                    resolved_at=self.now - timedelta(days=30 * month),
+                    updated_at=self.now
+                )
+
+    def test_get_chart_data_calendar_months(self):
+        self.add_chart_history(months=3, categories=2)
+        with self.assertNumQueries(5):
+            chart_data = get_chart_data()
+        created = json.loads(chart_data['created'])
+        self.assertEqual(len(created), 6)
+        self.assertEqual(sum(created), Tickets.objects.filter(created_at__gte=month_starts(self.now, 6)[0]).count())
+        self.assertEqual(json.loads(chart_data['status_values']), [1, 0, 6, 0])
+
+    def test_get_chart_data_query_count_fixed(self):
+        with self.assertNumQueries(5):
+            get_chart_data(months_count=24)
+
+    def test_admin_dashboard_query_budget(self):
+        self.client.get(reverse('admin_dashboard'))  # caches chargés (calendriers SLA)
+        cache.clear()
+        with self.assertNumQueries(DASHBOARD_QUERY_BUDGET):
+            self.client.get(reverse('admin_dashboard'))
+
+        self.add_chart_history(months=6, categories=8)
+        cache.clear()
+        with self.assertNumQueries(DASHBOARD_QUERY_BUDGET):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin_dashboard_snapshot_reused(self):
+        self.client.get(reverse('admin_dashboard'))
+        # session + version (utilisateur en cache)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['stats']['new'], 1)
+
+    def test_admin_dashboard_snapshot_follows_ticket_changes(self):
+        self.client.get(reverse('admin_dashboard'))
+        Tickets.objects.filter(pk=self.ticket.pk).update(status='in_progress')
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['stats']['new'], 0)
+        self.assertEqual(response.context['stats']['in_progress'], 1)
+
+    def test_snapshot_single_flight(self):
+        get_snapshot('test', lambda: {'value': 1})
+        ChangeCounters.objects.update_or_create(name='test', defaults={'version': 99})
+
+        def build():
+            raise AssertionError("rebuild pendant qu'un autre process le fait")
+
+        # un autre process reconstruit: le snapshot précédent est servi
+        cache.add('snapshot:test:99:lock', 1)
+        self.assertEqual(get_snapshot('test', build), {'value': 1})
+
     def test_admin_tickets_list(self):
         response = self.client.get(reverse('admin_tickets'))
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_tickets_list_rows(self):
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, title="Store bloqué", description="x" * 5000,
+            severity="low", status="in_progress", assigned_contractor=self.contractor,
+            created_at=self.now, updated_at=self.now
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_tickets'))
+        row = response.context['tickets'][0]
+        self.assertIsInstance(row, AdminTicketRow)
+        self.assertFalse(hasattr(row, '__dict__'))
+        self.assertEqual((row.ticket_id, row.sla_status), (ticket.ticket_id, 'ok'))
+        self.assertContains(response, "Test SA")
+        self.assertContains(response, "Jean T.")
+        # la liste ne lit ni la description ni access_windows
+        page_sql = [q['sql'] for q in queries.captured_queries if 'LIMIT 51' in q['sql']]
+        self.assertEqual(len(page_sql), 1)
+        self.assertNotIn('"description"', page_sql[0])
+
+    def test_admin_export_tickets_streams_costs_and_sla(self):
+        ticket = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, title="Chaudière", description="Plus d'eau chaude",
+            severity="critical", status="open", assigned_contractor=self.contractor,
+            created_at=self.now - timedelta(hours=5), updated_at=self.now
+        )
+        part = Parts.objects.create(name="Vanne", unit_cost=Decimal("12.50"))
+        # total_cost est une colonne générée dans SQL_Fixly.sql: pas d'INSERT par l'ORM
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO ticket_parts (ticket_id, part_id, quantity, unit_cost, created_at) "
+                           "VALUES (%s, %s, 2, 12.50, now())", [ticket.ticket_id, part.part_id])
+            cursor.execute("INSERT INTO ticket_labor_costs (ticket_id, contractor_id, hours_worked, hourly_rate, "
+                           "created_at) VALUES (%s, %s, 1.5, 80, now())", [ticket.ticket_id, self.contractor.contractor_id])
+
+        response = self.client.get(reverse('admin_export_tickets'), {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = {row['ticket_id']: row for row in csv.DictReader(
+            io.StringIO(b''.join(response.streaming_content).decode()))}
+        row = rows[str(ticket.ticket_id)]
+        self.assertEqual((row['building'], row['contractor']), ("Building", "Test SA"))
+        self.assertEqual((row['parts_cost'], row['labor_cost']), ("25.00", "120.00"))
+        self.assertEqual(row['sla_status'], 'breached')
+
+        # titres saisis par le locataire: pas de formule exécutée par le tableur, JSONL inchangé
+        for title in ("=HYPERLINK(\"http://x\")", "+1", "-1", "@SUM(A1)", "\tTab", "\rRetour"):
+            Tickets.objects.filter(pk=ticket.pk).update(title=title)
+            response = self.client.get(reverse('admin_export_tickets'), {'format': 'csv'})
+            rows = {row['ticket_id']: row for row in csv.DictReader(
+                io.StringIO(b''.join(response.streaming_content).decode()))}
+            self.assertEqual(rows[str(ticket.ticket_id)]['title'], "'" + title)
+            lines = [json.loads(line) for line in ''.join(stream_export('jsonl')).splitlines()]
+            self.assertIn(title, [line['title'] for line in lines])
+
+        # plusieurs paquets du curseur serveur, même résultat
+        closed = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Sans frais", description="-",
+                                        severity="low", status="closed", created_at=self.now, updated_at=self.now)
+        lines = [json.loads(line) for line in ''.join(stream_export('jsonl', chunk_size=1)).splitlines()]
+        self.assertEqual([line['ticket_id'] for line in lines], sorted(
+            Tickets.objects.values_list('ticket_id', flat=True)))
+        self.assertEqual(lines[-1]['ticket_id'], closed.ticket_id)
+        self.assertEqual(lines[-1]['parts_cost'], "0.00")
+        self.assertIsNone(lines[-1]['sla_remaining_hours'])
+
+        self.assertEqual(self.client.get(reverse('admin_export_tickets'), {'format': 'xlsx'}).status_code, 400)
+
+    def test_admin_tickets_keyset_pages(self):
+        Tickets.objects.bulk_create([
+            Tickets(tenant=self.tenant, unit=self.unit, title=f"Page {i}", description="Page", severity="low",
+                    status="open", created_at=self.now - timedelta(minutes=i // 3), updated_at=self.now)
+            for i in range(TICKETS_PAGE_SIZE + 5)
+        ])
+        response = self.client.get(reverse('admin_tickets'), {'status': 'open'})
+        first = [t.ticket_id for t in response.context['tickets']]
+        self.assertEqual(len(first), TICKETS_PAGE_SIZE)
+        self.assertIsNotNone(response.context['estimated_total'])
+        next_url = response.context['next_url']
+        self.assertIn('status=open', next_url)
+
+        # un nouveau ticket ne décale pas la page suivante
+        Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="New", description="New",
+                               severity="low", status="open", created_at=self.now, updated_at=self.now)
+        response = self.client.get(reverse('admin_tickets') + next_url)
+        second = [t.ticket_id for t in response.context['tickets']]
+        self.assertEqual(len(second), 6)
+        self.assertFalse(set(first) & set(second))
+        self.assertIsNone(response.context['next_url'])
+
+    def test_admin_tickets_invalid_cursor(self):
+        response = self.client.get(reverse('admin_tickets'), {'cursor': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['tickets']), [])
+
+    def test_estimate_count_empty_queryset(self):
+        self.assertEqual(estimate_count(Tickets.objects.filter(unit_id__in=[])), 0)
+        self.assertEqual(estimate_count(Tickets.objects.none()), 0)
+
+    def test_admin_tickets_full_text_search(self):
+        in_title = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, title="Fuite d'eau cuisine", description="Sous l'évier",
+            severity="medium", status="open", created_at=self.now, updated_at=self.now
+        )
+        in_description = Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, title="Problème salle de bain",
+            description="Petites fuites au robinet", severity="low", status="open",
+            created_at=self.now, updated_at=self.now
+        )
+        response = self.client.get(reverse('admin_tickets'), {'search': 'fuites'})
+        found = [t.ticket_id for t in response.context['tickets']]
+        # config french: "fuites" trouve "Fuite", le titre est classé avant la description
+        self.assertEqual(found, [in_title.ticket_id, in_description.ticket_id])
+
+        response = self.client.get(reverse('admin_tickets'), {'search': f"#{in_description.ticket_id}"})
+        self.assertEqual([t.ticket_id for t in response.context['tickets']], [in_description.ticket_id])
+
+    def test_admin_tickets_place_lookup(self):
+        other_building = Buildings.objects.create(
+            owner=self.owner, name="Résidence Champel", address="Chemin de Champel 42",
+            city="Genève", created_at=self.now
+        )
+        other_unit = Units.objects.create(building=other_building, unit_number="3B", created_at=self.now)
+        other_tenant = Tenants.objects.create(
+            unit=other_unit, first_name="Marie", last_name="Dupont", email="marie@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        at_champel = Tickets.objects.create(
+            tenant=other_tenant, unit=other_unit, title="Volet cassé", description="Chambre",
+            severity="low", status="open", created_at=self.now, updated_at=self.now
+        )
+        Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, title="Volet cassé", description="Salon",
+            severity="low", status="open", created_at=self.now, updated_at=self.now
+        )
+
+        response = self.client.get(reverse('api_lookup'), {'q': 'Champel 42'})
+        results = response.json()['results']
+        self.assertEqual((results[0]['kind'], results[0]['id']), ('building', other_building.building_id))
+
+        response = self.client.get(results[0]['url'])
+        self.assertEqual([t.ticket_id for t in response.context['tickets']], [at_champel.ticket_id])
+
+        response = self.client.get(reverse('admin_tickets'), {'place': 'Dupont'})
+        self.assertEqual([t.ticket_id for t in response.context['tickets']], [at_champel.ticket_id])
+
+        self.assertEqual(self.client.get(reverse('api_lookup'), {'q': 'x'}).json(), {'results': []})
+
+    def test_place_lookup_tolerates_typos(self):
+        if not trigram_available():
+            self.skipTest("pg_trgm n'est pas installé")
+        Tenants.objects.create(
+            unit=self.unit, first_name="Marie", last_name="Dupont", email="marie@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        self.assertIn(('tenant', 'Marie Dupont'), [(m['kind'], m['label']) for m in lookup_places('Dupond')])
+
+    def test_place_lookup_limit_per_kind(self):
+        for street in ("Chemin de Champel 42", "Chemin de Champel 44"):
+            Buildings.objects.create(
+                owner=self.owner, name="Résidence Champel", address=street, city="Genève", created_at=self.now
+            )
+        Tenants.objects.create(
+            unit=self.unit, first_name="Paul", last_name="Champel", email="paul@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        # deux immeubles trouvés: le filtre des tickets garde quand même le locataire
+        kinds = [m['kind'] for m in lookup_places('Champel', limit=None, per_kind=1)]
+        self.assertEqual(sorted(kinds), ['building', 'tenant'])
+        self.assertEqual(len(lookup_places('Champel', limit=1)), 1)
+
+    def test_place_filter_without_match_is_empty(self):
+        tickets = filter_tickets_by_place(Tickets.objects.all(), 'zzzzqqq')
+        self.assertTrue(tickets.query.is_empty())
+        self.assertEqual(list(tickets), [])
+
+    def test_search_rank_cursor_round_trip(self):
+        for i in range(5):
+            Tickets.objects.create(
+                tenant=self.tenant, unit=self.unit, title="Chauffage " * (i + 1), description="Radiateur froid",
+                severity="low", status="open", created_at=self.now, updated_at=self.now
+            )
+        tickets, ranked = search_tickets(Tickets.objects.all(), "radiateur chauffage")
+        self.assertTrue(ranked)
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(tickets, 'search_rank', 'ticket_id', cursor, 2, types=(float, int))
+            seen.extend(t.ticket_id for t in page)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_admin_tickets_sla_filter(self):
+        late = Tickets.objects.create(
+            tenant=self.tenant,
+            unit=self.unit,
+            title="Late Ticket",
+            description="Description",
+            severity="medium",
+            status="open",
+            created_at=self.now - timedelta(hours=48),
+            updated_at=self.now
+        )
+        response = self.client.get(reverse('admin_tickets'), {'sla': 'breached'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([t.ticket_id for t in response.context['tickets']], [late.ticket_id])
+        self.assertEqual(response.context['tickets'][0].sla_status, 'breached')
+        self.assertEqual(response.context['facets']['sla']['breached'], 1)
+
+    def test_admin_tickets_facets(self):
+        category = IssueCategories.objects.create(name="Chauffage", sla_hours=24)
+        other_building = Buildings.objects.create(owner=self.owner, name="Autre", address="Rue 2",
+                                                  created_at=self.now)
+        other_unit = Units.objects.create(building=other_building, unit_number="201", created_at=self.now)
+        for unit, status, ticket_category, age in [
+            (self.unit, 'open', category, 48), (self.unit, 'open', None, 0),
+            (self.unit, 'closed', category, 0), (other_unit, 'in_progress', category, 0),
+        ]:
+            Tickets.objects.create(tenant=self.tenant, unit=unit, category=ticket_category, title="Facette",
+                                   description="-", severity="medium", status=status,
+                                   created_at=self.now - timedelta(hours=age), updated_at=self.now)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_tickets'), {'status': 'open', 'building': self.building.pk})
+        facets = response.context['facets']
+        self.assertEqual(len([q for q in queries.captured_queries if 'GROUPING SETS' in q['sql']]), 1)
+        # une facette ignore son propre filtre: les autres statuts restent comptés
+        self.assertEqual(facets['status'], {'open': 3, 'closed': 1})
+        self.assertEqual(facets['sla'], {'breached': 1, 'ok': 2})
+        self.assertEqual(facets['category'], [{'id': category.pk, 'name': "Chauffage", 'count': 1}])
+        self.assertEqual({b['id']: b['count'] for b in facets['building']},
+                         {self.building.pk: 3})
+        self.assertEqual(len(response.context['tickets']), 3)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin_tickets'), {'status': 'open', 'building': self.building.pk})
+        self.assertFalse([q for q in queries.captured_queries if 'GROUPING SETS' in q['sql']])
+
+    def test_admin_tickets_facets_place_without_match(self):
+        for place in ('zzzzqqq', '%'):
+            response = self.client.get(reverse('admin_tickets'), {'place': place})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['facets'], {'status': {}, 'sla': {}, 'category': [], 'building': []})
+            self.assertEqual(len(response.context['tickets']), 0)
+
+    def test_admin_tickets_sort_by_sla(self):
+        closed = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Fermé", description="-",
+                                        severity="low", status="closed", created_at=self.now, updated_at=self.now)
+        response = self.client.get(reverse('admin_tickets'), {'sort': 'sla', 'building': self.building.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(closed.ticket_id, [t.ticket_id for t in response.context['tickets']])
+        # restriction aux tickets actifs annoncée, lien vers la liste complète (filtres gardés)
+        self.assertContains(response, "seuls les tickets ouverts ou en cours sont listés")
+        self.assertEqual(response.context['unsorted_url'], f"?building={self.building.pk}")
+
+        response = self.client.get(reverse('admin_tickets'))
+        self.assertNotContains(response, "seuls les tickets ouverts ou en cours sont listés")
+
     def test_admin_ticket_detail(self):
         response = self.client.get(
             reverse('admin_ticket_detail', args=[self.ticket.ticket_id])
         )
         self.assertEqual(response.status_code, 200)
 
+    def test_admin_ticket_detail_query_budget(self):
+        self.client.get(reverse('admin_ticket_detail', args=[self.ticket.ticket_id]))  # caches chargés
+        for count in (1, 4):
+            add_detail_rows(self.ticket, self.tenant, self.contractor, self.admin, count)
+            with self.assertNumQueries(DETAIL_QUERY_BUDGETS['admin']):
+                response = self.client.get(reverse('admin_ticket_detail', args=[self.ticket.ticket_id]))
+        self.assertEqual(len(response.context['ticket_messages']), 15)
+        self.assertContains(response, "Note interne 3")
+        self.assertContains(response, "Test SA")
+
+    def test_admin_ticket_message_thread_pages(self):
+        def add_messages(ticket, count):
+            Messages.objects.bulk_create([
+                Messages(ticket=ticket, tenant_sender=self.tenant, message_text=f"Message {i}", is_internal=False,
+                         created_at=self.now - timedelta(minutes=count - i))
+                for i in range(count)
+            ])
+
+        short = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Court", description="-",
+                                       severity="low", status="open", created_at=self.now, updated_at=self.now)
+        add_messages(short, 10)
+        add_messages(self.ticket, 1000)
+        self.client.get(reverse('admin_ticket_detail', args=[short.ticket_id]))  # caches chargés
+
+        # même coût avec 10 ou 1000 messages: seule la page la plus récente est chargée
+        with CaptureQueriesContext(connection) as short_queries:
+            self.client.get(reverse('admin_ticket_detail', args=[short.ticket_id]))
+        with CaptureQueriesContext(connection) as long_queries:
+            response = self.client.get(reverse('admin_ticket_detail', args=[self.ticket.ticket_id]))
+        self.assertEqual(len(long_queries), len(short_queries))
+        messages = response.context['ticket_messages']
+        self.assertEqual(len(messages), THREAD_PAGE_SIZE)
+        self.assertEqual(messages[-1].message_text, "Message 999")
+
+        seen, cursor = [m.message_text for m in messages], response.context['thread_cursor']
+        url = reverse('admin_ticket_messages', args=[self.ticket.ticket_id])
+        first_older = self.client.get(url, {'cursor': cursor}).json()
+        while cursor:
+            page = self.client.get(url, {'cursor': cursor}).json()
+            seen.extend(re.findall(r'Message \d+', page['html']))
+            cursor = page['next_cursor']
+        self.assertEqual(len(seen), 1000)
+        self.assertEqual(len(set(seen)), 1000)
+
+        # page ancienne: HTML en cache, plus de requête sur messages
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, {'cursor': response.context['thread_cursor']}).json(), first_older)
+        self.assertFalse([q for q in queries.captured_queries if '"messages"' in q['sql']])
+
     def test_admin_contractors_list(self):
         response = self.client.get(reverse('admin_contractors'))
         self.assertEqual(response.status_code, 200)
@@ -311,6 +1261,170 @@ class AdminViewsTests(TestCase):
         )
         self.assertEqual(response.status_code, 302)
 
+    def test_activity_feed_merges_sources(self):
+        self.client.post(reverse('assign_contractor', args=[self.ticket.ticket_id]),
+                         {'contractor_id': self.contractor.contractor_id})
+        self.client.post(reverse('admin_add_message', args=[self.ticket.ticket_id]),
+                         {'message_text': 'Test message'})
+        Tickets.objects.filter(pk=self.ticket.pk).update(status='resolved', resolved_at=self.now)
+
+        items, next_cursor = get_activity_page()
+        titles = [item['title'] for item in items]
+        tid = self.ticket.ticket_id
+        for title in [f"#{tid} créé", f"#{tid} assigné à Test SA", f"Message sur #{tid}", f"#{tid} résolu"]:
+            self.assertIn(title, titles)
+        self.assertIsNone(next_cursor)
+
+    def test_activity_feed_keyset_pages(self):
+        for i in range(12):
+            Tickets.objects.create(
+                tenant=self.tenant, unit=self.unit, title="Feed", description="Feed", severity="low",
+                status="open", created_at=self.now - timedelta(minutes=i // 2), updated_at=self.now
+            )
+        seen, cursor = [], None
+        while True:
+            items, cursor = get_activity_page(cursor, limit=5)
+            seen.extend((item['created_at'], item['ticket_id']) for item in items)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 13)
+        self.assertEqual(len(set(seen)), 13)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_api_activity(self):
+        response = self.client.get(reverse('api_activity'))
+        data = response.json()
+        self.assertEqual(data['items'][0]['url'], reverse('admin_ticket_detail', args=[self.ticket.ticket_id]))
+        self.assertIsNone(data['next_cursor'])
+
+        response = self.client.get(reverse('api_activity'), {'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.json(), {'items': [], 'next_cursor': None})
+
+    def test_api_ticket_stats_etag(self):
+        response = self.client.get(reverse('api_ticket_stats'))
+        self.assertEqual(response.json()['new'], 1)
+        etag = response['ETag']
+
+        # session seulement (utilisateur et version en cache): ni COUNT ni change_counters
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_ticket_stats'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # version relue une fois TICKET_STATS_VERSION_TTL écoulé
+        Tickets.objects.filter(pk=self.ticket.pk).update(status='in_progress')
+        cache.delete(TICKET_STATS_VERSION_KEY)
+        response = self.client.get(reverse('api_ticket_stats'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['in_progress'], 1)
+
+        # listener actif dans le processus: dernière version reçue par NOTIFY
+        broadcaster.version = 12345
+        try:
+            response = self.client.get(reverse('api_ticket_stats'))
+        finally:
+            broadcaster.version = None
+        self.assertEqual(response['ETag'], '"tickets-12345"')
+
+    def test_ticket_stats_broadcast_deltas(self):
+        async def receive():
+            queue = broadcaster.subscribe()
+            broadcaster.stats = {'new': 1, 'in_progress': 0}
+            broadcaster.publish({'new': 1, 'in_progress': 0})  # rien n'a changé: pas d'envoi
+            broadcaster.publish({'new': 0, 'in_progress': 1})
+            delta = await asyncio.wait_for(queue.get(), 1)
+            broadcaster.unsubscribe(queue)
+            return delta, queue.empty()
+
+        broadcaster.thread = threading.current_thread()  # pas de vrai LISTEN dans un TestCase
+        try:
+            delta, empty = async_to_sync(receive)()
+        finally:
+            broadcaster.thread = None
+        self.assertEqual(delta, {'new': 0, 'in_progress': 1})
+        self.assertTrue(empty)
+
+    def test_ticket_stats_slow_subscriber_dropped(self):
+        async def flood():
+            queue = broadcaster.subscribe()
+            broadcaster.stats = None
+            for new in range(SUBSCRIBER_QUEUE_SIZE + 1):
+                broadcaster.publish({'new': new})
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())], set(broadcaster.subscribers)
+
+        broadcaster.thread = threading.current_thread()
+        try:
+            received, subscribers = async_to_sync(flood)()
+        finally:
+            broadcaster.thread = None
+            broadcaster.stats = None
+            broadcaster.subscribers.clear()
+        # file pleine: vidée, fin de flux signalée, plus abonné
+        self.assertEqual(received, [None])
+        self.assertEqual(subscribers, set())
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def test_ticket_stats_stream_ends_on_disconnect(self):
+        application = watch_disconnect(get_asgi_application())
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': reverse('api_ticket_stats_stream'), 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())], 'server': ('testserver', 80),
+        }
+
+        async def stream():
+            incoming = asyncio.Queue()
+            await incoming.put({'type': 'http.request', 'body': b'', 'more_body': False})
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+                if b'event: stats' in message.get('body', b''):
+                    await incoming.put({'type': 'http.disconnect'})  # le client ferme l'onglet
+
+            await asyncio.wait_for(application(scope, incoming.get, send), 5)
+            return sent
+
+        broadcaster.thread = threading.current_thread()
+        # comme le client de test: pas de close_old_connections sur la connexion du TestCase
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            sent = async_to_sync(stream)()
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+            broadcaster.thread = None
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(sent[-1].get('more_body', False))
+        self.assertEqual(broadcaster.subscribers, set())
+
+    def test_ticket_stats_stream_requires_asgi(self):
+        response = self.client.get(reverse('api_ticket_stats_stream'))
+        self.assertEqual(response.status_code, 501)
+        # le tableau de bord servi sous WSGI n'ouvre pas le flux, il interroge api_ticket_stats
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertFalse(response.context['live_stats_stream'])
+        self.assertNotContains(response, 'new EventSource')
+        self.assertContains(response, reverse('api_ticket_stats'))
+
+    def test_sidebar_badge_cached_and_invalidated(self):
+        response = self.client.get(reverse('admin_contractors'))
+        self.assertEqual(response.context['sidebar_stats']['new'], 1)
+
+        # compteur en cache: une requête de moins
+        with CaptureQueriesContext(connection) as cached:
+            self.client.get(reverse('admin_buildings'))
+        cache.delete('admin_sidebar_stats')
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(reverse('admin_buildings'))
+        self.assertEqual(len(cached), len(uncached) - 1)
+
+        self.client.post(reverse('change_ticket_status', args=[self.ticket.ticket_id]), {'status': 'in_progress'})
+        response = self.client.get(reverse('admin_reports'))
+        self.assertEqual(response.context['sidebar_stats']['new'], 0)
+
     def test_change_password(self):
         response = self.client.get(reverse('change_password'))
         self.assertEqual(response.status_code, 200)
@@ -327,6 +1441,46 @@ class AdminViewsTests(TestCase):
         self.assertEqual(response.status_code, 200)
 
 
+class AdminDashboardConcurrentTests(TransactionTestCase):
+    """Groups run in other threads (other connections): data must be committed"""
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        from django.contrib.auth.hashers import make_password
+        self.admin = Users.objects.create(
+            username="admin", email="admin@test.ch", password_hash=make_password("password123"),
+            role="admin", is_active=True, created_at=self.now
+        )
+        # tables non gérées par Django: pas vidées par TransactionTestCase
+        self.addCleanup(self.admin.delete)
+        self.contractor = Contractors.objects.create(
+            company_name="Test SA", email="contractor@test.ch", phone="+41 00 000 00 00",
+            specialties='{Plomberie}', is_active=True, created_at=self.now
+        )
+        self.addCleanup(self.contractor.delete)
+
+    def test_concurrent_snapshot_matches_sequential(self):
+        sequential = build_dashboard_snapshot()
+        concurrent = build_dashboard_snapshot_concurrent()
+        self.assertEqual(concurrent['stats'], sequential['stats'])
+        self.assertEqual(concurrent['chart_data'], sequential['chart_data'])
+        self.assertEqual(
+            [c.contractor_id for c in concurrent['contractors']], [self.contractor.contractor_id]
+        )
+
+    def test_async_dashboard_view(self):
+        request = RequestFactory().get(reverse('admin_dashboard'))
+        request.session = {'user_id': self.admin.user_id}
+        response = async_to_sync(admin_dashboard_async)(request)
+        self.assertEqual(response.status_code, 200)
+
+        request = RequestFactory().get(reverse('admin_dashboard'))
+        request.session = {}
+        response = async_to_sync(admin_dashboard_async)(request)
+        self.assertEqual(response.status_code, 302)
+
+
 class TenantAuthTests(TestCase):
 
     def setUp(self):
@@ -382,6 +1536,37 @@ class TenantAuthTests(TestCase):
         response = self.client.get(reverse('tenant_dashboard'))
         self.assertEqual(response.status_code, 302)
 
+    def test_tenant_password_change_refreshes_principal(self):
+        self.client.post(reverse('tenant_login'), {'email': 'tenant@test.ch', 'password': 'password123'})
+        self.client.get(reverse('tenant_dashboard'))
+        key = principal_key('tenant', self.tenant.tenant_id)
+        self.assertIsNotNone(cache.get(key))
+
+        response = self.client.post(reverse('tenant_change_password'), {
+            'current_password': 'password123',
+            'new_password': 'nouveau456',
+            'confirm_password': 'nouveau456',
+        })
+        self.assertRedirects(response, reverse('tenant_profile'), fetch_redirect_response=False)
+        self.assertIsNone(cache.get(key))
+        # seules les colonnes chargées sont réécrites
+        self.tenant.refresh_from_db()
+        self.assertTrue(check_password('nouveau456', self.tenant.password_hash))
+        self.assertEqual(self.tenant.email, 'tenant@test.ch')
+
+        response = self.client.get(reverse('tenant_profile'))
+        self.assertContains(response, 'tenant@test.ch')
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_tenant_signed_cookie_session(self):
+        self.client.post(reverse('tenant_login'), {'email': 'tenant@test.ch', 'password': 'password123'})
+        self.client.get(reverse('tenant_change_password'))
+        # ni session ni locataire lus en base
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('tenant_change_password'))
+        self.assertContains(response, 'Jean')
+        self.assertFalse(DjangoSession.objects.exists())
+
 
 class TenantViewsTests(TestCase):
 
@@ -431,6 +1616,57 @@ class TenantViewsTests(TestCase):
         response = self.client.get(reverse('tenant_tickets'))
         self.assertEqual(response.status_code, 200)
 
+    def test_tenant_ticket_detail_query_budget(self):
+        ticket = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Détail", description="-",
+                                        severity="low", status="open", created_at=self.now, updated_at=self.now)
+        contractor = Contractors.objects.create(company_name="Sanitaire SA", contact_name="C", email="c@test.ch",
+                                                specialties='{Plomberie}', is_active=True, created_at=self.now)
+        admin = Users.objects.create(username="admin", email="admin@test.ch", password_hash="-", role="admin",
+                                     is_active=True, created_at=self.now)
+        self.client.get(reverse('tenant_ticket_detail', args=[ticket.ticket_id]))
+        for count in (1, 4):
+            add_detail_rows(ticket, self.tenant, contractor, admin, count)
+            with self.assertNumQueries(DETAIL_QUERY_BUDGETS['tenant']):
+                response = self.client.get(reverse('tenant_ticket_detail', args=[ticket.ticket_id]))
+        # notes internes filtrées en SQL
+        self.assertEqual(len(response.context['messages']), 10)
+        self.assertNotContains(response, "Note interne")
+        self.assertContains(response, "Sanitaire SA")
+
+    def test_tenant_message_thread_hides_internal_notes(self):
+        ticket = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Fil", description="-",
+                                        severity="low", status="open", created_at=self.now, updated_at=self.now)
+        Messages.objects.bulk_create([
+            Messages(ticket=ticket, tenant_sender=self.tenant, message_text=f"Public {i}",
+                     is_internal=i % 2 == 1, created_at=self.now - timedelta(minutes=100 - i))
+            for i in range(60)
+        ])
+        response = self.client.get(reverse('tenant_ticket_detail', args=[ticket.ticket_id]))
+        page = self.client.get(reverse('tenant_ticket_messages', args=[ticket.ticket_id]),
+                               {'cursor': response.context['thread_cursor']}).json()
+        self.assertEqual(page['html'].count('Public'), 10)
+        self.assertIsNone(page['next_cursor'])
+        self.assertFalse(re.search(r'Public \d*[13579]\b', page['html']))
+
+        other_tenant = Tenants.objects.create(unit=self.unit, first_name="Autre", last_name="Locataire",
+                                              email="other@test.ch", has_keys=False, is_active=True,
+                                              created_at=self.now)
+        other = Tickets.objects.create(tenant=other_tenant, unit=self.unit, title="Pas à moi", description="-",
+                                       severity="low", status="open", created_at=self.now, updated_at=self.now)
+        response = self.client.get(reverse('tenant_ticket_messages', args=[other.ticket_id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_tenant_tickets_list_rows(self):
+        Tickets.objects.create(
+            tenant=self.tenant, unit=self.unit, category=self.category, title="Fuite",
+            description="Eau sous l'évier de la cuisine", severity="medium", status="open",
+            created_at=self.now, updated_at=self.now
+        )
+        response = self.client.get(reverse('tenant_tickets'))
+        self.assertIsInstance(response.context['tickets'][0], TenantTicketRow)
+        self.assertContains(response, "Plomberie")
+        self.assertContains(response, "Eau sous l&#x27;évier")
+
     def test_tenant_create_ticket(self):
         response = self.client.get(reverse('tenant_create_ticket'))
         self.assertEqual(response.status_code, 200)
@@ -480,6 +1716,35 @@ class ContractorAuthTests(TestCase):
         response = self.client.get(reverse('contractor_dashboard'))
         self.assertEqual(response.status_code, 302)
 
+    def test_contractor_login_email_case_insensitive(self):
+        response = self.client.post(reverse('contractor_login'), {
+            'email': ' Contractor@Test.CH ',
+            'password': 'password123'
+        })
+        self.assertRedirects(response, reverse('contractor_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session['contractor_id'], self.contractor.contractor_id)
+
+        response = self.client.post(reverse('contractor_login'), {'email': 'inconnu@test.ch', 'password': 'x'})
+        self.assertContains(response, 'Email non trouvé')
+
+    def test_contractor_login_rehashes_outdated_password(self):
+        hasher = get_hasher()
+        Contractors.objects.filter(pk=self.contractor.pk).update(
+            password_hash=hasher.encode('password123', hasher.salt(), iterations=1000)
+        )
+        response = self.client.post(reverse('contractor_login'), {
+            'email': 'contractor@test.ch',
+            'password': 'wrongpassword'
+        })
+        self.assertContains(response, 'Mot de passe incorrect')
+        self.contractor.refresh_from_db()
+        self.assertIn('$1000$', self.contractor.password_hash)
+
+        self.client.post(reverse('contractor_login'), {'email': 'contractor@test.ch', 'password': 'password123'})
+        self.contractor.refresh_from_db()
+        self.assertTrue(self.contractor.password_hash.startswith(f"{hasher.algorithm}${hasher.iterations}$"))
+        self.assertTrue(check_password('password123', self.contractor.password_hash))
+
 
 class ContractorViewsTests(TestCase):
 
@@ -509,11 +1774,163 @@ class ContractorViewsTests(TestCase):
         response = self.client.get(reverse('contractor_jobs'))
         self.assertEqual(response.status_code, 200)
 
+    def test_contractor_job_detail_query_budget(self):
+        owner = Owners.objects.create(name="Owner", email="owner@test.ch", created_at=self.now)
+        building = Buildings.objects.create(owner=owner, name="Building", address="Address", created_at=self.now)
+        unit = Units.objects.create(building=building, unit_number="101", created_at=self.now)
+        tenant = Tenants.objects.create(unit=unit, first_name="Jean", last_name="Locataire", email="t@test.ch",
+                                        has_keys=False, is_active=True, created_at=self.now)
+        ticket = Tickets.objects.create(tenant=tenant, unit=unit, title="Job", description="-", severity="low",
+                                        status="in_progress", assigned_contractor=self.contractor,
+                                        created_at=self.now, updated_at=self.now)
+        ContractorAssignments.objects.create(ticket=ticket, contractor=self.contractor, status='accepted',
+                                             created_at=self.now)
+        self.client.get(reverse('contractor_job_detail', args=[ticket.ticket_id]))
+        for count in (1, 4):
+            add_detail_rows(ticket, tenant, self.contractor, None, count)
+            with self.assertNumQueries(DETAIL_QUERY_BUDGETS['contractor']):
+                response = self.client.get(reverse('contractor_job_detail', args=[ticket.ticket_id]))
+        self.assertEqual(len(response.context['messages']), 10)
+        self.assertEqual(response.context['assignment'].status, 'accepted')
+        self.assertContains(response, "Jean Locataire")
+
+        other = Tickets.objects.create(tenant=tenant, unit=unit, title="Autre", description="-", severity="low",
+                                       status="open", created_at=self.now, updated_at=self.now)
+        response = self.client.get(reverse('contractor_job_detail', args=[other.ticket_id]))
+        self.assertEqual(response.status_code, 404)
+
     def test_contractor_profile(self):
         response = self.client.get(reverse('contractor_profile'))
         self.assertEqual(response.status_code, 200)
 
 
+class PhotoDerivativesTests(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        owner = Owners.objects.create(name="Owner", email="owner@test.ch", created_at=self.now)
+        building = Buildings.objects.create(owner=owner, name="Building", address="Address", created_at=self.now)
+        self.unit = Units.objects.create(building=building, unit_number="1", created_at=self.now)
+        self.tenant = Tenants.objects.create(
+            unit=self.unit, first_name="Jean", last_name="Test", email="tenant@test.ch",
+            has_keys=False, is_active=True, created_at=self.now
+        )
+        self.ticket = Tickets.objects.create(tenant=self.tenant, unit=self.unit, title="Fuite", description="-",
+                                             severity="low", status="open", created_at=self.now, updated_at=self.now)
+
+    def add_photo(self, name, content):
+        path = f"tickets/{self.ticket.ticket_id}/{name}"
+        os.makedirs(os.path.join(self.media.name, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(self.media.name, path), 'wb') as file:
+            file.write(content)
+        return Attachments.objects.create(ticket=self.ticket, tenant_uploader=self.tenant, file_name=name,
+                                          file_path=path, created_at=self.now)
+
+    def test_derivatives_made_in_process_pool(self):
+        # photo de téléphone: 2000x1500 couchée (Orientation 6) avec une position GPS
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = "Phone"
+        buffer = io.BytesIO()
+        Image.new('RGB', (2000, 1500), 'red').save(buffer, 'JPEG', exif=exif, quality=95)
+        photo = self.add_photo("fuite.jpg", buffer.getvalue())
+        broken = self.add_photo("pas-une-image.jpg", b"-")
+
+        with override_settings(MEDIA_ROOT=self.media.name), photo_pool(1) as pool:
+            self.assertEqual(process_pending_photos(pool), (1, 1))
+
+        photo.refresh_from_db()
+        self.assertIsNotNone(photo.derivatives_at)
+        self.assertEqual(photo.thumb_path, f"tickets/{self.ticket.ticket_id}/fuite_thumb.jpg")
+        for path, size in ((photo.thumb_path, (240, 320)), (photo.web_path, (960, 1280))):
+            with Image.open(os.path.join(self.media.name, path)) as derivative:
+                self.assertEqual(derivative.size, size)  # redressée
+                self.assertEqual(len(derivative.getexif()), 0)
+        broken.refresh_from_db()
+        self.assertIsNotNone(broken.derivatives_at)
+        self.assertIsNone(broken.thumb_path)
+        self.assertEqual(pending_photos(), [])
+
+        session = self.client.session
+        session['tenant_id'] = self.tenant.tenant_id
+        session.save()
+        response = self.client.get(reverse('tenant_ticket_detail', args=[self.ticket.ticket_id]))
+        self.assertContains(response, f'src="/media/{photo.thumb_path}"')
+        self.assertContains(response, f'href="/media/{photo.web_path}"')
+        self.assertContains(response, f'src="/media/{broken.file_path}"')  # original servi
+        self.assertContains(response, 'loading="lazy"', count=2)
+
+    def test_broken_pool_leaves_photos_pending(self):
+        photo = self.add_photo("fuite.jpg", b"-")
+
+        class BrokenPool:
+            # processus tué par l'OOM killer pendant le paquet
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool("processus tué"))
+                return future
+
+        with override_settings(MEDIA_ROOT=self.media.name), self.assertRaises(PhotoPoolBroken) as raised:
+            process_pending_photos(BrokenPool())
+        photo.refresh_from_db()
+        self.assertIsNone(photo.derivatives_at)
+        self.assertEqual(pending_photos(), [(photo.attachment_id, photo.file_path)])
+        self.assertEqual(raised.exception.photos, pending_photos())
+
+    def test_isolate_photos_marks_the_pool_killer(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'blue').save(buffer, 'JPEG')
+        photo = self.add_photo("fuite.jpg", buffer.getvalue())
+        bomb = self.add_photo("bombe.png", b"-")
+        pools = []
+
+        class OneProcessPool:
+            # la bombe tue le processus à chaque fois, les autres photos sont traitées sur place
+            def submit(self, fn, media_root, file_path):
+                future = Future()
+                if file_path == bomb.file_path:
+                    future.set_exception(BrokenProcessPool("processus tué"))
+                else:
+                    future.set_result(fn(media_root, file_path))
+                return future
+
+            def shutdown(self, wait=True, cancel_futures=False):
+                pass
+
+        def make_pool(workers):
+            pools.append(workers)
+            return OneProcessPool()
+
+        with override_settings(MEDIA_ROOT=self.media.name):
+            self.assertEqual(isolate_photos(make_pool, pending_photos()), (1, 1))
+        self.assertEqual(pools, [1] * (1 + PHOTO_POOL_ATTEMPTS))
+        photo.refresh_from_db()
+        self.assertIsNotNone(photo.thumb_path)
+        bomb.refresh_from_db()
+        self.assertIsNotNone(bomb.derivatives_at)
+        self.assertIsNone(bomb.thumb_path)
+        self.assertEqual(pending_photos(), [])
+
+
+class SessionSweeperTests(TestCase):
+
+    def test_purge_expired_sessions_in_batches(self):
+        now = timezone.now()
+        for i in range(5):
+            DjangoSession.objects.create(session_key=f"expired{i}", session_data="-",
+                                         expire_date=now - timedelta(days=i + 1))
+        DjangoSession.objects.create(session_key="live", session_data="-", expire_date=now + timedelta(days=1))
+
+        self.assertEqual(purge_expired_sessions(batch_size=2, max_batches=1, now=now), 2)
+        self.assertEqual(DjangoSession.objects.count(), 4)
+        # 2 + 1 lignes, le dernier paquet incomplet arrête la boucle
+        with self.assertNumQueries(2):
+            self.assertEqual(purge_expired_sessions(batch_size=2, now=now), 3)
+        self.assertEqual(list(DjangoSession.objects.values_list('session_key', flat=True)), ["live"])
+
+
 class EdgeCasesTests(TestCase):
 
     def setUp(self):
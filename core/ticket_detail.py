@@ -0,0 +1,51 @@
+"""Ticket detail shared by the three portals: the ticket and its related rows in a fixed number of queries"""
+
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+
+from .message_thread import thread_page
+from .models import Tickets, Attachments, TicketStatusHistory, ContractorAssignments
+from .sla import calculate_sla_status
+
+
+DETAIL_ROLES = ('admin', 'tenant', 'contractor')
+
+
+def load_ticket_detail(ticket_id, role, tenant=None, contractor=None):
+    """Ticket `ticket_id` seen by `role` (404 if it isn't one of the tenant's / contractor's tickets),
+    with detail_photos (+ detail_status_history and detail_assignments for a contractor) prefetched
+    and the newest page of messages in detail_messages / thread_cursor (older pages: thread_page_html).
+    3 queries (5 for a contractor), whatever the number of messages"""
+    if role not in DETAIL_ROLES:
+        raise ValueError(f"Unknown role: {role}")
+
+    prefetches = [
+        Prefetch('attachments_set', queryset=Attachments.objects.order_by('attachment_id'), to_attr='detail_photos'),
+    ]
+    scope = {}
+    if role == 'tenant':
+        scope['tenant'] = tenant
+    elif role == 'contractor':
+        scope['assigned_contractor'] = contractor
+        prefetches += [
+            Prefetch('ticketstatushistory_set', queryset=TicketStatusHistory.objects.order_by('created_at'),
+                     to_attr='detail_status_history'),
+            Prefetch('contractorassignments_set',
+                     queryset=ContractorAssignments.objects.filter(contractor=contractor).order_by('assignment_id'),
+                     to_attr='detail_assignments'),
+        ]
+
+    ticket = get_object_or_404(
+        Tickets.objects.select_related(
+            'unit', 'unit__building', 'tenant', 'category', 'assigned_contractor'
+        ).prefetch_related(*prefetches),
+        ticket_id=ticket_id,
+        **scope
+    )
+
+    ticket.detail_messages, ticket.thread_cursor = thread_page(ticket.ticket_id, role)
+
+    sla_status, sla_hours = calculate_sla_status(ticket)
+    ticket.sla_status = sla_status
+    ticket.sla_remaining = f"{int(sla_hours)}h" if sla_hours is not None else None
+    return ticket
@@ -0,0 +1,76 @@
+"""Ticket list rows: only the columns a list displays, one small __slots__ object per row
+(no model instance, no related instances, no description / access_windows)"""
+
+from django.db.models.functions import Substr
+
+
+class TicketRow:
+    """Base of the row classes built by row_class. sla_status / sla_remaining are filled
+    by add_annotated_sla_to_tickets"""
+    __slots__ = ('sla_status', 'sla_remaining')
+    columns = {}
+
+    def __init__(self, values):
+        for name, value in zip(self.columns, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} #{getattr(self, 'ticket_id', None)}>"
+
+
+def row_class(name, columns):
+    """TicketRow subclass with one slot per column. `columns`: attribute -> ORM path or expression"""
+    return type(name, (TicketRow,), {'__slots__': tuple(columns), 'columns': columns})
+
+
+def fetch_rows(row_cls, queryset):
+    """Rows of `queryset` as row_cls objects, the SELECT lists only row_cls.columns"""
+    expressions = {name: column for name, column in row_cls.columns.items() if not isinstance(column, str)}
+    if expressions:
+        queryset = queryset.annotate(**expressions)
+    paths = [name if name in expressions else column for name, column in row_cls.columns.items()]
+    return [row_cls(values) for values in queryset.values_list(*paths)]
+
+
+# colonnes affichées par chaque liste (+ clés de tri de la pagination par curseur)
+ADMIN_TICKET_COLUMNS = {
+    'ticket_id': 'ticket_id',
+    'title': 'title',
+    'status': 'status',
+    'created_at': 'created_at',
+    'sla_deadline': 'sla_deadline',
+    'category_name': 'category__name',
+    'contractor_name': 'assigned_contractor__company_name',
+    'tenant_first_name': 'tenant__first_name',
+    'tenant_last_name': 'tenant__last_name',
+    'sla_state': 'sla_state',
+    'sla_due_at': 'sla_due_at',
+}
+
+AdminTicketRow = row_class('AdminTicketRow', ADMIN_TICKET_COLUMNS)
+# recherche plein texte: + search_rank (clé du curseur)
+RankedAdminTicketRow = row_class('RankedAdminTicketRow', {**ADMIN_TICKET_COLUMNS, 'search_rank': 'search_rank'})
+
+# la liste n'affiche que les 15 premiers mots de la description
+DESCRIPTION_EXCERPT_LENGTH = 300
+
+TenantTicketRow = row_class('TenantTicketRow', {
+    'ticket_id': 'ticket_id',
+    'title': 'title',
+    'description_excerpt': Substr('description', 1, DESCRIPTION_EXCERPT_LENGTH),
+    'status': 'status',
+    'created_at': 'created_at',
+    'category_name': 'category__name',
+    'sla_state': 'sla_state',
+    'sla_due_at': 'sla_due_at',
+})
+
+ContractorJobRow = row_class('ContractorJobRow', {
+    'ticket_id': 'ticket_id',
+    'title': 'title',
+    'status': 'status',
+    'assigned_at': 'assigned_at',
+    'category_name': 'category__name',
+    'unit_number': 'unit__unit_number',
+    'building_name': 'unit__building__name',
+})
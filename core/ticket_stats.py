@@ -0,0 +1,94 @@
+"""Ticket activity read from ticket_daily_stats (pre-aggregated by trigger) for charts and reports"""
+
+from django.db import connection, transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Tickets, TicketDailyStats
+
+
+BACKFILL_SQL = """
+INSERT INTO ticket_daily_stats AS s
+    (day, category_id, building_id, status, contractor_id, ticket_count, resolved_count)
+SELECT day, category_id, building_id, status, contractor_id, SUM(tickets), SUM(resolved)
+FROM (
+    SELECT t.created_at::date AS day, t.category_id, u.building_id, COALESCE(t.status, '') AS status,
+           t.assigned_contractor_id AS contractor_id, 1 AS tickets, 0 AS resolved
+    FROM tickets t JOIN units u ON u.unit_id = t.unit_id
+    WHERE t.ticket_id >= %(first)s AND t.ticket_id < %(last)s AND t.created_at IS NOT NULL
+    UNION ALL
+    SELECT t.resolved_at::date, t.category_id, u.building_id, COALESCE(t.status, ''),
+           t.assigned_contractor_id, 0, 1
+    FROM tickets t JOIN units u ON u.unit_id = t.unit_id
+    WHERE t.ticket_id >= %(first)s AND t.ticket_id < %(last)s AND t.resolved_at IS NOT NULL
+) chunk
+GROUP BY day, category_id, building_id, status, contractor_id
+ON CONFLICT (day, COALESCE(category_id, 0), building_id, status, COALESCE(contractor_id, 0))
+DO UPDATE SET ticket_count = s.ticket_count + EXCLUDED.ticket_count,
+              resolved_count = s.resolved_count + EXCLUDED.resolved_count
+"""
+
+
+def backfill_ticket_daily_stats(chunk_size=50000, progress=None):
+    """Rebuild ticket_daily_stats from tickets, by ranges of ticket_id (one transaction per chunk).
+    Tickets written during the backfill are counted twice or not at all: run it with writes stopped."""
+    with connection.cursor() as cursor:
+        cursor.execute("TRUNCATE ticket_daily_stats")
+
+    last_id = Tickets.objects.order_by('-ticket_id').values_list('ticket_id', flat=True).first() or 0
+    first = 1
+    while first <= last_id:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL, {'first': first, 'last': first + chunk_size})
+        first += chunk_size
+        if progress:
+            progress(min(first - 1, last_id), last_id)
+    return last_id
+
+
+def monthly_counts(first_day, field):
+    """{month: n} of tickets created ('ticket_count') or resolved ('resolved_count') since first_day"""
+    return dict(
+        TicketDailyStats.objects.filter(day__gte=first_day)
+        .annotate(month=TruncMonth('day')).values('month')
+        .annotate(n=Sum(field)).values_list('month', 'n')
+    )
+
+
+def status_counts():
+    return TicketDailyStats.objects.aggregate(
+        open=Sum('ticket_count', filter=Q(status='open'), default=0),
+        in_progress=Sum('ticket_count', filter=Q(status='in_progress'), default=0),
+        resolved=Sum('ticket_count', filter=Q(status='resolved'), default=0),
+        closed=Sum('ticket_count', filter=Q(status='closed'), default=0),
+    )
+
+
+def category_counts(limit):
+    """[{'name', 'ticket_count'}] by number of tickets, categories with tickets only"""
+    rows = TicketDailyStats.objects.filter(category__isnull=False).values('category_id', 'category__name').annotate(
+        ticket_count=Sum('ticket_count')
+    ).filter(ticket_count__gt=0).order_by('-ticket_count', 'category__name')[:limit]
+    return [{'name': row['category__name'], 'ticket_count': row['ticket_count']} for row in rows]
+
+
+def building_counts(limit):
+    rows = TicketDailyStats.objects.values('building_id', 'building__name').annotate(
+        ticket_count=Sum('ticket_count')
+    ).filter(ticket_count__gt=0).order_by('-ticket_count', 'building__name')[:limit]
+    return [{'name': row['building__name'], 'ticket_count': row['ticket_count']} for row in rows]
+
+
+def contractor_counts(limit, active_only=False):
+    """[{'company_name', 'completed', 'pending'}] by number of completed tickets"""
+    rows = TicketDailyStats.objects.filter(contractor__isnull=False)
+    if active_only:
+        rows = rows.filter(contractor__is_active=True)
+    rows = rows.values('contractor_id', 'contractor__company_name').annotate(
+        completed=Sum('ticket_count', filter=Q(status__in=['resolved', 'closed']), default=0),
+        pending=Sum('ticket_count', filter=Q(status__in=['open', 'in_progress']), default=0),
+    ).order_by('-completed', 'contractor__company_name')[:limit]
+    return [
+        {'company_name': row['contractor__company_name'], 'completed': row['completed'], 'pending': row['pending']}
+        for row in rows
+    ]
@@ -1,23 +1,29 @@
 # URLs which are connected to Admin
 
+from django.conf import settings
 from django.urls import path
 from . import views_admin
 
+# DASHBOARD_CONCURRENT: variante async, requêtes du dashboard en parallèle
+dashboard_view = views_admin.admin_dashboard_async if settings.DASHBOARD_CONCURRENT else views_admin.admin_dashboard
+
 urlpatterns = [
     # Login/Logout
     path('login/', views_admin.admin_login, name='admin_login'),
     path('logout/', views_admin.admin_logout, name='admin_logout'),
     
     # Dashboard
-    path('', views_admin.admin_dashboard, name='admin_dashboard'),
-    path('dashboard/', views_admin.admin_dashboard, name='admin_dashboard'),
+    path('', dashboard_view, name='admin_dashboard'),
+    path('dashboard/', dashboard_view, name='admin_dashboard'),
     
     # Tickets
     path('tickets/', views_admin.admin_tickets, name='admin_tickets'),
+    path('tickets/export/', views_admin.admin_export_tickets, name='admin_export_tickets'),
     path('tickets/<int:ticket_id>/', views_admin.admin_ticket_detail, name='admin_ticket_detail'),
     path('tickets/<int:ticket_id>/assign/', views_admin.assign_contractor, name='assign_contractor'),
     path('tickets/<int:ticket_id>/status/', views_admin.change_ticket_status, name='change_ticket_status'),
     path('tickets/<int:ticket_id>/message/', views_admin.admin_add_message, name='admin_add_message'),
+    path('tickets/<int:ticket_id>/messages/', views_admin.admin_ticket_messages, name='admin_ticket_messages'),
     
     # Contractors
     path('contractors/', views_admin.admin_contractors, name='admin_contractors'),
@@ -30,6 +36,9 @@ urlpatterns = [
     
     # API
     path('api/stats/', views_admin.api_ticket_stats, name='api_ticket_stats'),
+    path('api/stats/stream/', views_admin.api_ticket_stats_stream, name='api_ticket_stats_stream'),
+    path('api/activity/', views_admin.api_activity, name='api_activity'),
+    path('api/lookup/', views_admin.api_lookup, name='api_lookup'),
     
     # Profile
     path('change-password/', views_admin.change_password, name='change_password'),
@@ -19,6 +19,7 @@ urlpatterns = [
     path('jobs/<int:ticket_id>/refuse/', views_contractor.contractor_refuse_job, name='contractor_refuse_job'),
     path('jobs/<int:ticket_id>/status/', views_contractor.contractor_update_status, name='contractor_update_status'),
     path('jobs/<int:ticket_id>/message/', views_contractor.contractor_add_message, name='contractor_add_message'),
+    path('jobs/<int:ticket_id>/messages/', views_contractor.contractor_job_messages, name='contractor_job_messages'),
     
     # Profile
     path('profile/', views_contractor.contractor_profile, name='contractor_profile'),
@@ -17,6 +17,7 @@ urlpatterns = [
     path('tickets/new/', views_tenant.tenant_create_ticket, name='tenant_create_ticket'),
     path('tickets/<int:ticket_id>/', views_tenant.tenant_ticket_detail, name='tenant_ticket_detail'),
     path('tickets/<int:ticket_id>/message/', views_tenant.tenant_add_message, name='tenant_add_message'),
+    path('tickets/<int:ticket_id>/messages/', views_tenant.tenant_ticket_messages, name='tenant_ticket_messages'),
     path('tickets/<int:ticket_id>/photo/', views_tenant.tenant_add_photo, name='tenant_add_photo'),
     
     # Profile
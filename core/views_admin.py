@@ -1,114 +1,151 @@
 """Views for admin's UI"""
 
+import asyncio
 import json
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.views.decorators.http import condition
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.hashers import check_password, make_password
 from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import timedelta
-from functools import wraps
+from datetime import datetime, timedelta
+from functools import partial, wraps
+from urllib.parse import quote
 
 from .models import (
-    Tickets, Users, Contractors, Buildings,
-    IssueCategories, ContractorAssignments, Attachments, Messages
+    Tickets, Contractors, Buildings,
+    ContractorAssignments, Messages, SlaEvents
 )
-from .sla import get_sla_hours, calculate_sla_status, add_sla_to_tickets
+from .sla import SLA_ACTIVE_STATUSES, annotate_sla, add_annotated_sla_to_tickets
+from .activity import get_activity_page
+from .facets import apply_facet_filters, get_ticket_facets
+from .export import EXPORT_FORMATS, stream_export
+from .keyset import keyset_page, estimate_count
+from .search import search_tickets, lookup_places, filter_tickets_by_place
+from .login import authenticate
+from .message_thread import thread_page_html
+from .principals import get_principal
+from .ticket_detail import load_ticket_detail
+from .ticket_rows import AdminTicketRow, RankedAdminTicketRow, fetch_rows
+from .sla_rollup import get_sla_rate, get_sla_trend
+from .asgi import disconnected_event
+from .live_stats import broadcaster, ticket_stats, ticket_stats_version
+from .snapshot_cache import get_snapshot
+from .ticket_stats import (
+    monthly_counts, status_counts, category_counts, building_counts, contractor_counts
+)
+
+
+TICKETS_PAGE_SIZE = 50
+
+# Commentaire SSE envoyé sans changement: garde la connexion ouverte à travers les proxys
+SSE_KEEPALIVE = 20
+
+# Pool borné pour build_dashboard_snapshot_concurrent: au plus DASHBOARD_WORKERS connexions en plus
+dashboard_executor = ThreadPoolExecutor(max_workers=settings.DASHBOARD_WORKERS, thread_name_prefix='dashboard')
+
+
+def get_admin_user(request):
+    """Admin logged in this session (cached principal, see get_principal), None otherwise"""
+    user_id = request.session.get('user_id')
+    if not user_id:
+        return None
+    return get_principal('admin', user_id)
 
 
 def admin_required(view_func):
-    """Decorator to verify that the user is an admin"""
+    """Decorator to verify that the user is an admin (sync and async views)"""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await sync_to_async(get_admin_user)(request)
+            if user is None:
+                return redirect('admin_login')
+            request.current_user = user
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
-        user_id = request.session.get('user_id')
-        if not user_id:
-            return redirect('admin_login')
-        try:
-            user = Users.objects.get(user_id=user_id, role='admin', is_active=True)
-            request.current_user = user
-        except Users.DoesNotExist:
+        user = get_admin_user(request)
+        if user is None:
             return redirect('admin_login')
+        request.current_user = user
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-def admin_login(request):
-    if request.method == 'POST':
-        username = request.POST.get('username')
-        password = request.POST.get('password')
+def admin_login_response(request, user, valid):
+    if user is not None and valid:
+        request.session['user_id'] = user.user_id
+        request.session['username'] = user.username
+        return redirect('admin_dashboard')
+    messages.error(request, 'Utilisateur non trouvé' if user is None else 'Mot de passe incorrect')
+    return render(request, 'admin_ui/login.html')
 
-        try:
-            user = Users.objects.get(username=username, role='admin', is_active=True)
-            if check_password(password, user.password_hash):
-                request.session['user_id'] = user.user_id
-                request.session['username'] = user.username
-                return redirect('admin_dashboard')
-            else:
-                messages.error(request, 'Mot de passe incorrect')
-        except Users.DoesNotExist:
-            messages.error(request, 'Utilisateur non trouvé')
 
-    return render(request, 'admin_ui/login.html')
+async def admin_login(request):
+    """Login form, the password is checked off the request thread (core.login.authenticate)"""
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'admin_ui/login.html')
+    user, valid = await authenticate('admin', request.POST.get('username'), request.POST.get('password'))
+    return await sync_to_async(admin_login_response)(request, user, valid)
 
 
 def admin_logout(request):
     request.session.flush()
     return redirect('admin_login')
 
-def get_chart_data():
-    """Get data for dashboard: tickets/month, tickets categories, by status and contractors performance"""
+def month_starts(now, count):
+    """First day (00:00) of the last `count` calendar months, oldest first"""
+    year, month = now.year, now.month
+    starts = []
+    for _ in range(count):
+        starts.append(datetime(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def get_chart_data(months_count=6):
+    """Get data for dashboard: tickets/month, tickets categories, by status and contractors performance
+    (fixed number of queries: one GROUP BY per series, whatever the number of months)"""
     now = timezone.now()
-    
-    months = []
-    created_counts = []
-    resolved_counts = []
-    
-    for i in range(5, -1, -1):
-        month_start = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        if i > 0:
-            month_end = (now - timedelta(days=30*(i-1))).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        else:
-            month_end = now
-        
-        month_name = month_start.strftime('%b')
-        months.append(month_name)
-        
-        created = Tickets.objects.filter(
-            created_at__gte=month_start,
-            created_at__lt=month_end
-        ).count()
-        created_counts.append(created)
-        
-        resolved = Tickets.objects.filter(
-            resolved_at__gte=month_start,
-            resolved_at__lt=month_end
-        ).count()
-        resolved_counts.append(resolved)
-    
+
+    starts = month_starts(now, months_count)
+    months = [start.strftime('%b') for start in starts]
+
+    # lu dans ticket_daily_stats (maintenue par trigger): coût indépendant de l'historique
+    created_by_month = monthly_counts(starts[0].date(), 'ticket_count')
+    resolved_by_month = monthly_counts(starts[0].date(), 'resolved_count')
+    created_counts = [created_by_month.get(start.date(), 0) for start in starts]
+    resolved_counts = [resolved_by_month.get(start.date(), 0) for start in starts]
+
     # Tickets par catégorie
-    category_stats = IssueCategories.objects.annotate(
-        ticket_count=Count('tickets')
-    ).filter(ticket_count__gt=0).order_by('-ticket_count')[:8]
+    category_stats = category_counts(8)
     
-    categories = [cat.name for cat in category_stats]
-    category_values = [cat.ticket_count for cat in category_stats]
+    categories = [cat['name'] for cat in category_stats]
+    category_values = [cat['ticket_count'] for cat in category_stats]
     
-    status_counts = {
-        'Ouverts': Tickets.objects.filter(status='open').count(),
-        'En cours': Tickets.objects.filter(status='in_progress').count(),
-        'Résolus': Tickets.objects.filter(status='resolved').count(),
-        'Fermés': Tickets.objects.filter(status='closed').count(),
+    by_status = status_counts()
+    status_counts_chart = {
+        'Ouverts': by_status['open'],
+        'En cours': by_status['in_progress'],
+        'Résolus': by_status['resolved'],
+        'Fermés': by_status['closed'],
     }
     
-    contractor_stats = Contractors.objects.filter(is_active=True).annotate(
-        completed=Count('tickets', filter=Q(tickets__status__in=['resolved', 'closed'])),
-        pending=Count('tickets', filter=Q(tickets__status__in=['open', 'in_progress']))
-    ).order_by('-completed')[:6]
+    contractor_stats = contractor_counts(6, active_only=True)
     
-    contractors = [c.company_name[:15] for c in contractor_stats]
-    contractor_completed = [c.completed for c in contractor_stats]
-    contractor_pending = [c.pending for c in contractor_stats]
+    contractors = [c['company_name'][:15] for c in contractor_stats]
+    contractor_completed = [c['completed'] for c in contractor_stats]
+    contractor_pending = [c['pending'] for c in contractor_stats]
     
     return {
         'months': json.dumps(months),
@@ -116,151 +153,231 @@ def get_chart_data():
         'resolved': json.dumps(resolved_counts),
         'categories': json.dumps(categories),
         'category_values': json.dumps(category_values),
-        'status_labels': json.dumps(list(status_counts.keys())),
-        'status_values': json.dumps(list(status_counts.values())),
+        'status_labels': json.dumps(list(status_counts_chart.keys())),
+        'status_values': json.dumps(list(status_counts_chart.values())),
         'contractors': json.dumps(contractors),
         'contractor_completed': json.dumps(contractor_completed),
         'contractor_pending': json.dumps(contractor_pending),
     }
 
-def get_recent_activities():
-    """Get recent data, like recently created or resolved tickets"""
-    activities = []
-    now = timezone.now()
-    
-    recent_created = Tickets.objects.order_by('-created_at')[:3]
-    for ticket in recent_created:
-        time_diff = now - ticket.created_at
-        if time_diff.days > 0:
-            time_str = f"Il y a {time_diff.days}j"
-        elif time_diff.seconds > 3600:
-            time_str = f"Il y a {time_diff.seconds // 3600}h"
-        else:
-            time_str = f"Il y a {time_diff.seconds // 60}min"
-        
-        activities.append({
-            'type': 'created',
-            'title': f"#{ticket.ticket_id} créé",
-            'time': time_str
-        })
-    
-    recent_resolved = Tickets.objects.filter(
-        resolved_at__isnull=False
-    ).order_by('-resolved_at')[:2]
-    
-    for ticket in recent_resolved:
-        time_diff = now - ticket.resolved_at
-        if time_diff.days > 0:
-            time_str = f"Il y a {time_diff.days}j"
-        elif time_diff.seconds > 3600:
-            time_str = f"Il y a {time_diff.seconds // 3600}h"
-        else:
-            time_str = f"Il y a {time_diff.seconds // 60}min"
-        
-        activities.append({
-            'type': 'resolved',
-            'title': f"#{ticket.ticket_id} résolu",
-            'time': time_str
-        })
-    
-    return activities[:5]
-
 @admin_required
 def admin_dashboard(request):
     """Admin's dashboard. Opened/In progress/Not assigned tickers
      + recent activity and other statistics"""
-    now = timezone.now()
+    # même snapshot pour tous les admins tant que tickets / messages / assignations ne changent pas
+    context = get_snapshot('dashboard', build_dashboard_snapshot)
+    context['user'] = request.current_user
+    context['sidebar_stats'] = {'new': context['stats']['new']}  # déjà compté dans le snapshot
+    context['live_stats_stream'] = isinstance(request, ASGIRequest)  # SSE sous ASGI, sinon polling
+    return render(request, 'admin_ui/dashboard.html', context)
+
 
+@admin_required
+async def admin_dashboard_async(request):
+    """Same page as admin_dashboard, the query groups of a rebuild run concurrently
+    (selected with DASHBOARD_CONCURRENT, meant for ASGI)"""
+    context = await sync_to_async(get_snapshot)('dashboard', build_dashboard_snapshot_concurrent)
+    context['user'] = request.current_user
+    context['sidebar_stats'] = {'new': context['stats']['new']}
+    context['live_stats_stream'] = isinstance(request, ASGIRequest)
+    return await sync_to_async(render)(request, 'admin_ui/dashboard.html', context)
+
+
+def dashboard_sla_panels(now):
     active_tickets = Tickets.objects.filter(
         status__in=['open', 'in_progress']
-    ).select_related('unit', 'unit__building', 'category')
+    ).select_related('unit', 'unit__building', 'category', 'assigned_contractor')
+
+    # sla_deadline / sla_warning_at sont maintenus par trigger et indexés (index partiels)
+    breached_tickets = active_tickets.filter(sla_deadline__lt=now)
+    warning_tickets = active_tickets.filter(sla_warning_at__lt=now, sla_deadline__gte=now)
 
     sla_breached_tickets = []
     urgent_tickets = []
 
-    for ticket in active_tickets:
-        sla_hours = get_sla_hours(ticket)
-        deadline = ticket.created_at + timedelta(hours=sla_hours)
-        remaining = deadline - now
-        remaining_hours = remaining.total_seconds() / 3600
+    for ticket in breached_tickets.order_by('sla_deadline')[:5]:
+        address = f"{ticket.unit.building.address}" if ticket.unit and ticket.unit.building else "N/A"
+        sla_breached_tickets.append({
+            'ticket': ticket,
+            'address': address,
+            'hours_late': int((now - ticket.sla_deadline).total_seconds() / 3600),
+        })
 
+    for ticket in warning_tickets.order_by('sla_deadline')[:3]:
         address = f"{ticket.unit.building.address}" if ticket.unit and ticket.unit.building else "N/A"
+        urgent_tickets.append({
+            'ticket': ticket,
+            'address': address,
+            'hours_remaining': int((ticket.sla_deadline - now).total_seconds() / 3600),
+        })
 
-        if remaining_hours < 0:
-            sla_breached_tickets.append({
-                'ticket': ticket,
-                'address': address,
-                'hours_late': int(abs(remaining_hours)),
-            })
-        elif remaining_hours < (sla_hours * 0.25):
-            urgent_tickets.append({
-                'ticket': ticket,
-                'address': address,
-                'hours_remaining': int(remaining_hours),
-            })
-
-    stats = {
-        'new': Tickets.objects.filter(status='open').count(),
-        'in_progress': Tickets.objects.filter(status='in_progress').count(),
-        'sla_breached': len(sla_breached_tickets),
-        'resolved': Tickets.objects.filter(
+    return {
+        'sla_breached_tickets': sla_breached_tickets,
+        'sla_breached_count': breached_tickets.count(),
+        'urgent_tickets': urgent_tickets,
+        'urgent_count': warning_tickets.count(),
+    }
+
+
+def dashboard_stats(now):
+    # compteurs de statut: une seule agrégation conditionnelle
+    stats = Tickets.objects.aggregate(
+        new=Count('pk', filter=Q(status='open')),
+        in_progress=Count('pk', filter=Q(status='in_progress')),
+        resolved=Count('pk', filter=Q(
             status__in=['resolved', 'closed'],
             resolved_at__gte=now - timedelta(days=30)
-        ).count(),
-        'total': Tickets.objects.count(),
-        'active_contractors': Contractors.objects.filter(is_active=True).count(),
-    }
+        )),
+        total=Count('pk'),
+    )
+    stats['active_contractors'] = Contractors.objects.filter(is_active=True).count()
+    sla_rate = get_sla_rate(30)
+    stats['sla_rate'] = f"{sla_rate}%" if sla_rate is not None else "—"
+    return {'stats': stats}
+
 
-    unassigned_tickets = Tickets.objects.filter(
+def dashboard_lists(now):
+    unassigned_tickets = list(Tickets.objects.filter(
         status='open',
         assigned_contractor__isnull=True
-    ).select_related('category').order_by('created_at')[:10]
+    ).select_related('category').order_by('created_at')[:10])
 
-    contractors = Contractors.objects.filter(is_active=True)
-    
-    chart_data = get_chart_data()
-    
-    recent_activities = get_recent_activities()
+    contractors = list(Contractors.objects.filter(is_active=True))
 
-    context = {
-        'stats': stats,
-        'sla_breached_tickets': sla_breached_tickets,
-        'urgent_tickets': urgent_tickets,
+    # alertes écrites par le worker sla_scheduler (dernières 24h, tickets encore actifs)
+    sla_events = list(SlaEvents.objects.filter(
+        created_at__gte=now - timedelta(hours=24),
+        ticket__status__in=['open', 'in_progress']
+    ).select_related('ticket').order_by('-created_at')[:8])
+
+    return {
         'unassigned_tickets': unassigned_tickets,
         'contractors': contractors,
-        'user': request.current_user,
-        'chart_data': chart_data,
-        'recent_activities': recent_activities,
+        'sla_events': sla_events,
     }
 
-    return render(request, 'admin_ui/dashboard.html', context)
+
+def dashboard_activity():
+    """First page of the activity feed, the next ones come from api_activity"""
+    items, next_cursor = get_activity_page()
+    return {'recent_activities': items, 'activity_next': next_cursor}
+
+
+def dashboard_groups(now):
+    """Independent query groups of the dashboard, each returns a part of the context"""
+    return [
+        partial(dashboard_sla_panels, now),
+        partial(dashboard_stats, now),
+        partial(dashboard_lists, now),
+        lambda: {'chart_data': get_chart_data()},
+        dashboard_activity,
+    ]
+
+
+def merge_dashboard_parts(parts):
+    context = {}
+    for part in parts:
+        context.update(part)
+    context['stats']['sla_breached'] = context['sla_breached_count']
+    return context
+
+
+def build_dashboard_snapshot():
+    """Dashboard context without the user (lists only: the result goes to the cache)"""
+    return merge_dashboard_parts(group() for group in dashboard_groups(timezone.now()))
+
+
+def run_dashboard_group(group):
+    try:
+        return group()
+    finally:
+        # connexion propre au thread du pool: gardée selon CONN_MAX_AGE, comme en fin de requête
+        close_old_connections()
+
+
+def build_dashboard_snapshot_concurrent():
+    """build_dashboard_snapshot with the groups run in dashboard_executor (one DB connection
+    per pool thread): latency ~ slowest group instead of the sum of all round trips"""
+    futures = [
+        dashboard_executor.submit(run_dashboard_group, group)
+        for group in dashboard_groups(timezone.now())
+    ]
+    return merge_dashboard_parts(future.result() for future in futures)
 
 
 @admin_required
 def admin_tickets(request):
     status_filter = request.GET.get('status', '')
     sla_filter = request.GET.get('sla', '')
+    sort = request.GET.get('sort', '')
     search = request.GET.get('search', '')
+    place = request.GET.get('place', '')
+    cursor = request.GET.get('cursor', '')
+    now = timezone.now()
 
-    tickets = Tickets.objects.select_related(
-        'unit', 'unit__building', 'tenant', 'category', 'assigned_contractor'
-    ).order_by('-created_at')
+    category_filter = request.GET.get('category', '')
+    building_filter = request.GET.get('building', '')
 
-    if status_filter:
-        tickets = tickets.filter(status=status_filter)
+    tickets = Tickets.objects.all()
 
+    # choix du typeahead: locataire / appartement / immeuble exact, sinon recherche approximative
+    place_filters = {
+        'tenant': 'tenant_id', 'unit': 'unit_id', 'building': 'unit__building_id',
+    }
+    place_kind = request.GET.get('place_kind', '')
+    place_id = request.GET.get('place_id', '')
+    if place_kind in place_filters and place_id.isdigit():
+        tickets = tickets.filter(**{place_filters[place_kind]: int(place_id)})
+    elif place:
+        tickets = filter_tickets_by_place(tickets, place)
+
+    # numéro de ticket: clé primaire, texte: recherche plein texte classée par pertinence
+    ranked = False
     if search:
-        tickets = tickets.filter(
-            Q(title__icontains=search) |
-            Q(description__icontains=search) |
-            Q(ticket_id__icontains=search)
-        )
+        tickets, ranked = search_tickets(tickets, search)
 
-    tickets = list(tickets)
-    add_sla_to_tickets(tickets)
+    # SLA calculé par PostgreSQL: filtre, tri et compteurs sans charger tous les tickets
+    tickets = annotate_sla(tickets, now)
 
-    if sla_filter == 'breached':
-        tickets = [t for t in tickets if t.sla_status == 'breached']
+    # compteurs des filtres (statut, SLA, catégorie, immeuble): une requête GROUPING SETS, en cache
+    filters = {
+        'status': status_filter,
+        'sla': sla_filter if sla_filter in ('breached', 'warning') else '',
+        'category': category_filter if category_filter.isdigit() else '',
+        'building': building_filter if building_filter.isdigit() else '',
+    }
+    signature = {key: request.GET.get(key, '') for key in ('search', 'place', 'place_kind', 'place_id')}
+    facets = get_ticket_facets(tickets, filters, {**signature, **filters})
+    tickets = apply_facet_filters(tickets, filters)
+
+    # pagination par curseur: (sla_deadline, ticket_id) ou (created_at, ticket_id), jamais d'OFFSET
+    types, row_cls = (datetime, int), AdminTicketRow
+    if sort == 'sla':
+        # tickets actifs seulement (index sur sla_deadline): restriction affichée dans la page
+        tickets = tickets.filter(status__in=SLA_ACTIVE_STATUSES, sla_deadline__isnull=False)
+        order_field, descending = 'sla_deadline', False
+    elif ranked:
+        order_field, descending, types, row_cls = 'search_rank', True, (float, int), RankedAdminTicketRow
+    else:
+        order_field, descending = 'created_at', True
+
+    # total estimé par le planificateur, première page seulement: pas de COUNT(*) sur 200k lignes
+    estimated_total = None if cursor else estimate_count(tickets)
+    page, next_cursor = keyset_page(tickets, order_field, 'ticket_id', cursor, TICKETS_PAGE_SIZE,
+                                    descending, types, fetch=partial(fetch_rows, row_cls))
+
+    tickets = add_annotated_sla_to_tickets(page, now)
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    first_url = f"?{params.urlencode()}"
+    unsorted = params.copy()
+    unsorted.pop('sort', None)
+    unsorted_url = f"?{unsorted.urlencode()}"
+    next_url = None
+    if next_cursor:
+        params['cursor'] = next_cursor
+        next_url = f"?{params.urlencode()}"
 
     contractors = Contractors.objects.filter(is_active=True)
 
@@ -268,12 +385,19 @@ def admin_tickets(request):
         'tickets': tickets,
         'status_filter': status_filter,
         'sla_filter': sla_filter,
+        'sort': sort,
         'search': search,
+        'place': place,
+        'category_filter': filters['category'],
+        'building_filter': filters['building'],
+        'facets': facets,
+        'estimated_total': estimated_total,
+        'first_url': first_url,
+        'unsorted_url': unsorted_url,
+        'next_url': next_url,
+        'is_first_page': not cursor,
         'contractors': contractors,
         'user': request.current_user,
-        'stats': {
-            'new': Tickets.objects.filter(status='open').count(),
-        }
     }
 
     return render(request, 'admin_ui/tickets.html', context)
@@ -281,36 +405,29 @@ def admin_tickets(request):
 
 @admin_required
 def admin_ticket_detail(request, ticket_id):
-    ticket = get_object_or_404(
-        Tickets.objects.select_related(
-            'unit', 'unit__building', 'tenant', 'category', 'assigned_contractor'
-        ),
-        ticket_id=ticket_id
-    )
+    ticket = load_ticket_detail(ticket_id, 'admin')
 
-    contractors = Contractors.objects.filter(is_active=True)
-
-    photos = Attachments.objects.filter(ticket=ticket)
-    
-    ticket_messages = Messages.objects.filter(ticket=ticket).select_related(
-        'tenant_sender', 'contractor_sender', 'user_sender'
-    ).order_by('created_at')
-
-    sla_status, sla_hours = calculate_sla_status(ticket)
-    ticket.sla_status = sla_status
-    ticket.sla_remaining = f"{int(sla_hours)}h" if sla_hours is not None else None
+    # liste du modal d'attribution: seulement les colonnes affichées
+    contractors = Contractors.objects.filter(is_active=True).only('contractor_id', 'company_name')
 
     context = {
         'ticket': ticket,
         'contractors': contractors,
-        'photos': photos,
-        'ticket_messages': ticket_messages,
+        'photos': ticket.detail_photos,
+        'ticket_messages': ticket.detail_messages,
+        'thread_cursor': ticket.thread_cursor,
         'user': request.current_user,
     }
 
     return render(request, 'admin_ui/ticket_detail.html', context)
 
 
+@admin_required
+def admin_ticket_messages(request, ticket_id):
+    """Older page of the message thread (?cursor=), HTML cached per page"""
+    return JsonResponse(thread_page_html(ticket_id, 'admin', request.GET.get('cursor', '')))
+
+
 @admin_required
 def admin_add_message(request, ticket_id):
     if request.method == 'POST':
@@ -389,7 +506,6 @@ def admin_contractors(request):
     context = {
         'contractors': contractors,
         'user': request.current_user,
-        'stats': {'new': Tickets.objects.filter(status='open').count()}
     }
 
     return render(request, 'admin_ui/contractors.html', context)
@@ -405,7 +521,6 @@ def admin_buildings(request):
     context = {
         'buildings': buildings,
         'user': request.current_user,
-        'stats': {'new': Tickets.objects.filter(status='open').count()}
     }
 
     return render(request, 'admin_ui/buildings.html', context)
@@ -413,38 +528,120 @@ def admin_buildings(request):
 
 @admin_required
 def admin_reports(request):
-    category_stats = IssueCategories.objects.annotate(
-        ticket_count=Count('tickets')
-    ).order_by('-ticket_count')[:10]
-
-    building_stats = Buildings.objects.annotate(
-        ticket_count=Count('units__tickets')
-    ).order_by('-ticket_count')[:10]
-
-    contractor_stats = Contractors.objects.annotate(
-        completed=Count('tickets', filter=Q(tickets__status__in=['resolved', 'closed']))
-    ).order_by('-completed')[:10]
+    # lu dans ticket_daily_stats, pas dans tickets
+    category_stats = category_counts(10)
+    building_stats = building_counts(10)
+    contractor_stats = contractor_counts(10)
 
     context = {
         'category_stats': category_stats,
         'building_stats': building_stats,
         'contractor_stats': contractor_stats,
+        'sla_trend': get_sla_trend(30),
         'user': request.current_user,
-        'stats': {'new': Tickets.objects.filter(status='open').count()}
     }
 
     return render(request, 'admin_ui/reports.html', context)
 
 
+def ticket_stats_etag(request):
+    # compteur 'tickets' incrémenté par trigger, servi par le listener ou le cache au lieu des COUNT
+    return f"tickets-{ticket_stats_version()}"
+
+
 @admin_required
+@condition(etag_func=ticket_stats_etag)
 def api_ticket_stats(request):
-    stats = {
-        'new': Tickets.objects.filter(status='open').count(),
-        'in_progress': Tickets.objects.filter(status='in_progress').count(),
-        'waiting': Tickets.objects.filter(status='open', assigned_contractor__isnull=True).count(),
-        'resolved': Tickets.objects.filter(status__in=['resolved', 'closed']).count(),
-    }
-    return JsonResponse(stats)
+    """Ticket counters for polling clients (304 Not Modified while no ticket changed)"""
+    return JsonResponse(ticket_stats())
+
+
+@admin_required
+async def api_ticket_stats_stream(request):
+    """Server-Sent Events: full counters first, then only the ones that change (ASGI only)"""
+    if not isinstance(request, ASGIRequest):
+        # sous WSGI un flux infini bloquerait un worker: les clients restent sur api_ticket_stats
+        return HttpResponse("SSE disponible uniquement sous ASGI", status=501)
+
+    async def events():
+        queue = broadcaster.subscribe()
+        # Django 4.2 n'annule pas le flux quand le client part: déconnexion vue par core.asgi
+        closed = asyncio.ensure_future(disconnected_event(request).wait())
+        try:
+            initial = await sync_to_async(ticket_stats)()
+            yield f"event: stats\ndata: {json.dumps(initial)}\n\n"
+            while True:
+                received = asyncio.ensure_future(queue.get())
+                await asyncio.wait({received, closed}, timeout=SSE_KEEPALIVE, return_when=asyncio.FIRST_COMPLETED)
+                if not received.done():
+                    received.cancel()
+                    if closed.done():
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                delta = received.result()
+                if delta is None:
+                    # client trop lent, retiré par le broadcaster: EventSource se reconnecte (compteurs complets)
+                    return
+                yield f"event: delta\ndata: {json.dumps(delta)}\n\n"
+        finally:
+            closed.cancel()
+            broadcaster.unsubscribe(queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@admin_required
+def api_activity(request):
+    """Activity feed page after ?cursor= (infinite scroll of the dashboard)"""
+    items, next_cursor = get_activity_page(request.GET.get('cursor') or None)
+    return JsonResponse({
+        'items': [
+            {
+                'type': item['type'],
+                'title': item['title'],
+                'created_at': item['created_at'].isoformat(),
+                'url': reverse('admin_ticket_detail', args=[item['ticket_id']]),
+            }
+            for item in items
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+@admin_required
+def admin_export_tickets(request):
+    """All tickets (?status= optional) as CSV or JSONL (?format=), streamed chunk by chunk"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponse(status=400)
+    tickets = Tickets.objects.all()
+    status_filter = request.GET.get('status', '')
+    if status_filter:
+        tickets = tickets.filter(status=status_filter)
+
+    response = StreamingHttpResponse(stream_export(fmt, tickets), content_type=EXPORT_FORMATS[fmt])
+    filename = f"tickets-{timezone.now():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@admin_required
+def api_lookup(request):
+    """Typeahead: tenants, units and buildings matching ?q= (trigram indexes, one query)"""
+    query = request.GET.get('q', '').strip()
+    if len(query) < 2:
+        return JsonResponse({'results': []})
+    tickets_url = reverse('admin_tickets')
+    return JsonResponse({
+        'results': [
+            dict(match, url=f"{tickets_url}?place_kind={match['kind']}&place_id={match['id']}&place={quote(match['label'])}")
+            for match in lookup_places(query)
+        ],
+    })
 
 
 @admin_required
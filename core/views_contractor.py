@@ -1,15 +1,22 @@
 """Views for contractor's UI"""
 
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 from functools import wraps
+from asgiref.sync import sync_to_async
 
 from .models import (
     Tickets, Contractors, ContractorAssignments,
-    Messages, TicketStatusHistory, Attachments
+    Messages, TicketStatusHistory
 )
+from .login import authenticate
+from .message_thread import thread_page_html
+from .principals import get_principal
+from .ticket_detail import load_ticket_detail
+from .ticket_rows import ContractorJobRow, fetch_rows
 
 def contractor_required(view_func):
     """Decorator to verify that the user is a contractor"""
@@ -18,35 +25,32 @@ def contractor_required(view_func):
         contractor_id = request.session.get('contractor_id')
         if not contractor_id:
             return redirect('contractor_login')
-        try:
-            contractor = Contractors.objects.get(contractor_id=contractor_id, is_active=True)
-            request.current_contractor = contractor
-        except Contractors.DoesNotExist:
+        contractor = get_principal('contractor', contractor_id)
+        if contractor is None:
             request.session.flush()
             return redirect('contractor_login')
+        request.current_contractor = contractor
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-def contractor_login(request):
-    if request.method == 'POST':
-        email = request.POST.get('email')
-        password = request.POST.get('password')
-        
-        try:
-            contractor = Contractors.objects.get(email=email, is_active=True)
-            if contractor.password_hash and check_password(password, contractor.password_hash):
-                request.session['contractor_id'] = contractor.contractor_id
-                request.session['contractor_name'] = contractor.company_name
-                return redirect('contractor_dashboard')
-            else:
-                messages.error(request, 'Mot de passe incorrect')
-        except Contractors.DoesNotExist:
-            messages.error(request, 'Email non trouvé')
-    
+def contractor_login_response(request, contractor, valid):
+    if contractor is not None and valid:
+        request.session['contractor_id'] = contractor.contractor_id
+        request.session['contractor_name'] = contractor.company_name
+        return redirect('contractor_dashboard')
+    messages.error(request, 'Email non trouvé' if contractor is None else 'Mot de passe incorrect')
     return render(request, 'contractor_ui/login.html')
 
 
+async def contractor_login(request):
+    """Login form, the password is checked off the request thread (core.login.authenticate)"""
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'contractor_ui/login.html')
+    contractor, valid = await authenticate('contractor', request.POST.get('email'), request.POST.get('password'))
+    return await sync_to_async(contractor_login_response)(request, contractor, valid)
+
+
 def contractor_logout(request):
     request.session.flush()
     return redirect('contractor_login')
@@ -90,14 +94,14 @@ def contractor_jobs(request):
     
     tickets = Tickets.objects.filter(
         assigned_contractor=contractor
-    ).select_related('category', 'unit', 'unit__building', 'tenant').order_by('-assigned_at')
+    ).order_by('-assigned_at')
     
     if status_filter:
         tickets = tickets.filter(status=status_filter)
     
     context = {
         'contractor': contractor,
-        'tickets': tickets,
+        'tickets': fetch_rows(ContractorJobRow, tickets),
         'status_filter': status_filter,
     }
     
@@ -108,36 +112,29 @@ def contractor_jobs(request):
 def contractor_job_detail(request, ticket_id):
     contractor = request.current_contractor
     
-    ticket = get_object_or_404(
-        Tickets.objects.select_related(
-            'category', 'unit', 'unit__building', 'tenant'
-        ),
-        ticket_id=ticket_id,
-        assigned_contractor=contractor
-    )
-    
-    ticket_messages = Messages.objects.filter(ticket=ticket).order_by('created_at')
-    
-    status_history = TicketStatusHistory.objects.filter(ticket=ticket).order_by('created_at')
-
-    photos = Attachments.objects.filter(ticket=ticket)
-
-    assignment = ContractorAssignments.objects.filter(
-        ticket=ticket, contractor=contractor
-    ).first()
+    ticket = load_ticket_detail(ticket_id, 'contractor', contractor=contractor)
 
     context = {
         'contractor': contractor,
         'ticket': ticket,
-        'messages': ticket_messages,
-        'status_history': status_history,
-        'photos': photos,
-        'assignment': assignment,
+        'messages': ticket.detail_messages,
+        'thread_cursor': ticket.thread_cursor,
+        'status_history': ticket.detail_status_history,
+        'photos': ticket.detail_photos,
+        'assignment': ticket.detail_assignments[0] if ticket.detail_assignments else None,
     }
 
     return render(request, 'contractor_ui/job_detail.html', context)
 
 
+@contractor_required
+def contractor_job_messages(request, ticket_id):
+    """Older page of the message thread (?cursor=)"""
+    if not Tickets.objects.filter(ticket_id=ticket_id, assigned_contractor=request.current_contractor).exists():
+        raise Http404
+    return JsonResponse(thread_page_html(ticket_id, 'contractor', request.GET.get('cursor', '')))
+
+
 @contractor_required
 def contractor_accept_job(request, ticket_id):
     contractor = request.current_contractor
@@ -263,7 +260,8 @@ def contractor_add_message(request, ticket_id):
 
 @contractor_required
 def contractor_profile(request):
-    contractor = request.current_contractor
+    # toutes les colonnes en une requête (le principal n'a que celles du décorateur)
+    contractor = Contractors.objects.get(contractor_id=request.current_contractor.contractor_id)
 
     context = {
         'contractor': contractor,
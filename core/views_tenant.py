@@ -2,17 +2,27 @@
 
 import os
 import uuid
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.hashers import check_password, make_password
 from django.utils import timezone
 from django.conf import settings
 from functools import wraps
+from asgiref.sync import sync_to_async
 
 from .models import (
     Tickets, Tenants, IssueCategories, Messages, Attachments
 )
-from .sla import calculate_sla_status, add_sla_to_tickets
+from .sla import (
+    add_sla_to_tickets,
+    annotate_sla, add_annotated_sla_to_tickets
+)
+from .login import authenticate
+from .message_thread import thread_page_html
+from .principals import get_principal
+from .ticket_detail import load_ticket_detail
+from .ticket_rows import TenantTicketRow, fetch_rows
 
 def tenant_required(view_func):
     """Decorator to verify that the user is a tenant"""
@@ -21,35 +31,32 @@ def tenant_required(view_func):
         tenant_id = request.session.get('tenant_id')
         if not tenant_id:
             return redirect('tenant_login')
-        try:
-            tenant = Tenants.objects.get(tenant_id=tenant_id, is_active=True)
-            request.current_tenant = tenant
-        except Tenants.DoesNotExist:
+        tenant = get_principal('tenant', tenant_id)
+        if tenant is None:
             request.session.flush()
             return redirect('tenant_login')
+        request.current_tenant = tenant
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-def tenant_login(request):
-    if request.method == 'POST':
-        email = request.POST.get('email')
-        password = request.POST.get('password')
-        
-        try:
-            tenant = Tenants.objects.get(email=email, is_active=True)
-            if tenant.password_hash and check_password(password, tenant.password_hash):
-                request.session['tenant_id'] = tenant.tenant_id
-                request.session['tenant_name'] = f"{tenant.first_name} {tenant.last_name}"
-                return redirect('tenant_dashboard')
-            else:
-                messages.error(request, 'Mot de passe incorrect')
-        except Tenants.DoesNotExist:
-            messages.error(request, 'Email non trouvé')
-    
+def tenant_login_response(request, tenant, valid):
+    if tenant is not None and valid:
+        request.session['tenant_id'] = tenant.tenant_id
+        request.session['tenant_name'] = f"{tenant.first_name} {tenant.last_name}"
+        return redirect('tenant_dashboard')
+    messages.error(request, 'Email non trouvé' if tenant is None else 'Mot de passe incorrect')
     return render(request, 'tenant_ui/login.html')
 
 
+async def tenant_login(request):
+    """Login form, the password is checked off the request thread (core.login.authenticate)"""
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'tenant_ui/login.html')
+    tenant, valid = await authenticate('tenant', request.POST.get('email'), request.POST.get('password'))
+    return await sync_to_async(tenant_login_response)(request, tenant, valid)
+
+
 def tenant_logout(request):
     request.session.flush()
     return redirect('tenant_login')
@@ -88,15 +95,14 @@ def tenant_tickets(request):
     
     status_filter = request.GET.get('status', '')
     
-    tickets = Tickets.objects.filter(tenant=tenant).select_related(
-        'category', 'assigned_contractor', 'unit', 'unit__building'
-    ).order_by('-created_at')
+    tickets = Tickets.objects.filter(tenant=tenant).order_by('-created_at')
     
     if status_filter:
         tickets = tickets.filter(status=status_filter)
     
-    tickets_list = list(tickets)
-    add_sla_to_tickets(tickets_list)
+    # colonnes de la liste seulement, SLA calculé par PostgreSQL
+    now = timezone.now()
+    tickets_list = add_annotated_sla_to_tickets(fetch_rows(TenantTicketRow, annotate_sla(tickets, now)), now)
     
     context = {
         'tenant': tenant,
@@ -111,31 +117,26 @@ def tenant_tickets(request):
 def tenant_ticket_detail(request, ticket_id):
     tenant = request.current_tenant
     
-    ticket = get_object_or_404(
-        Tickets.objects.select_related(
-            'category', 'assigned_contractor', 'unit', 'unit__building'
-        ),
-        ticket_id=ticket_id,
-        tenant=tenant
-    )
-    
-    status, hours = calculate_sla_status(ticket)
-    ticket.sla_status = status
-    ticket.sla_remaining = f"{int(hours)}h" if hours else None
-
-    ticket_messages = Messages.objects.filter(ticket=ticket).exclude(is_internal=True).order_by('created_at')
-    
-    photos = Attachments.objects.filter(ticket=ticket)
+    ticket = load_ticket_detail(ticket_id, 'tenant', tenant=tenant)
     
     context = {
         'tenant': tenant,
         'ticket': ticket,
-        'messages': ticket_messages,
-        'photos': photos,
+        'messages': ticket.detail_messages,
+        'thread_cursor': ticket.thread_cursor,
+        'photos': ticket.detail_photos,
     }
     
     return render(request, 'tenant_ui/ticket_detail.html', context)
 
+
+@tenant_required
+def tenant_ticket_messages(request, ticket_id):
+    """Older page of the message thread (?cursor=), internal notes excluded"""
+    if not Tickets.objects.filter(ticket_id=ticket_id, tenant=request.current_tenant).exists():
+        raise Http404
+    return JsonResponse(thread_page_html(ticket_id, 'tenant', request.GET.get('cursor', '')))
+
 def handle_uploaded_photos(request, ticket, tenant):
     """Upload photos attaached to a ticket"""
     photos = request.FILES.getlist('photos')
@@ -266,7 +267,8 @@ def tenant_add_photo(request, ticket_id):
 
 @tenant_required
 def tenant_profile(request):
-    tenant = request.current_tenant
+    # toutes les colonnes (le principal n'a que celles du décorateur) et l'adresse en une requête
+    tenant = Tenants.objects.select_related('unit__building').get(tenant_id=request.current_tenant.tenant_id)
     
     context = {
         'tenant': tenant,
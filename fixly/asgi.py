@@ -5,3 +5,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fixly.settings')
 application = get_asgi_application()
+
+# déconnexions des clients SSE (api_ticket_stats_stream) visibles par la vue
+from core.asgi import watch_disconnect  # noqa: E402
+
+application = watch_disconnect(application)
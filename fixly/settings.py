@@ -3,13 +3,15 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environmental varialbes
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'django-insecure-change-me-in-production')
+DEFAULT_SECRET_KEY = 'django-insecure-change-me-in-production'
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', DEFAULT_SECRET_KEY)
 
 # Debug mode
 DEBUG = os.environ.get('DJANGO_DEBUG', 'True') == 'True'
@@ -80,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'core.context_processors.admin_sidebar',
             ],
         },
     },
@@ -98,11 +101,56 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'postgres'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
     }
 }
 
 
 
+# Cache: Redis partagé entre les workers si REDIS_URL est défini, sinon mémoire locale (dev, tests)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fixly',
+        }
+    }
+
+# Sessions des trois portails (SESSION_MODE):
+#   db             django_session, un SELECT par page
+#   cached_db      lue dans le cache, écrite dans le cache et en base: la base n'est relue que sur un défaut de cache.
+#                  Demande un cache partagé entre les workers (Redis): c'est le défaut avec REDIS_URL
+#   signed_cookies les données dans le cookie signé (SECRET_KEY), aucune requête; pas de révocation côté
+#                  serveur, seul le principal en cache (désactivation) reste vérifié
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODE = os.environ.get('SESSION_MODE', 'cached_db' if os.environ.get('REDIS_URL') else 'db')
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+# clé par défaut publique (dépôt): n'importe qui pourrait signer un cookie de session admin
+if SESSION_MODE == 'signed_cookies' and SECRET_KEY in ('', DEFAULT_SECRET_KEY):
+    raise ImproperlyConfigured("SESSION_MODE=signed_cookies demande une DJANGO_SECRET_KEY propre dans l'environnement")
+
+# Dashboard admin: groupes de requêtes exécutés en parallèle (vue async + pool de threads), utile sous ASGI
+DASHBOARD_CONCURRENT = os.environ.get('DASHBOARD_CONCURRENT', 'False') == 'True'
+DASHBOARD_WORKERS = int(os.environ.get('DASHBOARD_WORKERS', 4))
+
+# Connexions des portails: hachages de mots de passe en parallèle (pool borné, voir core/login.py)
+LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', os.cpu_count() or 1))
+
+# Worker photo_derivatives: processus du pool qui réduisent les photos envoyées
+PHOTO_WORKERS = int(os.environ.get('PHOTO_WORKERS', os.cpu_count() or 1))
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',